@@ -1,11 +1,15 @@
 import streamlit as st
 import time
+import uuid
 import bcrypt
 from dotenv import load_dotenv
 
-from utils.handle_sql import get_data, execute_query
+from utils.handle_sql import get_data, execute_query, use_primary, bind_session
+from utils.pin_verifier import verify_secret, VerificationUnavailable
+from utils.transfer_executor import check_transfer_tables, TransferTablesMissing
 # [수정] reset_global_context 추가 임포트 (백엔드 메모리 초기화용)
 from rag_agent.main_agent import run_fintech_agent, reset_global_context
+from rag_agent.transfer_context import serialize_context
 # [수정] load_knowledge_base 추가 임포트 (DB 캐싱용)
 from rag_agent.finrag_agent import load_knowledge_base
 
@@ -79,6 +83,13 @@ def init_chroma_connection():
 
 init_chroma_connection()
 
+# 송금 테이블 확인 (마이그레이션 전 DB면 송금마다 1146 오류가 나지 않도록 시작 시 안내 후 중단)
+try:
+    check_transfer_tables()
+except TransferTablesMissing as e:
+    st.error(f"DB 마이그레이션이 필요합니다: {e}")
+    st.stop()
+
 # ==========================================
 # 2. 세션 상태 초기화
 # ==========================================
@@ -101,6 +112,10 @@ if "transfer_context" not in st.session_state:
     st.session_state["transfer_context"] = None
 if "last_result" not in st.session_state:
     st.session_state["last_result"] = None
+# DB 읽기 라우팅용 세션 키: 재실행 후에도 직전 쓰기를 알고 복제본 대신 primary에서 읽도록
+if "db_session_key" not in st.session_state:
+    st.session_state["db_session_key"] = uuid.uuid4().hex
+bind_session(st.session_state["db_session_key"])
     
 # ==========================================
 # 3. 페이지 함수
@@ -132,7 +147,9 @@ def login_page():
                 try:
                     # 두 가지 비밀번호 모두 조회 (pin_code, password)
                     sql = "SELECT pin_code, password, korean_name FROM members WHERE username = %s"
-                    user_data = get_data(sql, (username,))
+                    # 가입 직후 로그인도 실패하지 않도록 인증 조회는 primary에서 수행
+                    with use_primary():
+                        user_data = get_data(sql, (username,))
                     
                     if user_data:
                         db_pin = user_data[0]['pin_code']
@@ -145,10 +162,14 @@ def login_page():
                         if not target_hash:
                              st.error("해당 로그인 방식에 대한 비밀번호가 설정되지 않았습니다.")
                         else:
-                            if isinstance(target_hash, str):
-                                target_hash = target_hash.encode('utf-8')
-                            
-                            if bcrypt.checkpw(password_input.encode('utf-8'), target_hash):
+                            # bcrypt 검증은 워커 프로세스에서 (로그인 폭주 시 다른 세션이 멈추지 않도록)
+                            try:
+                                password_ok = verify_secret(username, password_input, target_hash, kind="password")
+                            except VerificationUnavailable as e:
+                                st.warning(str(e))
+                                password_ok = None
+
+                            if password_ok:
                                 st.session_state['logged_in'] = True
                                 st.session_state['current_user'] = username
                                 st.session_state['user_name_real'] = korean_name
@@ -160,13 +181,13 @@ def login_page():
                                 if "transfer_context" not in st.session_state:
                                     st.session_state["transfer_context"] = None
 
-                                from utils.create_view import create_user_views
-                                view_names = create_user_views(username)
-                                st.session_state['allowed_views'] = view_names
+                                # 사용자 전용 뷰는 조회 시점에 user_id 필터로 주입 (로그인 시 DDL 없음)
+                                from utils.create_view import get_user_views
+                                st.session_state['allowed_views'] = get_user_views()
 
                                 st.session_state['page'] = 'chat'
                                 st.rerun()
-                            else:
+                            elif password_ok is False:
                                 st.error("비밀번호가 일치하지 않습니다.")
                     else:
                         st.error("존재하지 않는 아이디입니다.")
@@ -302,7 +323,8 @@ def chat_page():
                 st.session_state['allowed_views']
             )
             if isinstance(result, dict):
-                st.session_state["transfer_context"] = result.get("context")
+                # 송금 상태는 버전이 붙은 압축 JSON으로 저장 (다른 워커에서도 이어서 처리 가능)
+                st.session_state["transfer_context"] = serialize_context(result.get("context"))
                 final_msg = result.get("message", "")
                 if result.get("status") in ["SUCCESS", "CANCEL", "FAIL"]:
                     st.session_state["transfer_context"] = None
@@ -344,10 +366,7 @@ def chat_page():
                     )
 
                     if isinstance(result, dict):
-                        if result.get("context"):
-                            st.session_state["transfer_context"] = result["context"]
-                        else:
-                            st.session_state["transfer_context"] = None
+                        st.session_state["transfer_context"] = serialize_context(result.get("context"))
 
                         # ★ 마지막 결과 저장 (버튼 렌더링 판단용)
                         st.session_state["last_result"] = result
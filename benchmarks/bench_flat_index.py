@@ -0,0 +1,154 @@
+"""
+용어집 벡터 검색 백엔드 비교: Chroma(HNSW) vs flat(float32) vs flat_int8
+
+백엔드마다 별도 프로세스에서 로드/검색해 메모리(RSS)를 깨끗하게 측정합니다.
+질의 벡터는 컬렉션에 저장된 임베딩에 노이즈를 더해 만들므로 임베딩 API 호출이 없습니다.
+  - 로드 시간, 로드 후 RSS 증가량
+  - 단건 검색 지연 p50/p95, 일괄 검색(질의 전체 한 번에) 처리량
+  - recall@k: float32 전수 검색 결과(정답) 대비 일치율
+
+사용 예)
+    python benchmarks/bench_flat_index.py --queries 500 --k 5
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import subprocess
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from benchmarks.bench_utils import percentile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CHROMA_DB_PATH = os.path.join(ROOT, "data", "financial_terms")
+COLLECTION_NAME = "financial_terms"
+BACKENDS = ["chroma", "flat", "flat_int8"]
+
+def _rss_kb():
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+def _open_chroma():
+    from langchain_chroma import Chroma
+    return Chroma(
+        persist_directory=CHROMA_DB_PATH,
+        collection_name=COLLECTION_NAME,
+        collection_metadata={"hnsw:space": "l2"},
+    )
+
+# ---------------------------------------------------------
+# 자식 프로세스: 백엔드 하나 측정
+# ---------------------------------------------------------
+def run_child(backend, query_path, k):
+    from rag_agent.flat_index import FlatVectorStore, FLAT_INDEX_DIR
+
+    queries = np.load(query_path)
+    base_rss = _rss_kb()
+    t0 = time.perf_counter()
+    if backend == "chroma":
+        store = _open_chroma()
+        # 첫 검색 때 HNSW 세그먼트가 로드되므로 로드 시간에 포함
+        store._collection.query(query_embeddings=queries[:1].tolist(), n_results=k)
+    else:
+        store = FlatVectorStore(None, FLAT_INDEX_DIR, "int8" if backend == "flat_int8" else "f32")
+        store.search_vectors(queries[:1], k)
+    load_ms = (time.perf_counter() - t0) * 1000
+    loaded_rss = _rss_kb()
+
+    latencies, top_ids = [], []
+    for vector in queries:
+        t0 = time.perf_counter()
+        if backend == "chroma":
+            ids = store._collection.query(query_embeddings=[vector.tolist()], n_results=k)["ids"][0]
+        else:
+            ids = [store.ids[row] for row, _ in store.search_vectors(vector, k)[0]]
+        latencies.append((time.perf_counter() - t0) * 1000)
+        top_ids.append(ids)
+
+    t0 = time.perf_counter()
+    if backend == "chroma":
+        store._collection.query(query_embeddings=queries.tolist(), n_results=k)
+    else:
+        store.search_vectors(queries, k)
+    batch_ms = (time.perf_counter() - t0) * 1000
+
+    print(json.dumps({
+        "backend": backend,
+        "load_ms": load_ms,
+        "rss_delta_kb": loaded_rss - base_rss,
+        "p50_ms": percentile(latencies, 0.5),
+        "p95_ms": percentile(latencies, 0.95),
+        "batch_ms": batch_ms,
+        "top_ids": top_ids,
+    }))
+
+# ---------------------------------------------------------
+# 부모 프로세스: 준비 / 비교
+# ---------------------------------------------------------
+def prepare(num_queries, noise, seed):
+    """flat 인덱스 파일(없으면 내보내기)과 질의 벡터, float32 정답 준비"""
+    from rag_agent.flat_index import FlatVectorStore, export_flat_index, FLAT_INDEX_DIR
+
+    data = _open_chroma().get(include=["embeddings", "documents", "metadatas"])
+    matrix = np.asarray(data["embeddings"], dtype=np.float32)
+    for dtype in ("f32", "int8"):
+        if not FlatVectorStore.exists(FLAT_INDEX_DIR, dtype):
+            export_flat_index(data["ids"], matrix, data["documents"], data["metadatas"], FLAT_INDEX_DIR, dtype)
+            print(f"📦 flat 인덱스 생성 ({dtype})")
+
+    rng = np.random.default_rng(seed)
+    rows = rng.integers(0, len(matrix), size=num_queries)
+    scale = noise * float(np.linalg.norm(matrix, axis=1).mean()) / np.sqrt(matrix.shape[1])
+    queries = (matrix[rows] + rng.normal(0, scale, size=(num_queries, matrix.shape[1]))).astype(np.float32)
+    truth_store = FlatVectorStore(None, FLAT_INDEX_DIR, "f32")
+    return queries, truth_store, len(matrix), matrix.shape[1]
+
+def main():
+    parser = argparse.ArgumentParser(description="용어집 벡터 검색 백엔드 비교")
+    parser.add_argument("--queries", type=int, default=300)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--noise", type=float, default=0.3, help="질의 벡터 노이즈 (벡터 평균 노름 대비)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--child", choices=BACKENDS, help=argparse.SUPPRESS)
+    parser.add_argument("--query-path", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(args.child, args.query_path, args.k)
+        return
+
+    queries, truth_store, count, dim = prepare(args.queries, args.noise, args.seed)
+    truth = [{truth_store.ids[row] for row, _ in hits} for hits in truth_store.search_vectors(queries, args.k)]
+    print(f"🏁 용어 {count}개 x {dim}차원, 질의 {len(queries)}건, k={args.k}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        query_path = os.path.join(tmp, "queries.npy")
+        np.save(query_path, queries)
+        for backend in BACKENDS:
+            out = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), "--child", backend, "--query-path", query_path, "--k", str(args.k)],
+                capture_output=True, text=True, cwd=ROOT,
+            )
+            if out.returncode != 0:
+                print(f"❌ [{backend}] 실패: {out.stderr.strip().splitlines()[-1] if out.stderr.strip() else out.returncode}")
+                continue
+            result = json.loads(out.stdout.strip().splitlines()[-1])
+            recall = sum(len(truth[i] & set(ids)) for i, ids in enumerate(result["top_ids"])) / (len(truth) * args.k)
+            print(f"📊 [{backend:<9}] 로드 {result['load_ms']:.0f}ms, RSS +{result['rss_delta_kb'] / 1024:.1f}MB | "
+                  f"단건 p50 {result['p50_ms']:.3f}ms p95 {result['p95_ms']:.3f}ms | "
+                  f"일괄 {len(queries)}건 {result['batch_ms']:.1f}ms | recall@{args.k} {recall:.1%}")
+
+if __name__ == "__main__":
+    main()
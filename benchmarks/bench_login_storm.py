@@ -0,0 +1,114 @@
+"""
+로그인 폭주 시 다른 사용자 요청 지연 벤치마크
+
+여러 스레드가 동시에 bcrypt 검증(로그인/PIN)을 하는 동안, 별도 스레드가
+가벼운 요청(송금 문장 파싱)을 주기적으로 보내 응답 지연을 측정합니다.
+  - inline: 요청 스레드에서 bcrypt.checkpw 실행 (기존 방식)
+  - pool  : utils.pin_verifier (프로세스 풀 + 대기열 제한)
+
+사용 예)
+    python benchmarks/bench_login_storm.py --storm-threads 32 --duration 10
+    python benchmarks/bench_login_storm.py --mode pool --rounds 12
+"""
+import os
+import sys
+import time
+import argparse
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import bcrypt
+
+from benchmarks.bench_utils import percentile
+from utils import pin_verifier
+from rag_agent.transfer_parser import parse_transfer_request
+
+PROBE_TEXT = "엄마한테 3만 5천원 보내줘"
+
+def _probe(stop, latencies, interval):
+    """다른 사용자의 가벼운 요청"""
+    while not stop.is_set():
+        t0 = time.perf_counter()
+        for _ in range(20):
+            parse_transfer_request(PROBE_TEXT)
+        latencies.append(time.perf_counter() - t0)
+        time.sleep(interval)
+
+def run(mode, storm_threads, duration, hashed, interval):
+    stop = threading.Event()
+    latencies = []
+    counters = {"logins": 0, "busy": 0, "throttled": 0}
+    lock = threading.Lock()
+
+    def storm(worker_id):
+        n = 0
+        while not stop.is_set():
+            n += 1
+            try:
+                if mode == "inline":
+                    bcrypt.checkpw(b"1234", hashed)
+                else:
+                    # 사용자마다 다른 키 -> 시도 제한이 아니라 풀/대기열 효과만 측정
+                    pin_verifier.verify_secret(f"storm-{worker_id}-{n}", "1234", hashed)
+                key = "logins"
+            except pin_verifier.VerifierBusy:
+                key = "busy"
+                time.sleep(0.01)
+            except pin_verifier.TooManyAttempts:
+                key = "throttled"
+            with lock:
+                counters[key] += 1
+
+    probe = threading.Thread(target=_probe, args=(stop, latencies, interval))
+    threads = [threading.Thread(target=storm, args=(i,)) for i in range(storm_threads)]
+    probe.start()
+    for t in threads:
+        t.start()
+    time.sleep(duration)
+    stop.set()
+    for t in threads + [probe]:
+        t.join()
+    return latencies, counters
+
+def baseline(duration, interval):
+    stop = threading.Event()
+    latencies = []
+    probe = threading.Thread(target=_probe, args=(stop, latencies, interval))
+    probe.start()
+    time.sleep(duration)
+    stop.set()
+    probe.join()
+    return latencies
+
+def report(name, latencies, counters=None, duration=None):
+    line = (f"📊 [{name}] 요청 {len(latencies)}건 p50 {percentile(latencies, 0.5) * 1000:.2f}ms "
+            f"p95 {percentile(latencies, 0.95) * 1000:.2f}ms p99 {percentile(latencies, 0.99) * 1000:.2f}ms "
+            f"max {max(latencies, default=0) * 1000:.2f}ms")
+    print(line)
+    if counters:
+        print(f"   로그인 {counters['logins']}건 ({counters['logins'] / duration:.1f}/s), "
+              f"대기열 초과 거절 {counters['busy']}건, 시도 제한 {counters['throttled']}건")
+
+def main():
+    parser = argparse.ArgumentParser(description="로그인 폭주 벤치마크")
+    parser.add_argument("--mode", choices=["inline", "pool", "both"], default="both")
+    parser.add_argument("--storm-threads", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--rounds", type=int, default=12, help="bcrypt cost (gensalt rounds)")
+    parser.add_argument("--interval", type=float, default=0.01, help="측정 요청 간격(초)")
+    args = parser.parse_args()
+
+    hashed = bcrypt.hashpw(b"1234", bcrypt.gensalt(rounds=args.rounds))
+    print(f"🏁 bcrypt rounds={args.rounds}, 폭주 스레드 {args.storm_threads}, "
+          f"워커 {pin_verifier.VERIFY_WORKERS}, 대기열 {pin_verifier.VERIFY_MAX_PENDING}")
+
+    report("baseline", baseline(min(args.duration, 3), args.interval))
+    modes = ["inline", "pool"] if args.mode == "both" else [args.mode]
+    for mode in modes:
+        latencies, counters = run(mode, args.storm_threads, args.duration, hashed, args.interval)
+        report(mode, latencies, counters, args.duration)
+    print(f"🔧 verifier stats: {pin_verifier.get_verifier_stats()}")
+
+if __name__ == "__main__":
+    main()
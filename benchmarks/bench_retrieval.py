@@ -0,0 +1,398 @@
+"""
+financial_terms 검색 품질/지연 벤치마크 (오프라인)
+
+1) 라벨 생성: terms 테이블에서 질의 -> 정답 용어 쌍을 만들어 benchmarks/data/retrieval_pairs.jsonl 에 저장
+   용어가 질의에 그대로 있는 유형
+     - paraphrase : "<용어>이 뭐야?", "<용어>의 의미를 알려줘" 등 표현 변형
+     - spaced     : 용어 중간에 띄어쓰기 (예: "기준 금리 뜻")
+     - typo       : 글자 누락/순서 바뀜이 있는 용어
+     - english    : 용어에 영문 약어가 있으면 "What is <약어>?"
+     - describe   : 정의 앞부분 그대로 (정의 본문과 글자가 같은 설명형 질의)
+   용어가 질의에 없는 유형 (용어 직접 일치/어휘 일치로는 맞힐 수 없음)
+     - masked     : 정의 중간 부분에서 용어/별칭을 지운 설명형 질의
+     - concept    : 사람이 쓴 풀어쓰기 질의 (benchmarks/data/retrieval_paraphrases.jsonl, 정의 문장과 다름)
+   (--from-index: DB 대신 저장된 어휘 인덱스의 용어/정의 사용)
+2) 임베딩 준비: --warm 으로 한 번만 임베딩 캐시(data/embedding_cache)를 채움 (네트워크 필요)
+3) 측정: 캐시된 임베딩만 사용하므로 네트워크 없이 실행
+     - 백엔드별 recall@1/3/5/10, MRR@10, 검색 지연 p50/p95
+       (vector = chroma/flat, lexical, hybrid(RRF) 비교 포함. R@3 은 유형별 / 용어 포함 여부별로도 따로 출력)
+     - 임계값별 웹 검색 전환율(채택 0건)과 채택 recall(정답이 채택 상위 3개 안)
+       pipeline = 실제 node_db_retrieve 순서 (용어 직접 일치 -> 벡터+BM25 RRF, flat 백엔드)
+
+사용 예)
+    python benchmarks/bench_retrieval.py --generate
+    python benchmarks/bench_retrieval.py --warm
+    python benchmarks/bench_retrieval.py --backends chroma,flat,flat_int8,lexical,hybrid,pipeline \\
+        --thresholds 0.4,0.5,0.6,0.7,0.8 --csv logs/bench_retrieval.csv
+"""
+import io
+import os
+import re
+import sys
+import csv
+import json
+import time
+import random
+import argparse
+import contextlib
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# finrag_agent 모듈 로드 시 생성되는 LLM/웹 검색 클라이언트는 사용하지 않음 (생성만 통과시키기 위한 값)
+os.environ.setdefault("OPENAI_API_KEY", "offline-benchmark")
+os.environ.setdefault("TAVILY_API_KEY", "offline-benchmark")
+
+from benchmarks.bench_utils import percentile
+from rag_agent import finrag_agent
+from rag_agent.embedding_cache import CachedEmbeddings
+from rag_agent.flat_index import FlatVectorStore, export_from_chroma, FLAT_INDEX_DIR
+from rag_agent.lexical_index import BM25Index, reciprocal_rank_fusion, LEXICAL_INDEX_PATH
+from rag_agent.term_index import TermIndex, normalize_term, term_aliases
+
+PAIRS_PATH = os.path.join(ROOT, "benchmarks", "data", "retrieval_pairs.jsonl")
+CONCEPTS_PATH = os.path.join(ROOT, "benchmarks", "data", "retrieval_paraphrases.jsonl")
+BACKENDS = ["chroma", "flat", "flat_int8", "lexical", "hybrid", "term", "pipeline"]
+VECTOR_BACKENDS = {"chroma", "flat", "flat_int8", "hybrid", "pipeline"}
+THRESHOLD_FREE = {"lexical", "term"}
+RECALL_AT = (1, 3, 5, 10)
+SEARCH_K = 10
+# node_db_retrieve 와 같은 값: 벡터 후보 5개 중 임계값 통과 문서를 최대 3개 채택
+CANDIDATE_K = 5
+ACCEPT_LIMIT = 3
+
+PARAPHRASES = [
+    "{word}이 뭐야?",
+    "{word}의 의미를 알려줘",
+    "{word} 뜻",
+    "{word}에 대해 쉽게 설명해줘",
+]
+_ASCII_TERM_RE = re.compile(r"[A-Za-z][A-Za-z0-9&.\-]{1,}")
+_HANGUL_WORD_RE = re.compile(r"[가-힣]{4,}")
+
+# ---------------------------------------------------------
+# 1) 라벨 생성
+# ---------------------------------------------------------
+def _typo(word, rng):
+    chars = list(word.replace(" ", ""))
+    if len(chars) < 3:
+        return None
+    i = rng.randrange(1, len(chars) - 1)
+    if rng.random() < 0.5:
+        del chars[i]
+    else:
+        chars[i], chars[i + 1] = chars[i + 1], chars[i]
+    typo = "".join(chars)
+    return typo if typo != word else None
+
+def contains_term(query, word) -> bool:
+    """질의에 용어명/별칭이 (띄어쓰기/대소문자 무시하고) 그대로 들어 있는지"""
+    text = normalize_term(query)
+    return any(alias in text for alias in term_aliases(word) | {normalize_term(word)} if alias)
+
+def _masked(word, definition):
+    """정의 중간 40자에서 용어/별칭을 지운 질의 (너무 짧아지면 None)"""
+    window = definition[len(definition) // 3:len(definition) // 3 + 40]
+    for alias in sorted(term_aliases(word) | {word}, key=len, reverse=True):
+        window = re.sub(re.escape(alias), " ", window, flags=re.I)
+    window = re.sub(r"\s+", " ", window).strip()
+    return window if len(window) >= 15 and not contains_term(window, word) else None
+
+def load_concepts(terms, path=CONCEPTS_PATH):
+    """사람이 쓴 풀어쓰기 질의 -> 용어 ID 연결 (용어집에 없는 용어/용어가 들어간 질의는 제외)"""
+    if not os.path.exists(path):
+        return []
+    index = TermIndex.from_records(
+        [str(t["id"]) for t in terms],
+        [f"{t['word']}: {t['definition']}" for t in terms],
+        [{"word": t["word"]} for t in terms],
+    )
+    pairs, skipped = [], []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            item = json.loads(line)
+            doc = index.lookup(item["word"])
+            if doc is None or contains_term(item["query"], doc.metadata["word"]):
+                skipped.append(item["word"])
+                continue
+            pairs.append({"kind": "concept", "query": item["query"], "term_id": doc.metadata["id"], "word": doc.metadata["word"]})
+    if skipped:
+        print(f"⚠️ concept 질의 {len(skipped)}건 제외 (용어집에 없음/용어 포함): {', '.join(skipped)}")
+    return pairs
+
+def generate_pairs(terms, per_term, seed):
+    rng = random.Random(seed)
+    pairs = []
+    for term in terms:
+        word, definition, term_id = term["word"], term["definition"], str(term["id"])
+        for template in rng.sample(PARAPHRASES, min(per_term, len(PARAPHRASES))):
+            pairs.append({"kind": "paraphrase", "query": template.format(word=word), "term_id": term_id, "word": word})
+        if _HANGUL_WORD_RE.fullmatch(word):
+            spaced = f"{word[:len(word) // 2]} {word[len(word) // 2:]} 뜻"
+            pairs.append({"kind": "spaced", "query": spaced, "term_id": term_id, "word": word})
+        typo = _typo(word, rng)
+        if typo:
+            pairs.append({"kind": "typo", "query": f"{typo} 뜻이 뭐야?", "term_id": term_id, "word": word})
+        english = _ASCII_TERM_RE.findall(word)
+        if english:
+            pairs.append({"kind": "english", "query": f"What is {english[0]}?", "term_id": term_id, "word": word})
+        definition = (definition or "").strip()
+        if len(definition) >= 20:
+            pairs.append({"kind": "describe", "query": definition[:40], "term_id": term_id, "word": word})
+        masked = _masked(word, definition) if len(definition) >= 60 else None
+        if masked:
+            pairs.append({"kind": "masked", "query": masked, "term_id": term_id, "word": word})
+    return pairs + load_concepts(terms)
+
+def load_terms(from_index):
+    if from_index:
+        index = BM25Index.load(LEXICAL_INDEX_PATH)
+        if index is None:
+            raise SystemExit(f"❌ 어휘 인덱스가 없습니다: {LEXICAL_INDEX_PATH}")
+        return [
+            {"id": doc_id, "word": word, "definition": content.split(":", 1)[1].strip() if ":" in content else content}
+            for doc_id, word, content in zip(index.ids, index.words, index.contents)
+        ]
+    from utils.handle_sql import get_data
+    return get_data("SELECT id, word, definition FROM terms WHERE definition IS NOT NULL")
+
+def load_pairs(path=PAIRS_PATH):
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+# ---------------------------------------------------------
+# 2) 검색 자원 준비
+# ---------------------------------------------------------
+def _open_chroma():
+    from langchain_chroma import Chroma
+    return Chroma(
+        persist_directory=str(finrag_agent.CHROMA_DB_PATH),
+        collection_name=finrag_agent.COLLECTION_NAME,
+        collection_metadata={"hnsw:space": "l2"},
+    )
+
+def prepare_resources(backends):
+    chroma = _open_chroma()
+    data = chroma.get(include=["documents", "metadatas"])
+    resources = {"chroma": chroma}
+    for dtype, name in (("f32", "flat"), ("int8", "flat_int8")):
+        if name in backends or (name == "flat" and {"hybrid", "pipeline"} & set(backends)):
+            if not FlatVectorStore.exists(FLAT_INDEX_DIR, dtype):
+                export_from_chroma(chroma, FLAT_INDEX_DIR, dtype)
+            resources[name] = FlatVectorStore(None, FLAT_INDEX_DIR, dtype)
+    lexical = BM25Index.load(LEXICAL_INDEX_PATH)
+    if lexical is None or len(lexical) != len(data["ids"]):
+        lexical = BM25Index.from_contents(data["ids"], data["documents"], data["metadatas"])
+    resources["lexical"] = lexical
+    resources["term"] = TermIndex.from_records(data["ids"], data["documents"], data["metadatas"])
+
+    # pipeline 은 finrag_agent 의 실제 채택 로직(fuse_results)을 그대로 사용
+    finrag_agent.vectorstore = resources.get("flat")
+    finrag_agent.lexical_index = lexical
+    finrag_agent.term_index = resources["term"]
+    return resources
+
+# ---------------------------------------------------------
+# 3) 백엔드별 검색: [(용어 ID, 거리 | None)] 순위 목록 (거리 오름차순 / 융합 순위)
+# ---------------------------------------------------------
+def rank(backend, resources, query, vector, k=SEARCH_K):
+    if backend == "chroma":
+        result = resources["chroma"]._collection.query(query_embeddings=[vector], n_results=k, include=["distances"])
+        return list(zip(result["ids"][0], result["distances"][0]))
+    if backend in ("flat", "flat_int8"):
+        store = resources[backend]
+        return [(store.ids[row], dist) for row, dist in store.search_vectors(vector, k)[0]]
+    if backend == "lexical":
+        return [(doc_id, None) for doc_id, _, _ in resources["lexical"].search(query, k)]
+    if backend == "term":
+        return [(str(doc.metadata["id"]), None) for doc in resources["term"].find_terms(query, limit=k)]
+    if backend == "hybrid":
+        store = resources["flat"]
+        vector_hits = [(store.ids[row], dist) for row, dist in store.search_vectors(vector, k)[0]]
+        lexical_hits = [doc_id for doc_id, _, _ in resources["lexical"].search(query, k)]
+        distances = dict(vector_hits)
+        fused = reciprocal_rank_fusion([[doc_id for doc_id, _ in vector_hits], lexical_hits])
+        return [(doc_id, distances.get(doc_id)) for doc_id, _ in fused[:k]]
+    if backend == "pipeline":
+        # node_db_retrieve 와 같은 순서: 용어 직접 일치가 있으면 그 결과, 없으면 hybrid
+        matched = rank("term", resources, query, vector, k)
+        return matched or rank("hybrid", resources, query, vector, k)
+    raise ValueError(backend)
+
+def accepted(backend, resources, query, vector, ranking, threshold):
+    """
+    임계값 적용 후 채택 문서 ID (웹 검색 전환 여부 판단용)
+    - hybrid   : 벡터 5개 + BM25 5개를 finrag_agent.fuse_results 로 채택 (거리 임계값 또는 용어명 일치 비율)
+    - pipeline : node_db_retrieve 순서 그대로 (용어 직접 일치가 있으면 그것만, 없으면 hybrid)
+    """
+    if backend == "pipeline":
+        matched = resources["term"].find_terms(query, limit=ACCEPT_LIMIT)
+        if matched:
+            return [str(doc.metadata["id"]) for doc in matched]
+        backend = "hybrid"
+    if backend == "hybrid":
+        finrag_agent.SIMILARITY_THRESHOLD = threshold
+        vector_results = resources["flat"].similarity_search_by_vectors([vector], CANDIDATE_K)[0]
+        docs = finrag_agent.fuse_results(vector_results, resources["lexical"].search(query, k=CANDIDATE_K))
+        return [finrag_agent._doc_key(doc) for doc, _ in docs[:ACCEPT_LIMIT]]
+    if backend == "lexical":
+        hits = resources["lexical"].search(query, k=CANDIDATE_K)
+        return [doc_id for doc_id, _, cov in hits if cov >= finrag_agent.LEXICAL_MIN_COVERAGE][:ACCEPT_LIMIT]
+    if backend == "term":
+        return [doc_id for doc_id, _ in ranking[:ACCEPT_LIMIT]]
+    return [doc_id for doc_id, dist in ranking[:CANDIDATE_K] if dist <= threshold][:ACCEPT_LIMIT]
+
+def evaluate(backend, resources, pairs, vectors, thresholds):
+    """순위 지표(recall@k, MRR, 지연) + 임계값별 웹 전환율/채택 recall -> CSV 행 목록"""
+    current = finrag_agent.SIMILARITY_THRESHOLD
+    # 어휘/용어 일치는 거리 임계값의 영향을 받지 않으므로 한 번만 계산
+    thresholds = thresholds if backend not in THRESHOLD_FREE else [None]
+    latencies, reciprocal = [], 0.0
+    hits = {k: 0 for k in RECALL_AT}
+    by_kind = {}
+    sweep = {t: {"fallback": 0, "hit": 0} for t in thresholds}
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        for pair in pairs:
+            query, expected = pair["query"], pair["term_id"]
+            vector = vectors.get(query)
+            t0 = time.perf_counter()
+            ranking = rank(backend, resources, query, vector)
+            latencies.append((time.perf_counter() - t0) * 1000)
+
+            ids = [doc_id for doc_id, _ in ranking]
+            position = ids.index(expected) + 1 if expected in ids else None
+            for k in RECALL_AT:
+                hits[k] += position is not None and position <= k
+            reciprocal += 1.0 / position if position else 0.0
+            for group in (pair["kind"], "term_free" if not contains_term(query, pair["word"]) else "with_term"):
+                stat = by_kind.setdefault(group, [0, 0])
+                stat[0] += position is not None and position <= 3
+                stat[1] += 1
+
+            for threshold in thresholds:
+                chosen = accepted(backend, resources, query, vector, ranking, threshold)
+                sweep[threshold]["fallback"] += not chosen
+                sweep[threshold]["hit"] += expected in chosen
+    finrag_agent.SIMILARITY_THRESHOLD = current
+
+    n = len(pairs)
+    summary = {
+        "backend": backend,
+        "queries": n,
+        **{f"recall@{k}": round(hits[k] / n, 4) for k in RECALL_AT},
+        "mrr@10": round(reciprocal / n, 4),
+        "p50_ms": round(percentile(latencies, 0.5), 3),
+        "p95_ms": round(percentile(latencies, 0.95), 3),
+        **{
+            f"recall@3_{group}": round(by_kind[group][0] / by_kind[group][1], 4) if group in by_kind else None
+            for group in ("with_term", "term_free")
+        },
+    }
+    groups = {name: stat for name, stat in by_kind.items() if name not in ("with_term", "term_free")}
+    kinds = ", ".join(f"{name} {h / c:.1%}" for name, (h, c) in sorted(groups.items()))
+    split = ", ".join(
+        f"{label} {by_kind[group][0] / by_kind[group][1]:.1%} ({by_kind[group][1]}건)"
+        for group, label in (("with_term", "용어 포함"), ("term_free", "용어 없음")) if group in by_kind
+    )
+    print(f"📊 [{backend:<9}] " + " ".join(f"R@{k} {hits[k] / n:.1%}" for k in RECALL_AT)
+          + f" MRR {reciprocal / n:.3f} | p50 {summary['p50_ms']:.3f}ms p95 {summary['p95_ms']:.3f}ms")
+    print(f"     R@3 유형별: {kinds}")
+    print(f"     R@3 용어 포함 여부별: {split}")
+
+    rows = []
+    for threshold in thresholds:
+        fallback = sweep[threshold]["fallback"] / n
+        accepted_recall = sweep[threshold]["hit"] / n
+        rows.append(dict(summary, threshold=threshold, fallback_rate=round(fallback, 4),
+                         accepted_recall=round(accepted_recall, 4)))
+        label = "임계값 없음" if threshold is None else f"임계값 {threshold:.2f}"
+        marker = " <- 현재 설정" if threshold == current else ""
+        print(f"     {label}: 웹 전환 {fallback:.1%}, 채택 recall@{ACCEPT_LIMIT} {accepted_recall:.1%}{marker}")
+    return rows
+
+# ---------------------------------------------------------
+# 실행
+# ---------------------------------------------------------
+def main():
+    global CANDIDATE_K, ACCEPT_LIMIT
+    parser = argparse.ArgumentParser(description="financial_terms 검색 품질/지연 벤치마크")
+    parser.add_argument("--generate", action="store_true", help="라벨 쌍 생성 후 종료")
+    parser.add_argument("--from-index", action="store_true", help="DB 대신 저장된 어휘 인덱스로 라벨 생성")
+    parser.add_argument("--per-term", type=int, default=2, help="용어당 표현 변형 질의 수")
+    parser.add_argument("--warm", action="store_true", help="라벨 질의 임베딩을 캐시에 채운 뒤 종료 (네트워크 필요)")
+    parser.add_argument("--pairs", default=PAIRS_PATH)
+    parser.add_argument("--sample", type=int, default=0, help="라벨 쌍 일부만 사용 (0이면 전체)")
+    parser.add_argument("--backends", default=",".join(BACKENDS))
+    parser.add_argument("--thresholds", default="0.4,0.5,0.6,0.7,0.8")
+    parser.add_argument("--candidate-k", type=int, default=CANDIDATE_K, help="벡터/BM25 후보 수 (node_db_retrieve: 5)")
+    parser.add_argument("--accept", type=int, default=ACCEPT_LIMIT, help="채택 문서 최대 수 (node_db_retrieve: 3)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--csv", help="백엔드 x 임계값 결과 CSV 경로")
+    args = parser.parse_args()
+
+    if args.generate:
+        pairs = generate_pairs(load_terms(args.from_index), args.per_term, args.seed)
+        os.makedirs(os.path.dirname(os.path.abspath(args.pairs)), exist_ok=True)
+        with open(args.pairs, "w", encoding="utf-8") as f:
+            for pair in pairs:
+                f.write(json.dumps(pair, ensure_ascii=False) + "\n")
+        kinds = {}
+        for pair in pairs:
+            kinds[pair["kind"]] = kinds.get(pair["kind"], 0) + 1
+        print(f"💾 라벨 {len(pairs)}건 저장 {kinds}: {args.pairs}")
+        return
+
+    pairs = load_pairs(args.pairs)
+    if args.sample:
+        pairs = random.Random(args.seed).sample(pairs, min(args.sample, len(pairs)))
+
+    if args.warm:
+        from langchain_openai import OpenAIEmbeddings
+        cache = CachedEmbeddings(OpenAIEmbeddings(model=finrag_agent.EMBEDDING_MODEL), finrag_agent.EMBEDDING_MODEL)
+        queries = [pair["query"] for pair in pairs]
+        for i in range(0, len(queries), 100):
+            cache.embed_queries(queries[i:i + 100])
+        print(f"✅ 임베딩 캐시 준비 완료 ({len(queries)}건)")
+        return
+
+    backends = [b.strip() for b in args.backends.split(",") if b.strip()]
+    unknown = set(backends) - set(BACKENDS)
+    if unknown:
+        raise SystemExit(f"❌ 알 수 없는 백엔드: {', '.join(sorted(unknown))}")
+    thresholds = [float(t) for t in args.thresholds.split(",")]
+    CANDIDATE_K, ACCEPT_LIMIT = args.candidate_k, args.accept
+
+    # 캐시된 임베딩만 사용 (API 호출 없음) -> 벡터가 없는 질의는 모든 백엔드에서 같이 제외
+    vectors = {}
+    if VECTOR_BACKENDS & set(backends):
+        cache = CachedEmbeddings(None, finrag_agent.EMBEDDING_MODEL)
+        for pair in pairs:
+            vector = cache.lookup(pair["query"])
+            if vector is not None:
+                vectors[pair["query"]] = vector.tolist()
+        skipped = len(pairs) - len([p for p in pairs if p["query"] in vectors])
+        pairs = [p for p in pairs if p["query"] in vectors]
+        if skipped:
+            print(f"⚠️ 캐시된 임베딩이 없는 질의 {skipped}건 제외 (--warm 으로 채울 수 있음)")
+    if not pairs:
+        raise SystemExit("❌ 평가할 라벨 쌍이 없습니다.")
+
+    resources = prepare_resources(backends)
+    print(f"🏁 라벨 {len(pairs)}건, 백엔드 {backends}, 임계값 {thresholds}, 후보 k={CANDIDATE_K}, 채택 {ACCEPT_LIMIT}개")
+    rows = []
+    for backend in backends:
+        rows.extend(evaluate(backend, resources, pairs, vectors, thresholds))
+
+    if args.csv:
+        os.makedirs(os.path.dirname(os.path.abspath(args.csv)), exist_ok=True)
+        with open(args.csv, "w", newline="", encoding="utf-8") as f:
+            writer = csv.DictWriter(f, fieldnames=list(rows[0]))
+            writer.writeheader()
+            writer.writerows(rows)
+        print(f"💾 결과 저장: {args.csv} ({len(rows)}행)")
+
+if __name__ == "__main__":
+    main()
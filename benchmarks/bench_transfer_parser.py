@@ -0,0 +1,106 @@
+"""
+송금 문장 파서 정확도/속도 벤치마크
+
+정답 코퍼스(benchmarks/data/transfer_parser_corpus.jsonl)에 대해
+  - 필드별 정확도 (target / amount / currency)
+  - 전체 일치율, 로컬 처리율(LLM 없이 target+amount를 모두 찾은 비율)
+  - 오답 확정률: 로컬에서 완결했지만 틀린 비율 (LLM 폴백도 못 타는 위험한 경우)
+  - 건당 파싱 시간
+을 출력합니다. "batch" 필드가 있는 케이스는 일괄 송금 파서(parse_batch_request)의
+대상/금액/통화 목록 일치율로 따로 측정합니다. --llm 을 주면 같은 코퍼스로 LLM 추출(_invoke_transfer_extract)도 측정합니다.
+
+사용 예)
+    python benchmarks/bench_transfer_parser.py
+    python benchmarks/bench_transfer_parser.py --llm --verbose
+"""
+import os
+import sys
+import json
+import time
+import argparse
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from rag_agent.transfer_parser import parse_transfer_request, is_complete
+from rag_agent.batch_transfer import parse_batch_request
+
+CORPUS_PATH = os.path.join(ROOT, "benchmarks", "data", "transfer_parser_corpus.jsonl")
+FIELDS = ("target", "amount", "currency")
+
+def load_corpus(path=CORPUS_PATH):
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+def _same(field, expected, actual):
+    if field == "amount":
+        if expected is None or actual is None:
+            return expected is None and actual is None
+        return abs(float(expected) - float(actual)) < 1e-6
+    return expected == actual
+
+def evaluate(name, extract, corpus, verbose=False):
+    correct = {f: 0 for f in FIELDS}
+    exact = complete = wrong_complete = 0
+    elapsed = 0.0
+    for case in corpus:
+        t0 = time.perf_counter()
+        result = extract(case["text"])
+        elapsed += time.perf_counter() - t0
+        matches = {f: _same(f, case[f], result.get(f)) for f in FIELDS}
+        for f in FIELDS:
+            correct[f] += matches[f]
+        ok = all(matches.values())
+        exact += ok
+        if is_complete(result):
+            complete += 1
+            wrong_complete += not ok
+        if verbose and not ok:
+            print(f"  ✗ {case['text']!r}: {result} (정답 {[case[f] for f in FIELDS]})")
+
+    n = len(corpus)
+    print(f"📊 [{name}] {n}건")
+    for f in FIELDS:
+        print(f"   {f:<9} {correct[f] / n:6.1%}")
+    print(f"   전체 일치 {exact / n:6.1%} / 로컬 완결 {complete / n:6.1%} / 오답 확정 {wrong_complete / n:6.1%}")
+    print(f"   평균 {elapsed / n * 1e6:,.1f}µs/건")
+
+def batch_fields(requests):
+    return [(r["target"], float(r["amount"]), r["currency"]) for r in requests]
+
+def evaluate_batch(corpus, verbose=False):
+    exact = 0
+    elapsed = 0.0
+    for case in corpus:
+        t0 = time.perf_counter()
+        result = parse_batch_request(case["text"])
+        elapsed += time.perf_counter() - t0
+        ok = batch_fields(result) == batch_fields(case["batch"])
+        exact += ok
+        if verbose and not ok:
+            print(f"  ✗ {case['text']!r}: {batch_fields(result)} (정답 {batch_fields(case['batch'])})")
+
+    n = len(corpus)
+    print(f"📊 [batch parser] {n}건")
+    print(f"   전체 일치 {exact / n:6.1%}")
+    print(f"   평균 {elapsed / n * 1e6:,.1f}µs/건")
+
+def main():
+    parser = argparse.ArgumentParser(description="송금 문장 파서 벤치마크")
+    parser.add_argument("--corpus", default=CORPUS_PATH)
+    parser.add_argument("--llm", action="store_true", help="LLM 추출도 함께 측정 (API 호출 발생)")
+    parser.add_argument("--verbose", action="store_true", help="틀린 케이스 출력")
+    args = parser.parse_args()
+
+    corpus = load_corpus(args.corpus)
+    single = [case for case in corpus if "batch" not in case]
+    batch = [case for case in corpus if "batch" in case]
+    evaluate("local parser", parse_transfer_request, single, args.verbose)
+    if batch:
+        evaluate_batch(batch, args.verbose)
+    if args.llm:
+        from rag_agent.transfer_agent import _invoke_transfer_extract
+        evaluate("LLM extract", _invoke_transfer_extract, single, args.verbose)
+
+if __name__ == "__main__":
+    main()
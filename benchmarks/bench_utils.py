@@ -0,0 +1,14 @@
+"""
+벤치마크 스크립트 공용 함수
+
+각 스크립트는 프로젝트 루트를 sys.path 에 넣은 뒤
+    from benchmarks.bench_utils import percentile
+로 가져옵니다.
+"""
+
+def percentile(values, p):
+    """정렬 후 p 위치 값 (0 <= p <= 1, 빈 목록이면 0.0)"""
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))]
@@ -0,0 +1,330 @@
+"""
+송금 대화 부하 생성기 (가짜 LLM + 로컬 DB 전용)
+
+run_fintech_agent(..., transfer_context=...) 로 여러 턴짜리 송금 대화를 동시에 진행합니다.
+    요청("엄마한테 보내줘") -> NEED_INFO -> 금액 -> CONFIRM -> __YES__ -> NEED_PASSWORD -> PIN -> SUCCESS
+턴 사이의 컨텍스트는 app.py 와 같이 serialize_context 로 직렬화한 문자열로 넘깁니다.
+
+- LLM: main_agent / transfer_agent 모듈의 llm 을 프롬프트 종류별로 고정 응답을 주는 가짜로 교체
+        (--llm-latency 로 응답 지연을 흉내냄, 외부 API 호출 없음)
+- DB : 실제 로컬 DB 사용 -> 단계별 쿼리 수/시간은 sql_metrics 트레이스로 수집
+- 보고: 단계별 지연 분포(p50/p95/p99/max), 단계별 DB 왕복 수, bcrypt 시간 비중,
+        실패 건수, 잔액/원장 불변식(갱신 손실) 검사, --slo-p95 기준 통과 여부
+- --csv 로 단계별 측정값을 내보내 추세 비교에 사용
+
+PIN 시도 제한은 사용자 단위이므로 동시 대화 수만큼 테스트 사용자를 주는 것이 좋습니다.
+(사용자가 적으면 AUTH_MAX_ATTEMPTS 환경 변수를 올려서 실행)
+실행 후에는 시작 잔액을 복원하고 테스트로 생긴 원장/멱등성 키 행을 삭제합니다. (--keep 으로 유지)
+
+사용 예)
+    python benchmarks/load_transfer.py --users tester1,tester2,tester3,tester4 --pin 1234 \\
+        --conversations 200 --concurrency 8 --llm-latency 300 --csv logs/load_transfer.csv
+"""
+import io
+import os
+import re
+import sys
+import csv
+import json
+import time
+import argparse
+import threading
+import contextlib
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# 가짜 LLM으로 교체하므로 실제 키는 필요 없음 (클라이언트 생성만 통과시키기 위한 값)
+os.environ.setdefault("OPENAI_API_KEY", "load-test")
+os.environ.setdefault("TAVILY_API_KEY", "load-test")
+
+from langchain_core.messages import AIMessage
+from langchain_core.runnables import RunnableLambda
+
+from benchmarks.bench_utils import percentile
+from utils.handle_sql import get_data, execute_query, use_primary
+from utils.sql_metrics import query_trace
+from rag_agent import main_agent, transfer_agent
+from rag_agent.main_agent import run_fintech_agent
+from rag_agent.transfer_context import serialize_context
+from rag_agent.transfer_parser import parse_transfer_request
+
+# (단계 이름, 기대 상태)
+STEPS = [
+    ("request", "NEED_INFO"),
+    ("amount", "CONFIRM"),
+    ("confirm", "NEED_PASSWORD"),
+    ("pin", "SUCCESS"),
+]
+CSV_FIELDS = [
+    "conversation", "username", "step", "status", "expected", "ok",
+    "latency_ms", "db_queries", "db_ms", "bcrypt_ms", "llm_calls", "error",
+]
+
+# 단계 하나 동안의 LLM 호출 수 / bcrypt 시간 (대화마다 스레드 하나)
+_step = threading.local()
+
+def _step_add(name, value):
+    setattr(_step, name, getattr(_step, name, 0) + value)
+
+# ---------------------------------------------------------
+# 가짜 LLM (프롬프트 종류별 고정 응답)
+# ---------------------------------------------------------
+_USER_INPUT_RE = re.compile(r"User Input:\s*(.*?)\s*(?:\n#|\Z)", re.S)
+_CURRENT_QUESTION_RE = re.compile(r"# Current Question\s*(.*?)\s*\n# ", re.S)
+_EXTRACT_INPUT_RE = re.compile(r"# User Input\s*(.*?)\s*\Z", re.S)
+
+def _fake_answer(prompt: str) -> str:
+    if "Intent Classifier" in prompt:
+        return "TRANSFER"
+    if "linguistic expert" in prompt:
+        match = _USER_INPUT_RE.search(prompt)
+        text = match.group(1) if match else ""
+        return json.dumps({"source_language": "Korean", "korean_query": text}, ensure_ascii=False)
+    if "Context Resolution Expert" in prompt:
+        match = _CURRENT_QUESTION_RE.search(prompt)
+        return match.group(1) if match else ""
+    if "Extract transfer details" in prompt:
+        match = _EXTRACT_INPUT_RE.search(prompt)
+        return json.dumps(parse_transfer_request(match.group(1) if match else ""), ensure_ascii=False)
+    if "best matching 'Name'" in prompt:
+        return "NONE"
+    return ""
+
+def make_fake_llm(latency_ms: float):
+    def invoke(prompt_value):
+        _step_add("llm_calls", 1)
+        if latency_ms:
+            time.sleep(latency_ms / 1000)
+        text = prompt_value.to_string() if hasattr(prompt_value, "to_string") else str(prompt_value)
+        return AIMessage(content=_fake_answer(text))
+    return RunnableLambda(invoke)
+
+def _timed_verify(verify):
+    def wrapper(*args, **kwargs):
+        t0 = time.perf_counter()
+        try:
+            return verify(*args, **kwargs)
+        finally:
+            _step_add("bcrypt_ms", (time.perf_counter() - t0) * 1000)
+    return wrapper
+
+# ---------------------------------------------------------
+# 대화 실행
+# ---------------------------------------------------------
+def run_conversation(conversation_id, user, pin, amount, think_s):
+    """한 대화의 단계별 측정값 리스트와 성공 시 원화 금액을 반환"""
+    inputs = [f"{user['target']}한테 보내줘", f"{int(amount)}원", "__YES__", pin]
+    context = None
+    rows = []
+    debited = 0.0
+    for (step, expected), text in zip(STEPS, inputs):
+        _step.llm_calls = 0
+        _step.bcrypt_ms = 0.0
+        error = None
+        t0 = time.perf_counter()
+        with query_trace("load_transfer") as trace:
+            try:
+                result = run_fintech_agent(text, user["username"], transfer_context=context)
+            except Exception as e:
+                result, error = {}, str(e)
+        latency_ms = (time.perf_counter() - t0) * 1000
+
+        status = result.get("status") if isinstance(result, dict) else None
+        if error is None and status != expected:
+            error = (result.get("message") if isinstance(result, dict) else str(result)) or ""
+        rows.append({
+            "conversation": conversation_id,
+            "username": user["username"],
+            "step": step,
+            "status": status,
+            "expected": expected,
+            "ok": status == expected,
+            "latency_ms": round(latency_ms, 3),
+            "db_queries": len(trace),
+            "db_ms": round(sum(r["total_ms"] for r in trace), 3),
+            "bcrypt_ms": round(_step.bcrypt_ms, 3),
+            "llm_calls": _step.llm_calls,
+            "error": error,
+        })
+        if status != expected:
+            break
+        if step == "amount":
+            debited = float(result["context"].amount_krw)
+        context = serialize_context(result.get("context"))
+        if think_s:
+            time.sleep(think_s)
+    else:
+        return rows, debited
+    return rows, 0.0
+
+# ---------------------------------------------------------
+# 준비 / 불변식 검사 / 복원
+# ---------------------------------------------------------
+def load_users(usernames):
+    users = []
+    for username in usernames:
+        profile = transfer_agent.load_transfer_profile(username)
+        if profile is None or profile.account_id is None or not profile.contacts or not profile.pin_hash:
+            raise SystemExit(f"❌ {username}: 회원/주계좌/연락처/PIN 중 없는 항목이 있습니다.")
+        users.append({
+            "username": username,
+            "account_id": profile.account_id,
+            "target": profile.contacts[0]["contact_name"],
+        })
+    return users
+
+def _snapshot(account_ids):
+    with use_primary():
+        balances = {
+            row["account_id"]: float(row["balance"])
+            for row in get_data(
+                f"SELECT account_id, balance FROM accounts WHERE account_id IN ({', '.join(['%s'] * len(account_ids))})",
+                tuple(account_ids),
+            )
+        }
+        max_id = int(get_data("SELECT COALESCE(MAX(transaction_id), 0) AS max_id FROM ledger")[0]["max_id"])
+        started_at = get_data("SELECT NOW() AS now")[0]["now"]
+    return balances, max_id, started_at
+
+def check_invariants(start_balances, start_ledger_id, debited, successes):
+    """계좌별 최종 잔액/원장 행 수를 성공한 송금과 비교해 위반 목록을 반환"""
+    violations = []
+    end_balances, _, _ = _snapshot(list(start_balances))
+    for account_id, start in start_balances.items():
+        with use_primary():
+            ledger_rows = int(get_data(
+                "SELECT COUNT(*) AS cnt FROM ledger WHERE account_id = %s AND transaction_id > %s",
+                (account_id, start_ledger_id),
+            )[0]["cnt"])
+        expected = round(start - debited.get(account_id, 0.0), 2)
+        end = end_balances[account_id]
+        print(f"💰 계좌 {account_id}: 최종 {end:,.0f}원 (기대값 {expected:,.0f}원), "
+              f"원장 {ledger_rows}건 / 성공 {successes.get(account_id, 0)}건")
+        if abs(end - expected) > 0.005:
+            violations.append(f"계좌 {account_id} 잔액 불일치 {end - expected:+,.2f}원")
+        if ledger_rows != successes.get(account_id, 0):
+            violations.append(f"계좌 {account_id} 원장 행 수 불일치 ({ledger_rows} != {successes.get(account_id, 0)})")
+        if end < 0:
+            violations.append(f"계좌 {account_id} 음수 잔액")
+    return violations
+
+def restore(start_balances, start_ledger_id, started_at):
+    for account_id, balance in start_balances.items():
+        execute_query("DELETE FROM ledger WHERE account_id = %s AND transaction_id > %s", (account_id, start_ledger_id))
+        execute_query(
+            "DELETE FROM transfer_requests WHERE account_id = %s AND created_at >= %s",
+            (account_id, started_at),
+        )
+        execute_query("UPDATE accounts SET balance = %s WHERE account_id = %s", (balance, account_id))
+    print("🧹 잔액/원장/멱등성 키 복원 완료")
+
+# ---------------------------------------------------------
+# 보고
+# ---------------------------------------------------------
+def report(rows, elapsed, conversations, slo_p95_ms):
+    """단계별 지연/DB 왕복/bcrypt 비중을 출력하고 SLO 위반 단계 목록을 반환"""
+    slo_violations = []
+    for step, _ in STEPS:
+        step_rows = [r for r in rows if r["step"] == step]
+        if not step_rows:
+            continue
+        latencies = [r["latency_ms"] for r in step_rows]
+        total_ms = sum(latencies)
+        p95 = percentile(latencies, 0.95)
+        print(f"📊 [{step:<7}] {len(step_rows)}건 실패 {sum(1 for r in step_rows if not r['ok'])} | "
+              f"p50 {percentile(latencies, 0.5):.1f}ms p95 {p95:.1f}ms p99 {percentile(latencies, 0.99):.1f}ms "
+              f"max {max(latencies):.1f}ms | DB {sum(r['db_queries'] for r in step_rows) / len(step_rows):.1f}회 "
+              f"{sum(r['db_ms'] for r in step_rows) / len(step_rows):.1f}ms | "
+              f"LLM {sum(r['llm_calls'] for r in step_rows) / len(step_rows):.1f}회 | "
+              f"bcrypt {sum(r['bcrypt_ms'] for r in step_rows) / total_ms * 100 if total_ms else 0:.1f}%")
+        if slo_p95_ms and p95 > slo_p95_ms:
+            slo_violations.append(f"{step} p95 {p95:.1f}ms > {slo_p95_ms:.0f}ms")
+
+    total_ms = sum(r["latency_ms"] for r in rows)
+    completed = sum(1 for r in rows if r["step"] == STEPS[-1][0] and r["ok"])
+    print(f"⏱️ {elapsed:.2f}s, 대화 {completed}/{conversations}건 완료 ({completed / elapsed:.2f} 대화/s), "
+          f"전체 처리 시간 중 bcrypt {sum(r['bcrypt_ms'] for r in rows) / total_ms * 100 if total_ms else 0:.1f}%, "
+          f"DB {sum(r['db_ms'] for r in rows) / total_ms * 100 if total_ms else 0:.1f}%")
+
+    failures = {}
+    for r in rows:
+        if not r["ok"]:
+            key = f"{r['step']}:{r['status']}"
+            failures[key] = failures.get(key, 0) + 1
+    if failures:
+        print(f"⚠️ 실패 {failures}")
+        for r in [r for r in rows if not r["ok"]][:5]:
+            print(f"   - #{r['conversation']} {r['username']} {r['step']}: {r['error']}")
+    return slo_violations
+
+def write_csv(path, rows):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=CSV_FIELDS)
+        writer.writeheader()
+        writer.writerows(rows)
+    print(f"💾 단계별 측정값 저장: {path} ({len(rows)}행)")
+
+def main():
+    parser = argparse.ArgumentParser(description="송금 대화 부하 생성기")
+    parser.add_argument("--users", required=True, help="쉼표로 구분한 테스트 사용자 (PIN이 모두 같아야 함)")
+    parser.add_argument("--pin", required=True)
+    parser.add_argument("--conversations", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--amount", type=float, default=1000, help="대화당 송금액(원)")
+    parser.add_argument("--llm-latency", type=float, default=300, help="가짜 LLM 응답 지연(ms)")
+    parser.add_argument("--think", type=float, default=0, help="턴 사이 대기(ms)")
+    parser.add_argument("--slo-p95", type=float, default=0, help="단계별 p95 목표(ms), 0이면 검사 안 함")
+    parser.add_argument("--csv", help="단계별 측정값 CSV 경로")
+    parser.add_argument("--keep", action="store_true", help="잔액/원장 복원하지 않음")
+    parser.add_argument("--verbose", action="store_true", help="에이전트 로그 출력")
+    args = parser.parse_args()
+
+    fake_llm = make_fake_llm(args.llm_latency)
+    main_agent.llm = fake_llm
+    transfer_agent.llm = fake_llm
+    transfer_agent.verify_secret = _timed_verify(transfer_agent.verify_secret)
+
+    users = load_users([u.strip() for u in args.users.split(",") if u.strip()])
+    account_ids = sorted({u["account_id"] for u in users})
+    start_balances, start_ledger_id, started_at = _snapshot(account_ids)
+    print(f"🏁 대화 {args.conversations}건, 동시 {args.concurrency}, 사용자 {len(users)}명 / 계좌 {len(account_ids)}개, "
+          f"가짜 LLM 지연 {args.llm_latency:.0f}ms")
+
+    def one(i):
+        return run_conversation(i, users[i % len(users)], args.pin, args.amount, args.think / 1000)
+
+    # 에이전트의 단계별 print 로그는 기본적으로 숨김 (sys.stdout 교체라 모든 스레드에 적용)
+    sink = contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(io.StringIO())
+    t0 = time.perf_counter()
+    with sink, ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        results = list(pool.map(one, range(args.conversations)))
+    elapsed = time.perf_counter() - t0
+
+    rows = [row for conversation_rows, _ in results for row in conversation_rows]
+    debited, successes = {}, {}
+    for i, (conversation_rows, amount_krw) in enumerate(results):
+        if amount_krw:
+            account_id = users[i % len(users)]["account_id"]
+            debited[account_id] = debited.get(account_id, 0.0) + amount_krw
+            successes[account_id] = successes.get(account_id, 0) + 1
+
+    slo_violations = report(rows, elapsed, args.conversations, args.slo_p95)
+    if args.csv:
+        write_csv(args.csv, rows)
+
+    violations = check_invariants(start_balances, start_ledger_id, debited, successes)
+    if not args.keep:
+        restore(start_balances, start_ledger_id, started_at)
+
+    if violations:
+        print("❌ 불변식 위반(갱신 손실 등): " + ", ".join(violations))
+    if slo_violations:
+        print("❌ SLO 미달: " + ", ".join(slo_violations))
+    if violations or slo_violations:
+        sys.exit(1)
+    print("🎉 불변식/SLO 통과")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+"""
+동시 송금 스트레스 테스트 (로컬 DB 전용)
+
+같은 계좌에서 여러 스레드가 동시에 송금을 실행한 뒤 불변식을 검사합니다.
+  - 최종 잔액 == 시작 잔액 - 성공 건수 * 금액   (갱신 손실 없음)
+  - 새 원장 행 수 == 성공 건수, balance_after 값이 모두 다름
+  - 잔액이 음수가 되지 않음
+
+--mode legacy 는 예전 방식(잔액 읽기 -> 파이썬 계산 -> UPDATE)을 재현해 비교용으로 실행합니다.
+실행 후에는 시작 잔액을 복원하고 테스트로 생긴 원장 행을 삭제합니다. (--keep 으로 유지)
+run_stress / check_invariants 는 tests/test_transfer_concurrency.py 에서도 사용합니다.
+
+사용 예)
+    python benchmarks/stress_transfer.py --account-id 1 --contact-id 1 --workers 16 --transfers 200 --amount 1000
+"""
+import os
+import sys
+import time
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.bench_utils import percentile
+from utils.handle_sql import get_data, execute_query, use_primary
+from utils.transfer_executor import execute_transfer, LEDGER_SQL
+
+def _balance(account_id):
+    with use_primary():
+        return float(get_data("SELECT balance FROM accounts WHERE account_id = %s", (account_id,))[0]["balance"])
+
+def _max_ledger_id():
+    with use_primary():
+        row = get_data("SELECT COALESCE(MAX(transaction_id), 0) AS max_id FROM ledger")[0]
+    return int(row["max_id"])
+
+def _legacy_transfer(account_id, contact_id, amount):
+    """수정 전 process_transfer의 흐름 (읽기와 쓰기가 별도 문장)"""
+    with use_primary():
+        balance = float(get_data("SELECT balance FROM accounts WHERE account_id = %s", (account_id,))[0]["balance"])
+    if balance < amount:
+        return {"ok": False, "reason": "INSUFFICIENT_FUNDS"}
+    new_balance = balance - amount
+    execute_query("UPDATE accounts SET balance = %s WHERE account_id = %s", (new_balance, account_id))
+    execute_query(LEDGER_SQL, (account_id, contact_id, -amount, new_balance, 1.0, amount, "KRW"))
+    return {"ok": True, "reason": None}
+
+def check_invariants(start_balance, end_balance, amount, successes, ledger_rows) -> list:
+    """불변식 위반 목록 (비어 있으면 통과). ledger_rows: 테스트 중 새로 생긴 원장 행 [{"balance_after"}]"""
+    expected = start_balance - successes * amount
+    lost_updates = round((end_balance - expected) / amount) if amount else 0
+    duplicate_after = len(ledger_rows) - len({float(r["balance_after"]) for r in ledger_rows})
+
+    violations = []
+    if abs(end_balance - expected) > 0.005:
+        violations.append(f"갱신 손실 {lost_updates}건")
+    if len(ledger_rows) != successes:
+        violations.append(f"원장 행 수 불일치 ({len(ledger_rows)} != {successes})")
+    if duplicate_after:
+        violations.append(f"balance_after 중복 {duplicate_after}건")
+    if end_balance < 0 or any(float(r["balance_after"]) < 0 for r in ledger_rows):
+        violations.append("음수 잔액")
+    return violations
+
+def run_stress(account_id, contact_id, workers=16, transfers=200, amount=1000.0, mode="atomic", restore=True) -> dict:
+    """
+    같은 계좌에서 동시에 송금하고 불변식을 검사한 결과를 반환 (restore=True 면 잔액/원장 복원)
+    반환: {"start_balance", "end_balance", "expected", "successes", "failures", "ledger_rows",
+           "latencies", "elapsed", "violations"}
+    """
+    start_balance = _balance(account_id)
+    start_ledger_id = _max_ledger_id()
+
+    def one(_):
+        t0 = time.perf_counter()
+        try:
+            if mode == "atomic":
+                outcome = execute_transfer(account_id, contact_id, amount, 1.0, amount, "KRW")
+            else:
+                outcome = _legacy_transfer(account_id, contact_id, amount)
+            return outcome["ok"], outcome["reason"], time.perf_counter() - t0
+        except Exception as e:
+            return False, f"EXCEPTION: {e}", time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(one, range(transfers)))
+        elapsed = time.perf_counter() - t0
+
+        successes = sum(1 for ok, _, _ in results if ok)
+        failures = {}
+        for ok, reason, _ in results:
+            if not ok:
+                failures[reason] = failures.get(reason, 0) + 1
+
+        end_balance = _balance(account_id)
+        with use_primary():
+            ledger_rows = get_data(
+                "SELECT transaction_id, balance_after FROM ledger WHERE account_id = %s AND transaction_id > %s",
+                (account_id, start_ledger_id),
+            )
+    finally:
+        if restore:
+            execute_query("DELETE FROM ledger WHERE account_id = %s AND transaction_id > %s", (account_id, start_ledger_id))
+            execute_query("UPDATE accounts SET balance = %s WHERE account_id = %s", (start_balance, account_id))
+
+    return {
+        "start_balance": start_balance,
+        "end_balance": end_balance,
+        "expected": start_balance - successes * amount,
+        "successes": successes,
+        "failures": failures,
+        "ledger_rows": ledger_rows,
+        "latencies": sorted(lat for _, _, lat in results),
+        "elapsed": elapsed,
+        "violations": check_invariants(start_balance, end_balance, amount, successes, ledger_rows),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="동시 송금 스트레스 테스트")
+    parser.add_argument("--account-id", type=int, required=True)
+    parser.add_argument("--contact-id", type=int, required=True)
+    parser.add_argument("--workers", type=int, default=16)
+    parser.add_argument("--transfers", type=int, default=200)
+    parser.add_argument("--amount", type=float, default=1000)
+    parser.add_argument("--mode", choices=["atomic", "legacy"], default="atomic")
+    parser.add_argument("--keep", action="store_true", help="잔액/원장 복원하지 않음")
+    args = parser.parse_args()
+
+    print(f"🏁 {args.transfers}건 x {args.amount:,.0f}원, 동시 {args.workers} ({args.mode})")
+    result = run_stress(args.account_id, args.contact_id, args.workers, args.transfers, args.amount,
+                        args.mode, restore=not args.keep)
+    latencies, elapsed, ledger_rows = result["latencies"], result["elapsed"], result["ledger_rows"]
+
+    print(f"⏱️ {elapsed:.2f}s ({args.transfers / elapsed:.1f} tps), "
+          f"p50 {percentile(latencies, 0.5) * 1000:.1f}ms, p99 {percentile(latencies, 0.99) * 1000:.1f}ms")
+    print(f"✅ 성공 {result['successes']}건 / 실패 {result['failures'] or 0}")
+    print(f"💰 시작 잔액 {result['start_balance']:,.0f}원 -> 최종 잔액 {result['end_balance']:,.0f}원 (기대값 {result['expected']:,.0f}원)")
+    print(f"📒 원장 {len(ledger_rows)}건")
+    if not args.keep:
+        print("🧹 잔액/원장 복원 완료")
+
+    if result["violations"]:
+        print("❌ 불변식 위반: " + ", ".join(result["violations"]))
+        sys.exit(1)
+    print("🎉 불변식 통과")
+
+if __name__ == "__main__":
+    main()
@@ -16,6 +16,7 @@ if project_root not in sys.path:
 
 try:
     from utils.handle_sql import execute_query, execute_many
+    from utils.rate_cache import bump_rate_version
 except ImportError as e:
     logging.error(f"❌ utils 폴더를 찾을 수 없습니다. 경로 확인 필요: {e}")
     sys.exit(1)
@@ -147,6 +148,14 @@ def save_to_mysql(df, date_str):
         inserted_count = execute_many(insert_sql, data_list)
         logging.info(f"📥 DB 저장 완료: {inserted_count}건")
 
+        # 3. 환율 버전 갱신 -> 실행 중인 앱의 환율 캐시가 새 값으로 다시 로드됨
+        try:
+            bump_rate_version()
+            logging.info("🔔 환율 버전 갱신 완료")
+        except Exception as e:
+            # 환율 저장은 끝났으므로 실행 중인 앱은 TTL 만료 시 새 값을 읽음
+            logging.warning(f"⚠️ 환율 버전 갱신 실패 ('python utils/init_db.py --migrate' 필요 여부 확인): {e}")
+
     except Exception as e:
         logging.error(f"❌ DB 저장 오류: {e}")
 
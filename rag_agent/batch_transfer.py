@@ -0,0 +1,156 @@
+import re
+
+from rag_agent.transfer_parser import parse_transfer_request
+from rag_agent.contact_matcher import match_contact, normalize_name, relation_of, record_match
+from utils.rate_cache import get_rate_quote
+
+# ---------------------------------------------------------
+# 일괄 송금 (여러 대상에게 한 번에)
+# - "엄마 10만원\n동생 5만원" 처럼 줄/세미콜론으로 나눈 요청
+# - "가족들한테 각각 30만원씩" 처럼 그룹 + 각각/씩 요청 -> 관계로 연락처 확장
+# - "엄마, 아빠한테 각각 5만원" 처럼 콤마로 나열한 대상 + 각각/씩 -> 대상마다 같은 금액
+# - 연락처/환율을 한 번에 해석해 확인 1회, PIN 1회, 트랜잭션 1회로 실행
+# - 애매한 연락처는 줄마다 LLM을 부르지 않고 미해결로 돌려줌 (사용자가 이름을 고쳐 다시 요청)
+# ---------------------------------------------------------
+MAX_BATCH_LINES = 50
+
+FAMILY_RELATIONS = {
+    "mother", "father", "brother", "sister", "sibling", "son", "daughter",
+    "spouse", "grandmother", "grandfather",
+}
+GROUP_ALIASES = {
+    "가족": FAMILY_RELATIONS, "식구": FAMILY_RELATIONS, "family": FAMILY_RELATIONS,
+    "giađình": FAMILY_RELATIONS, "keluarga": FAMILY_RELATIONS,
+    "친구": {"friend"}, "friends": {"friend"}, "bạnbè": {"friend"}, "teman-teman": {"friend"},
+    "동료": {"colleague"}, "colleagues": {"colleague"},
+}
+_EACH_RE = re.compile(r"각각|씩|each|mỗi|masing-masing", re.I)
+_SPLIT_RE = re.compile(r"[\n;]+|,\s*(?=\D)|\s+그리고\s+|\s+and\s+", re.I)
+# 대상 조사 없이 "엄마 10만원" 으로 쓴 줄: 금액 앞 첫 어절을 대상으로
+_LEADING_NAME_RE = re.compile(r"^\s*(?P<name>[^\s\d$₩¥€£]+)")
+# 금액 없이 이름만 있는 조각 ("엄마, 아빠한테 각각 ..." 의 "엄마")
+_BARE_NAME_RE = re.compile(r"^[^\s\d$₩¥€£]+$")
+
+def split_lines(text: str) -> list:
+    return [line.strip() for line in _SPLIT_RE.split(text or "") if line and line.strip()]
+
+def _group_relations(target: str):
+    name = normalize_name(target or "")
+    if name.endswith("들"):
+        name = name[:-1]
+    return GROUP_ALIASES.get(name)
+
+def parse_batch_request(text: str) -> list:
+    """
+    일괄 송금 요청 -> [{"target", "amount", "currency", "group"}]
+    group: 그룹 대상이면 관계 키 집합, 아니면 None
+    """
+    requests = []
+    listed = []   # 금액 없이 나열된 앞 대상들 (다음 '각각/씩' 줄과 같은 금액)
+    for line in split_lines(text)[:MAX_BATCH_LINES]:
+        parsed = parse_transfer_request(line)
+        if parsed["amount"] is None:
+            if _BARE_NAME_RE.match(line):
+                listed.append(line)
+            else:
+                listed = []
+            continue
+        target = parsed["target"]
+        if not target:
+            match = _LEADING_NAME_RE.match(line)
+            target = match.group("name") if match else None
+        each = bool(_EACH_RE.search(line))
+        targets = listed + [target] if each and listed else [target]
+        listed = []
+        for name in targets:
+            if not name:
+                continue
+            requests.append({
+                "target": name,
+                "amount": parsed["amount"],
+                "currency": parsed["currency"] or "KRW",
+                "group": _group_relations(name) if each else None,
+            })
+    return requests
+
+def is_batch_request(text: str) -> bool:
+    """대상이 여러 명인 요청인지 (2줄 이상 또는 그룹 + 각각/씩)"""
+    requests = parse_batch_request(text)
+    return len(requests) >= 2 or any(r["group"] for r in requests)
+
+def prepare_batch(user_id, contacts, requests) -> dict:
+    """
+    대상/환율을 한 번에 해석합니다.
+    반환: {"items": [...], "unresolved": [대상 문자열], "total_krw": float}
+      item: {"contact_id", "contact_name", "amount", "currency", "exchange_rate", "rate_date", "amount_krw"}
+    """
+    items, unresolved = [], []
+    quotes = {}
+    for req in requests:
+        if req.get("group"):
+            targets = [
+                c for c in contacts
+                if relation_of(c.get("relationship")) in req["group"] or relation_of(c["contact_name"]) in req["group"]
+            ]
+            if not targets:
+                unresolved.append(req["target"])
+                continue
+            record_match(req["target"], "group", [c["contact_name"] for c in targets], len(targets))
+        else:
+            name, source, _ = match_contact(user_id, req["target"], contacts)
+            record_match(req["target"], source if name else f"batch_{source}", name)
+            if not name:
+                unresolved.append(req["target"])
+                continue
+            targets = [c for c in contacts if c["contact_name"] == name]
+
+        currency = req["currency"]
+        if currency not in quotes:
+            quotes[currency] = get_rate_quote(currency)
+        quote = quotes[currency]
+        if quote is None:
+            unresolved.append(f"{req['target']} ({currency} 환율 없음)")
+            continue
+
+        for contact in targets:
+            items.append({
+                "contact_id": contact["contact_id"],
+                "contact_name": contact["contact_name"],
+                "amount": float(req["amount"]),
+                "currency": currency,
+                "exchange_rate": quote["send_rate"],
+                "rate_date": str(quote["reference_date"]) if quote["reference_date"] is not None else None,
+                "amount_krw": round(float(req["amount"]) * quote["send_rate"], 2),
+            })
+    return {
+        "items": items,
+        "unresolved": unresolved,
+        "total_krw": round(sum(item["amount_krw"] for item in items), 2),
+    }
+
+def render_batch_confirmation(prepared: dict) -> str:
+    lines = [f"총 {len(prepared['items'])}건, {int(prepared['total_krw']):,}원을 송금하시겠습니까?"]
+    for item in prepared["items"]:
+        if item["currency"] == "KRW":
+            lines.append(f"- {item['contact_name']}: {int(item['amount']):,}원")
+        else:
+            lines.append(
+                f"- {item['contact_name']}: {int(item['amount']):,} {item['currency']} "
+                f"({int(item['amount_krw']):,}원, {item['rate_date']} 환율)"
+            )
+    return "\n".join(lines)
+
+def requote_items(items: list) -> list:
+    """예약 송금 실행 시점의 환율로 원화 금액을 다시 계산"""
+    requoted = []
+    for item in items:
+        quote = get_rate_quote(item["currency"])
+        if quote is None:
+            raise ValueError(f"{item['currency']} 환율 정보를 찾을 수 없습니다.")
+        requoted.append(dict(
+            item,
+            exchange_rate=quote["send_rate"],
+            rate_date=str(quote["reference_date"]) if quote["reference_date"] is not None else None,
+            amount_krw=round(item["amount"] * quote["send_rate"], 2),
+        ))
+    return requoted
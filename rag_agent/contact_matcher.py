@@ -0,0 +1,209 @@
+import re
+import threading
+import logging
+from logging.handlers import RotatingFileHandler
+from pathlib import Path
+
+# ---------------------------------------------------------
+# 로컬 연락처 매칭 (LLM 의미 매칭 전에 먼저 시도)
+# - 이름 정규화: 공백/대소문자/호칭("철수씨", "김철수님", "Mr. Kim") 제거
+# - 관계 별칭표: 엄마/어머니/Mom/Mother/mẹ/ibu ... -> 같은 관계 키
+# - 자모 분해 편집 거리: "철수" vs "쳘수" 같은 오타를 글자 단위보다 촘촘하게 비교
+# - 점수 순위에서 1등이 확실하면 바로 확정, 애매하면 상위 후보로 (후보가 없으면 전체 연락처로) LLM 호출
+# - 매칭 출처(exact/alias/partial/fuzzy/llm/none)는 튜닝용으로 로그 파일에 기록
+# ---------------------------------------------------------
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+MATCH_LOG_PATH = PROJECT_ROOT / "logs" / "contact_match.log"
+
+ACCEPT_SCORE = 0.8    # 이 점수 이상 + 2등과 차이가 충분하면 확정
+ACCEPT_MARGIN = 0.1   # 1등과 2등의 최소 점수 차이
+CANDIDATE_FLOOR = 0.5 # 이보다 낮은 후보는 버림 (LLM에도 보내지 않음)
+LLM_CANDIDATES = 5    # 애매할 때 LLM에 보낼 상위 후보 수
+
+RELATIONSHIP_ALIASES = {
+    "mother": ["엄마", "어머니", "어머님", "모친", "mom", "mother", "mommy", "mum", "mẹ", "má", "ibu", "mama"],
+    "father": ["아빠", "아버지", "아버님", "부친", "dad", "father", "daddy", "bố", "ba", "cha", "ayah", "bapak", "papa"],
+    "brother": ["형", "형님", "오빠", "남동생", "brother", "bro", "anh trai", "em trai", "kakak laki-laki", "adik laki-laki"],
+    "sister": ["누나", "언니", "여동생", "sister", "sis", "chị gái", "em gái", "kakak perempuan", "adik perempuan"],
+    "sibling": ["동생", "sibling", "younger sibling", "em", "adik", "kakak"],
+    "son": ["아들", "son", "con trai", "anak laki-laki"],
+    "daughter": ["딸", "daughter", "con gái", "anak perempuan"],
+    "spouse": ["남편", "아내", "와이프", "부인", "여보", "wife", "husband", "spouse", "vợ", "chồng", "istri", "suami"],
+    "grandmother": ["할머니", "grandma", "grandmother", "bà", "nenek"],
+    "grandfather": ["할아버지", "grandpa", "grandfather", "ông", "kakek"],
+    "uncle": ["삼촌", "외삼촌", "큰아버지", "작은아버지", "숙부", "이모부", "고모부", "uncle", "chú", "bác", "cậu", "paman", "om"],
+    "aunt": ["이모", "고모", "숙모", "외숙모", "큰어머니", "작은어머니", "aunt", "auntie", "dì", "cô", "mợ", "bibi", "tante"],
+    "cousin": ["사촌", "사촌형", "사촌누나", "사촌동생", "cousin", "anh họ", "chị họ", "em họ", "sepupu"],
+    "friend": ["친구", "friend", "bạn", "teman"],
+    "boss": ["사장님", "사장", "상사", "팀장님", "팀장", "boss", "manager", "sếp", "atasan", "bos"],
+    "colleague": ["동료", "colleague", "coworker", "đồng nghiệp", "rekan kerja"],
+}
+# 공백 제거한 소문자 별칭 -> 관계 키
+_ALIAS_TO_RELATION = {
+    alias.replace(" ", "").lower(): key
+    for key, aliases in RELATIONSHIP_ALIASES.items() for alias in aliases
+}
+
+# 뒤에 붙는 호칭 (긴 것부터), 앞에 붙는 영문 호칭
+_HONORIFIC_SUFFIXES = ("선생님", "님", "씨", "군", "양")
+_HONORIFIC_PREFIX_RE = re.compile(r"^(mr|mrs|ms|miss|dr)\.?\s+", re.I)
+
+_CHO = "ㄱㄲㄴㄷㄸㄹㅁㅂㅃㅅㅆㅇㅈㅉㅊㅋㅌㅍㅎ"
+_JUNG = "ㅏㅐㅑㅒㅓㅔㅕㅖㅗㅘㅙㅚㅛㅜㅝㅞㅟㅠㅡㅢㅣ"
+_JONG = " ㄱㄲㄳㄴㄵㄶㄷㄹㄺㄻㄼㄽㄾㄿㅀㅁㅂㅄㅅㅆㅇㅈㅊㅋㅌㅍㅎ"
+
+_match_logger = None
+_stats = {}
+_stats_lock = threading.Lock()
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+def _get_match_logger():
+    global _match_logger
+    if _match_logger is None:
+        logger = logging.getLogger("fin_trans.contact_match")
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+        try:
+            MATCH_LOG_PATH.parent.mkdir(parents=True, exist_ok=True)
+            handler = RotatingFileHandler(MATCH_LOG_PATH, maxBytes=2 * 1024 * 1024, backupCount=2, encoding="utf-8")
+            handler.setFormatter(logging.Formatter("[%(asctime)s] %(message)s"))
+            logger.addHandler(handler)
+        except OSError as e:
+            print(f"⚠️ 연락처 매칭 로그 파일을 열 수 없습니다: {e}")
+        _match_logger = logger
+    return _match_logger
+
+# ---------------------------------------------------------
+# 정규화 / 자모 분해 / 편집 거리
+# ---------------------------------------------------------
+def normalize_name(text: str) -> str:
+    text = _HONORIFIC_PREFIX_RE.sub("", (text or "").strip())
+    text = re.sub(r"\s+", "", text).lower()
+    for suffix in _HONORIFIC_SUFFIXES:
+        # "선생님" 자체처럼 호칭만 남는 경우는 그대로 둠
+        if text.endswith(suffix) and len(text) > len(suffix):
+            text = text[:-len(suffix)]
+            break
+    return text
+
+def to_jamo(text: str) -> str:
+    """한글 음절을 초/중/종성으로 분해 ('철수' -> 'ㅊㅓㄹㅅㅜ'), 그 외 문자는 그대로"""
+    out = []
+    for ch in text:
+        code = ord(ch) - 0xAC00
+        if 0 <= code < 11172:
+            out.append(_CHO[code // 588])
+            out.append(_JUNG[(code % 588) // 28])
+            if code % 28:
+                out.append(_JONG[code % 28])
+        else:
+            out.append(ch)
+    return "".join(out)
+
+def edit_distance(a: str, b: str) -> int:
+    if len(a) < len(b):
+        a, b = b, a
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        for j, cb in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ca != cb)))
+        previous = current
+    return previous[-1]
+
+def _similarity(a: str, b: str) -> float:
+    if not a or not b:
+        return 0.0
+    return 1.0 - edit_distance(a, b) / max(len(a), len(b))
+
+def relation_of(text: str):
+    return _ALIAS_TO_RELATION.get((text or "").replace(" ", "").lower())
+
+# ---------------------------------------------------------
+# 사용자별 연락처 인덱스
+# ---------------------------------------------------------
+class ContactIndex:
+    def __init__(self, contacts):
+        self.entries = []
+        for c in contacts:
+            name = normalize_name(c["contact_name"])
+            relations = {r for r in (relation_of(c.get("relationship")), relation_of(name)) if r}
+            self.entries.append({
+                "contact_name": c["contact_name"],
+                "relationship": c.get("relationship"),
+                "name": name,
+                "jamo": to_jamo(name),
+                # 한글 세 글자 이상 이름은 성을 뺀 이름도 비교 ("쳘수" -> "김철수")
+                "given_jamo": to_jamo(name[1:]) if len(name) >= 3 and "가" <= name[0] <= "힣" else None,
+                "relations": relations,
+            })
+
+    def rank(self, user_input: str) -> list:
+        """[(점수, 출처, 연락처 이름)] 점수 내림차순 (CANDIDATE_FLOOR 이상만)"""
+        query = normalize_name(user_input)
+        if not query:
+            return []
+        query_jamo = to_jamo(query)
+        relation = relation_of(query)
+        ranked = []
+        for e in self.entries:
+            if query == e["name"] or query == normalize_name(e["relationship"] or ""):
+                score, source = 1.0, "exact"
+            elif relation and relation in e["relations"]:
+                score, source = 0.95, "alias"
+            elif len(query) >= 2 and (e["name"].endswith(query) or e["name"].startswith(query)):
+                # 성을 뺀 이름("철수" -> "김철수") 또는 이름 앞부분
+                score, source = 0.9, "partial"
+            else:
+                score = _similarity(query_jamo, e["jamo"])
+                if e["given_jamo"]:
+                    score = max(score, _similarity(query_jamo, e["given_jamo"]))
+                source = "fuzzy"
+            if score >= CANDIDATE_FLOOR:
+                ranked.append((score, source, e["contact_name"]))
+        ranked.sort(key=lambda r: -r[0])
+        return ranked
+
+def get_contact_index(user_id, contacts) -> ContactIndex:
+    """연락처 목록이 바뀌지 않았으면 사용자별 인덱스를 재사용"""
+    signature = tuple((c["contact_name"], c.get("relationship")) for c in contacts)
+    with _indexes_lock:
+        cached = _indexes.get(user_id)
+        if cached is not None and cached[0] == signature:
+            return cached[1]
+    index = ContactIndex(contacts)
+    with _indexes_lock:
+        _indexes[user_id] = (signature, index)
+    return index
+
+def match_contact(user_id, user_input, contacts):
+    """
+    로컬 매칭 결과를 반환합니다.
+    반환: (확정된 연락처 이름 | None, 출처, LLM에 보낼 후보 연락처 목록)
+      - 확정: (name, "exact"/"alias"/"partial"/"fuzzy", [])
+      - 애매: (None, "ambiguous", 상위 후보 contacts) -> 호출하는 쪽에서 LLM 판단
+      - 후보 없음: (None, "none", [])
+    """
+    ranked = get_contact_index(user_id, contacts).rank(user_input)
+    if not ranked:
+        return None, "none", []
+    top_score, top_source, top_name = ranked[0]
+    second_score = ranked[1][0] if len(ranked) > 1 else 0.0
+    if top_score >= ACCEPT_SCORE and top_score - second_score >= ACCEPT_MARGIN:
+        return top_name, top_source, []
+    names = {name for _, _, name in ranked[:LLM_CANDIDATES]}
+    return None, "ambiguous", [c for c in contacts if c["contact_name"] in names]
+
+def record_match(user_input, source, matched, candidates=0):
+    """매칭 출처 기록 (튜닝용 통계 + 로그 파일)"""
+    with _stats_lock:
+        _stats[source] = _stats.get(source, 0) + 1
+    _get_match_logger().info(f"source={source} input={user_input!r} matched={matched!r} candidates={candidates}")
+
+def get_match_stats() -> dict:
+    with _stats_lock:
+        stats = dict(_stats)
+    total = sum(stats.values())
+    llm = stats.get("llm", 0) + stats.get("llm_none", 0)
+    return {"by_source": stats, "total": total, "llm_rate": llm / total if total else 0.0}
@@ -0,0 +1,287 @@
+import os
+import re
+import json
+import time
+import hashlib
+import threading
+import unicodedata
+from collections import OrderedDict
+from contextlib import contextmanager
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:  # Windows: 파일 잠금 없이 단일 프로세스 쓰기로 동작
+    fcntl = None
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+# ---------------------------------------------------------
+# 질의 임베딩 캐시
+# - 키: 모델명 + 정규화한 질의 문자열 (NFKC, 공백 정리, 소문자, 끝 문장부호 제거)
+# - 1단계: 프로세스 메모리 LRU
+# - 2단계: 디스크 float32 행렬 (memmap) + 키 목록 파일 -> 재시작 후에도 같은 질의는 API 호출 없음
+#     data/embedding_cache/<model>.f32  : 벡터를 행 단위로 이어 붙인 파일
+#     data/embedding_cache/<model>.keys : 행 순서대로의 키 (한 줄에 하나)
+#     data/embedding_cache/<model>.json : 차원 수
+# - 쓰기는 추가(append)만 하며, 여러 프로세스(Streamlit 워커/스케줄러)가 같은 파일에 쓸 수 있음
+#   <model>.lock 파일 잠금(fcntl) 안에서 다른 프로세스가 추가한 키를 먼저 이어 읽고,
+#   행 번호는 메모리 개수가 아니라 벡터 파일 크기로 정함 -> 프로세스 간 행/키 어긋남 없음
+# - 조회 시 메모리에 없는 키는 키 파일의 새 꼬리만 다시 읽어 확인 (다른 프로세스가 저장한 벡터 사용)
+# ---------------------------------------------------------
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+EMBED_CACHE_DIR = Path(os.getenv("EMBED_CACHE_DIR", PROJECT_ROOT / "data" / "embedding_cache"))
+EMBED_CACHE_MEMORY_SIZE = int(os.getenv("EMBED_CACHE_MEMORY_SIZE", 2048))
+
+_SPACE_RE = re.compile(r"\s+")
+_TRAILING_PUNCT_RE = re.compile(r"[\s?!.~。？！]+$")
+
+_stats_lock = threading.Lock()
+_stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "api_ms": 0.0}
+
+def normalize_query(text: str) -> str:
+    text = unicodedata.normalize("NFKC", text or "")
+    text = _SPACE_RE.sub(" ", text).strip().lower()
+    return _TRAILING_PUNCT_RE.sub("", text)
+
+def cache_key(text: str, model: str) -> str:
+    return hashlib.sha1(f"{model}\n{normalize_query(text)}".encode("utf-8")).hexdigest()
+
+def _count(name, value=1):
+    with _stats_lock:
+        _stats[name] += value
+
+# ---------------------------------------------------------
+# 디스크 저장소 (memmap)
+# ---------------------------------------------------------
+class DiskEmbeddingStore:
+    def __init__(self, model: str, directory: Path = EMBED_CACHE_DIR):
+        name = re.sub(r"[^\w.-]", "_", model)
+        self.directory = Path(directory)
+        self._vec_path = self.directory / f"{name}.f32"
+        self._key_path = self.directory / f"{name}.keys"
+        self._meta_path = self.directory / f"{name}.json"
+        self._lock_path = self.directory / f"{name}.lock"
+        self._lock = threading.Lock()
+        self.dim = None
+        self._rows = {}
+        self._key_lines = 0     # 키 파일에서 읽은 줄 수 (= 다음 행 번호)
+        self._key_offset = 0    # 키 파일에서 읽은 바이트 위치
+        self._matrix = None
+        self._load()
+
+    def __len__(self):
+        return len(self._rows)
+
+    @contextmanager
+    def _file_lock(self):
+        """프로세스 간 쓰기 잠금 (같은 프로세스의 스레드는 self._lock 으로 직렬화)"""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        with open(self._lock_path, "a") as f:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+    def _load(self):
+        if not self._meta_path.exists():
+            return
+        # 꼬리 정리(truncate) 중에 다른 프로세스가 쓰고 있으면 안 되므로 잠금 안에서
+        with self._file_lock():
+            self.dim = int(json.loads(self._meta_path.read_text(encoding="utf-8"))["dim"])
+            keys = self._key_path.read_text(encoding="utf-8").split() if self._key_path.exists() else []
+            row_bytes = self.dim * 4
+            size = self._vec_path.stat().st_size if self._vec_path.exists() else 0
+            count = min(len(keys), size // row_bytes)
+
+            # 쓰다가 중단된 꼬리(키 없는 벡터 / 벡터 없는 키)는 잘라내 행 번호를 맞춤
+            if size != count * row_bytes:
+                with open(self._vec_path, "r+b") as f:
+                    f.truncate(count * row_bytes)
+            if len(keys) != count:
+                self._key_path.write_text("".join(k + "\n" for k in keys[:count]), encoding="utf-8")
+
+            self._rows = {}
+            for i, key in enumerate(keys[:count]):
+                self._rows.setdefault(key, i)
+            self._key_lines = count
+            self._key_offset = self._key_path.stat().st_size if self._key_path.exists() else 0
+        self._remap()
+
+    def _read_key_tail(self):
+        """다른 프로세스가 추가한 키를 이어서 읽음 (줄바꿈까지 기록된 완전한 줄만)"""
+        try:
+            size = self._key_path.stat().st_size
+        except FileNotFoundError:
+            return
+        if size <= self._key_offset:
+            return
+        if self.dim is None:
+            self.dim = int(json.loads(self._meta_path.read_text(encoding="utf-8"))["dim"])
+        with open(self._key_path, "rb") as f:
+            f.seek(self._key_offset)
+            chunk = f.read(size - self._key_offset)
+        end = chunk.rfind(b"\n") + 1
+        for key in chunk[:end].decode("utf-8").splitlines():
+            self._rows.setdefault(key, self._key_lines)
+            self._key_lines += 1
+        self._key_offset += end
+
+    def _remap(self):
+        count = self._key_lines
+        self._matrix = (
+            np.memmap(self._vec_path, dtype=np.float32, mode="r", shape=(count, self.dim)) if count else None
+        )
+
+    def get(self, key):
+        with self._lock:
+            row = self._rows.get(key)
+            if row is None:
+                self._read_key_tail()
+                row = self._rows.get(key)
+                if row is None:
+                    return None
+            if self._matrix is None or row >= self._matrix.shape[0]:
+                self._remap()
+            return np.array(self._matrix[row])
+
+    def put(self, key, vector):
+        vector = np.asarray(vector, dtype=np.float32).ravel()
+        with self._lock:
+            if key in self._rows:
+                return
+            with self._file_lock():
+                if self.dim is None and self._meta_path.exists():
+                    self.dim = int(json.loads(self._meta_path.read_text(encoding="utf-8"))["dim"])
+                if self.dim is None:
+                    self.dim = int(vector.shape[0])
+                    self._meta_path.write_text(json.dumps({"dim": self.dim}), encoding="utf-8")
+                elif vector.shape[0] != self.dim:
+                    raise ValueError(f"임베딩 차원이 다릅니다: {vector.shape[0]} != {self.dim}")
+
+                self._read_key_tail()
+                if key in self._rows:
+                    return
+                # 행 번호 = 벡터 파일 크기 기준. 키 없이 남은 벡터(중단된 쓰기)는 잘라내고 이어 씀
+                row_bytes = self.dim * 4
+                size = self._vec_path.stat().st_size if self._vec_path.exists() else 0
+                if size > self._key_lines * row_bytes:
+                    with open(self._vec_path, "r+b") as f:
+                        f.truncate(self._key_lines * row_bytes)
+                    size = self._key_lines * row_bytes
+                row = size // row_bytes
+
+                # 벡터를 먼저, 키를 나중에 기록 -> 중간에 끊겨도 다음 로드 때 꼬리만 잘라내면 됨
+                with open(self._vec_path, "ab") as f:
+                    f.write(vector.tobytes())
+                line = (key + "\n").encode("utf-8")
+                with open(self._key_path, "ab") as f:
+                    f.write(line)
+                self._rows[key] = row
+                self._key_lines = row + 1
+                self._key_offset += len(line)
+
+# ---------------------------------------------------------
+# LangChain Embeddings 래퍼
+# ---------------------------------------------------------
+class CachedEmbeddings(Embeddings):
+    """
+    embed_query 결과를 메모리 LRU -> 디스크 순으로 캐시하는 임베딩 래퍼
+    (문서 임베딩은 적재 시에만 쓰이므로 그대로 위임)
+    """
+    def __init__(self, embeddings: Embeddings, model: str, memory_size: int = EMBED_CACHE_MEMORY_SIZE,
+                 directory: Path = EMBED_CACHE_DIR):
+        self.embeddings = embeddings
+        self.model = model
+        self.memory_size = memory_size
+        self.store = DiskEmbeddingStore(model, directory)
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _remember(self, key, vector):
+        with self._lock:
+            self._memory[key] = vector
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.memory_size:
+                self._memory.popitem(last=False)
+
+    def lookup(self, text: str):
+        """캐시에 있으면 float32 벡터, 없으면 None (API 호출 없음)"""
+        key = cache_key(text, self.model)
+        with self._lock:
+            vector = self._memory.get(key)
+            if vector is not None:
+                self._memory.move_to_end(key)
+        if vector is not None:
+            _count("memory_hits")
+            return vector
+        vector = self.store.get(key)
+        if vector is not None:
+            _count("disk_hits")
+            self._remember(key, vector)
+        return vector
+
+    def embed_query(self, text: str) -> list:
+        vector = self.lookup(text)
+        if vector is None:
+            t0 = time.perf_counter()
+            vector = np.asarray(self.embeddings.embed_query(text), dtype=np.float32)
+            _count("misses")
+            _count("api_ms", (time.perf_counter() - t0) * 1000)
+            key = cache_key(text, self.model)
+            self._remember(key, vector)
+            try:
+                self.store.put(key, vector)
+            except OSError as e:
+                print(f"⚠️ [EmbedCache] 디스크 저장 실패: {e}")
+        return vector.tolist()
+
+    def embed_queries(self, texts: list) -> list:
+        """
+        질의 여러 개를 임베딩 (캐시에 없는 질의만 모아 배치 요청 1회)
+        OpenAI 임베딩은 질의/문서 구분이 없으므로 배치 요청에는 embed_documents 사용
+        """
+        vectors = [self.lookup(text) for text in texts]
+        missing = {}
+        for text, vector in zip(texts, vectors):
+            if vector is None:
+                missing.setdefault(cache_key(text, self.model), text)
+        if missing:
+            t0 = time.perf_counter()
+            embedded = self.embeddings.embed_documents(list(missing.values()))
+            _count("misses", len(missing))
+            _count("api_ms", (time.perf_counter() - t0) * 1000)
+            fresh = {}
+            for key, vector in zip(missing, embedded):
+                fresh[key] = np.asarray(vector, dtype=np.float32)
+                self._remember(key, fresh[key])
+                try:
+                    self.store.put(key, fresh[key])
+                except OSError as e:
+                    print(f"⚠️ [EmbedCache] 디스크 저장 실패: {e}")
+            vectors = [
+                vector if vector is not None else fresh[cache_key(text, self.model)]
+                for text, vector in zip(texts, vectors)
+            ]
+        return [vector.tolist() for vector in vectors]
+
+    def embed_documents(self, texts: list) -> list:
+        return self.embeddings.embed_documents(texts)
+
+def get_embedding_cache_stats() -> dict:
+    with _stats_lock:
+        stats = dict(_stats)
+    hits = stats["memory_hits"] + stats["disk_hits"]
+    total = hits + stats["misses"]
+    avg_api_ms = stats["api_ms"] / stats["misses"] if stats["misses"] else 0.0
+    stats.update(
+        hit_rate=round(hits / total, 4) if total else 0.0,
+        avg_api_ms=round(avg_api_ms, 1),
+        # 캐시 적중으로 아낀 추정 시간 (평균 API 지연 x 적중 수)
+        saved_ms=round(avg_api_ms * hits, 1),
+    )
+    return stats
@@ -1,4 +1,6 @@
 import os
+import re
+import time
 from pathlib import Path
 from typing import TypedDict, Literal, Any
 from dotenv import load_dotenv
@@ -7,10 +9,15 @@ from dotenv import load_dotenv
 from langchain_chroma import Chroma
 from langchain_openai import OpenAIEmbeddings, ChatOpenAI
 from langchain_core.prompts import PromptTemplate
+from langchain_core.documents import Document
 from langchain_core.output_parsers import StrOutputParser
 from langgraph.graph import StateGraph, START, END
 
 from rag_agent.web_search_rag import WebSearchRAG
+from rag_agent.embedding_cache import CachedEmbeddings, get_embedding_cache_stats
+from rag_agent.term_index import TermIndex
+from rag_agent.lexical_index import BM25Index, reciprocal_rank_fusion, LEXICAL_INDEX_PATH
+from rag_agent.flat_index import load_flat_store, FLAT_INDEX_DIR
 
 # 1. 환경 설정
 load_dotenv()
@@ -22,12 +29,22 @@ PROMPT_DIR = CURRENT_FILE_PATH.parent / "prompt" / "finrag"
 
 CHROMA_DB_PATH = PROJECT_ROOT / "data" / "financial_terms"
 COLLECTION_NAME = "financial_terms"
+EMBEDDING_MODEL = "text-embedding-3-large"
+# 벡터 검색 백엔드: chroma (기본) | flat (NumPy float32 전수 검색) | flat_int8 (int8 양자화)
+FINRAG_BACKEND = os.getenv("FINRAG_BACKEND", "chroma").lower()
 
 SIMILARITY_THRESHOLD = 0.6
+# 어휘(BM25) 결과는 용어명 n-gram이 이 비율 이상 질의에 나와야 채택
+LEXICAL_MIN_COVERAGE = 0.6
+# 다중 질의(비교 질문/일괄 처리): 질의별 최대 문서 수, 합친 뒤 최대 문서 수
+MAX_ASPECT_DOCS = 3
+MAX_MULTI_DOCS = 6
 WEB_SEARCH_KEYWORDS = ["현재", "최신", "오늘", "주가", "시세", "뉴스", "전망", "날씨", "검색해줘", "얼마야"]
 
 # 전역 변수
 vectorstore = None
+term_index = None
+lexical_index = None
 llm = ChatOpenAI(model="gpt-5-mini", temperature=0)
 web_rag = WebSearchRAG() # 웹 검색 인스턴스 생성
 
@@ -45,19 +62,74 @@ def load_knowledge_base():
     global vectorstore
     if vectorstore is not None:
         return
+    # 반복되는 용어 질의는 임베딩 API를 다시 부르지 않도록 캐시 래퍼 사용
+    embeddings = CachedEmbeddings(OpenAIEmbeddings(model=EMBEDDING_MODEL), EMBEDDING_MODEL)
+    if FINRAG_BACKEND in ("flat", "flat_int8"):
+        dtype = "int8" if FINRAG_BACKEND == "flat_int8" else "f32"
+        print(f"⏳ [RAG] flat 인덱스 로드 중... ({dtype})")
+        try:
+            vectorstore = load_flat_store(embeddings, lambda: _open_chroma(embeddings), FLAT_INDEX_DIR, dtype)
+            print(f"✅ flat 인덱스 로드 완료 ({len(vectorstore)}개, {vectorstore.nbytes() / 1024:.0f}KB, 경로: {FLAT_INDEX_DIR})")
+        except Exception as e:
+            print(f"❌ flat 인덱스 로드 오류: {e}")
+            vectorstore = None
+            return
+        _build_local_indexes()
+        return
+
     print("⏳ [RAG] ChromaDB 연결 중...")
     try:
-        embeddings = OpenAIEmbeddings(model="text-embedding-3-large")
-        vectorstore = Chroma(
-            persist_directory=str(CHROMA_DB_PATH),
-            embedding_function=embeddings,
-            collection_name=COLLECTION_NAME,
-            collection_metadata={"hnsw:space": "l2"},
-        )
+        vectorstore = _open_chroma(embeddings)
         print(f"✅ ChromaDB 연결 완료 (Metirc: L2, 경로: {CHROMA_DB_PATH})")
     except Exception as e:
         print(f"❌ ChromaDB 연결 오류: {e}")
         vectorstore = None
+        return
+    _build_local_indexes()
+
+def _open_chroma(embeddings):
+    return Chroma(
+        persist_directory=str(CHROMA_DB_PATH),
+        embedding_function=embeddings,
+        collection_name=COLLECTION_NAME,
+        collection_metadata={"hnsw:space": "l2"},
+    )
+
+def _build_local_indexes():
+    """
+    컬렉션의 용어/정의로 로컬 인덱스 준비 (실패해도 벡터 검색은 그대로 동작)
+    - 용어 정확 일치 인덱스: 매번 구축
+    - 어휘(BM25) 인덱스: 적재 시 저장한 파일 사용, 없거나 용어 ID 구성이 다르면 현재 컬렉션으로 다시 구축
+      저장은 Chroma 백엔드일 때만 (flat 파일은 컬렉션의 사본이라 set_chromaDB 가 만든 파일을 덮어쓰지 않음)
+    """
+    global term_index, lexical_index
+    try:
+        t0 = time.perf_counter()
+        data = vectorstore.get(include=["documents", "metadatas"])
+    except Exception as e:
+        print(f"⚠️ 컬렉션 조회 실패, 로컬 인덱스 없이 진행: {e}")
+        return
+
+    try:
+        term_index = TermIndex.from_records(data["ids"], data["documents"], data["metadatas"])
+        print(f"✅ 용어 인덱스 구축 완료 ({len(term_index)}개 용어, {(time.perf_counter() - t0) * 1000:.0f}ms)")
+    except Exception as e:
+        print(f"⚠️ 용어 인덱스 구축 실패: {e}")
+        term_index = None
+
+    try:
+        t0 = time.perf_counter()
+        lexical_index = BM25Index.load(LEXICAL_INDEX_PATH)
+        # 본문/용어명이 없는 항목은 두 인덱스 모두 건너뛰므로 용어 인덱스의 ID 구성과 비교
+        expected_ids = set(term_index.documents) if term_index is not None else {str(i) for i in data["ids"]}
+        if lexical_index is None or set(lexical_index.ids) != expected_ids:
+            lexical_index = BM25Index.from_contents(data["ids"], data["documents"], data["metadatas"])
+            if FINRAG_BACKEND == "chroma":
+                lexical_index.save(LEXICAL_INDEX_PATH)
+        print(f"✅ 어휘 인덱스 준비 완료 ({len(lexical_index)}개 용어, {(time.perf_counter() - t0) * 1000:.0f}ms)")
+    except Exception as e:
+        print(f"⚠️ 어휘 인덱스 준비 실패: {e}")
+        lexical_index = None
 
 def format_web_result(web_result, original_query, translated_query):
     citations = [f"- **{src['title']}**: {src['url']}" for src in web_result.get("sources", [])]
@@ -109,30 +181,165 @@ def node_db_retrieve(state: FinRAGState) -> dict:
     if vectorstore is None:
         load_knowledge_base()
     korean_query = state["korean_query"]
-    relevant_docs = []
+
+    # "A와 B 차이" 같은 비교 질문 / 용어가 여러 개인 질문은 측면별로 한 번에 검색해 합침
+    aspects = decompose_query(korean_query)
+    if len(aspects) > 1:
+        print(f"🧩 [Search] 다중 측면 검색: {aspects}")
+        return {"relevant_docs": merge_documents(retrieve_many(aspects))}
+
+    # 질의에 용어가 그대로 들어 있으면 임베딩/벡터 검색 없이 정의를 바로 사용
+    if term_index is not None:
+        matched = term_index.find_terms(korean_query, limit=3)
+        if matched:
+            print(f"🎯 [Search] 용어 직접 일치: {', '.join(doc.metadata.get('word') for doc in matched)}")
+            return {"relevant_docs": [(doc, 0.0) for doc in matched]}
+
+    vector_results, lexical_results = [], []
     if vectorstore:
         try:
-            results = vectorstore.similarity_search_with_score(korean_query, k=5)
-            print(f"🔍 [Search] '{korean_query}' DB 검색 수행")
-            for doc, score in results:
-                if score <= SIMILARITY_THRESHOLD:
-                    relevant_docs.append((doc, score))
-                    print(f"   ✅ 채택: {doc.metadata.get('word')} (거리: {score:.4f})")
-                else:
-                    print(f"   ❌ 제외: {doc.metadata.get('word')} (거리: {score:.4f} > {SIMILARITY_THRESHOLD})")
-            relevant_docs = relevant_docs[:3]
+            vector_results = vectorstore.similarity_search_with_score(korean_query, k=5)
+            cache_stats = get_embedding_cache_stats()
+            print(f"🔍 [Search] '{korean_query}' DB 검색 수행 (임베딩 캐시 적중률 {cache_stats['hit_rate']:.0%})")
         except Exception as e:
             print(f"⚠️ DB 검색 중 오류: {e}")
+    if lexical_index is not None:
+        lexical_results = lexical_index.search(korean_query, k=5)
+
+    relevant_docs = fuse_results(vector_results, lexical_results)[:3]
     return {"relevant_docs": relevant_docs}
 
+# ---------------------------------------------------------
+# 다중 질의 검색 (비교 질문 / 일괄 처리)
+# - 용어 직접 일치가 있는 질의는 임베딩 없이 처리
+# - 나머지는 배치 임베딩 1회 + 벡터 검색 1회 (flat: 행렬 곱 1회, Chroma: query 1회)
+# - 질의 간 중복 문서는 한 번만 사용
+# ---------------------------------------------------------
+_COMPARE_RE = re.compile(r"\s*(?:의|간|사이의?)?\s*(?:차이점?|비교|다른\s*점|공통점)")
+_ASPECT_SPLIT_RE = re.compile(r"\s*(?:,|/|\bvs\.?|(?<=\S)(?:이랑|와|과|랑|하고)(?=\s))\s*", re.I)
+
+# 용어 인덱스가 없을 때 측면으로 인정하는 최대 어절 수 ("복리가 뭐야" 같은 문장 조각 제외)
+MAX_ASPECT_WORDS = 2
+_SENTENCE_MARK_RE = re.compile(r"[?!.？！]")
+
+def _is_aspect(aspect: str) -> bool:
+    """
+    분해한 조각이 검색 측면으로 쓸 만한지
+    - 두 글자 이상 ("효과 차이" 의 '효' 처럼 명사 끝 '과/와'를 조사로 잘못 자른 조각 제외)
+    - 용어 인덱스가 있으면 용어명/별칭과 정확히 일치해야 함
+    """
+    if len(aspect.replace(" ", "")) < 2:
+        return False
+    if term_index is not None:
+        return term_index.lookup(aspect) is not None
+    return not _SENTENCE_MARK_RE.search(aspect) and len(aspect.split()) <= MAX_ASPECT_WORDS
+
+def decompose_query(query: str) -> list:
+    """
+    비교/나열 질문을 측면별 질의로 분해 (분해할 수 없으면 [query])
+    예: "ETF와 펀드 차이" -> ["ETF", "펀드"]
+    - 질의에 용어가 둘 이상 그대로 있으면 그 용어들로 분해
+    - 아니면 비교 표현 앞부분을 '와/과/,/vs' 로 나누되, 모든 조각이 측면으로 유효할 때만 사용
+    """
+    if term_index is not None:
+        terms = term_index.find_terms(query, limit=5)
+        if len(terms) >= 2:
+            return [doc.metadata.get("word") for doc in terms]
+    match = _COMPARE_RE.search(query)
+    head = query[:match.start()] if match else ""
+    aspects = [aspect.strip() for aspect in _ASPECT_SPLIT_RE.split(head) if aspect and aspect.strip()]
+    if len(aspects) >= 2 and all(_is_aspect(aspect) for aspect in aspects):
+        return aspects
+    return [query]
+
+def _vector_search_many(queries, k=5) -> list:
+    """질의별 [(doc, 거리)] (배치 임베딩 1회 + 벡터 검색 1회)"""
+    vectors = vectorstore.embeddings.embed_queries(queries)
+    if hasattr(vectorstore, "similarity_search_by_vectors"):
+        return vectorstore.similarity_search_by_vectors(vectors, k)
+    result = vectorstore._collection.query(
+        query_embeddings=vectors, n_results=k, include=["documents", "metadatas", "distances"],
+    )
+    return [
+        [
+            (Document(page_content=content, metadata=metadata or {}, id=doc_id), distance)
+            for doc_id, content, metadata, distance in zip(ids, contents, metadatas, distances)
+        ]
+        for ids, contents, metadatas, distances in zip(
+            result["ids"], result["documents"], result["metadatas"], result["distances"]
+        )
+    ]
+
+def retrieve_many(queries, per_query=MAX_ASPECT_DOCS) -> list:
+    """질의별 채택 문서 [(doc, 거리 | None)] 리스트"""
+    if vectorstore is None:
+        load_knowledge_base()
+    results = [None] * len(queries)
+    pending = []
+    for i, query in enumerate(queries):
+        matched = term_index.find_terms(query, limit=per_query) if term_index is not None else []
+        if matched:
+            results[i] = [(doc, 0.0) for doc in matched]
+        else:
+            pending.append(i)
+
+    vector_hits = {}
+    if pending and vectorstore:
+        try:
+            vector_hits = dict(zip(pending, _vector_search_many([queries[i] for i in pending])))
+            print(f"🔍 [Search] {len(pending)}개 질의 일괄 검색 수행")
+        except Exception as e:
+            print(f"⚠️ DB 일괄 검색 중 오류: {e}")
+    for i in pending:
+        lexical = lexical_index.search(queries[i], k=5) if lexical_index is not None else []
+        results[i] = fuse_results(vector_hits.get(i, []), lexical)[:per_query]
+    return results
+
+def merge_documents(results, limit=MAX_MULTI_DOCS) -> list:
+    """질의별 결과를 순위대로 번갈아 합침 (같은 문서는 한 번만, 모든 측면이 고르게 들어가도록)"""
+    merged, seen = [], set()
+    for rank in range(max((len(docs) for docs in results), default=0)):
+        for docs in results:
+            if rank < len(docs) and _doc_key(docs[rank][0]) not in seen:
+                seen.add(_doc_key(docs[rank][0]))
+                merged.append(docs[rank])
+    return merged[:limit]
+
+def _doc_key(doc) -> str:
+    return str(doc.metadata.get("original_id", doc.id))
+
+def _lexical_document(doc_id):
+    word, content = lexical_index.get(doc_id)
+    return Document(page_content=content, metadata={"original_id": doc_id, "word": word})
+
+def fuse_results(vector_results, lexical_results) -> list:
+    """
+    벡터 결과 [(doc, 거리)] 와 어휘 결과 [(ID, BM25, 용어명 일치 비율)] 를 RRF 순서로 합친 뒤
+    거리 임계값 또는 용어명 일치 비율을 통과한 문서만 [(doc, 거리 | None)] 로 반환
+    """
+    vector = {_doc_key(doc): (doc, score) for doc, score in vector_results}
+    coverage = {doc_id: cov for doc_id, _, cov in lexical_results}
+    fused = reciprocal_rank_fusion([list(vector), [doc_id for doc_id, _, _ in lexical_results]])
+
+    relevant_docs = []
+    for doc_id, _ in fused:
+        doc, score = vector.get(doc_id, (None, None))
+        if score is not None and score <= SIMILARITY_THRESHOLD:
+            relevant_docs.append((doc, score))
+            print(f"   ✅ 채택: {doc.metadata.get('word')} (거리: {score:.4f})")
+        elif coverage.get(doc_id, 0.0) >= LEXICAL_MIN_COVERAGE:
+            doc = doc or _lexical_document(doc_id)
+            relevant_docs.append((doc, score))
+            print(f"   ✅ 채택(키워드): {doc.metadata.get('word')} (용어 일치 {coverage[doc_id]:.0%})")
+        elif doc is not None:
+            print(f"   ❌ 제외: {doc.metadata.get('word')} (거리: {score:.4f} > {SIMILARITY_THRESHOLD})")
+    return relevant_docs
+
 def node_web_fallback(state: FinRAGState) -> dict:
     print(f"⚠️ [FinRAG] 내부 DB에 관련 정보 없음 (유효 문서 0개) -> 웹 검색 자동 전환")
     return node_web_search(state)
 
-def node_db_answer(state: FinRAGState) -> dict:
-    korean_query = state["korean_query"]
-    original_query = state.get("original_query")
-    relevant_docs = state.get("relevant_docs") or []
+def _build_context(relevant_docs):
     context_text = ""
     citations = []
     for doc, score in relevant_docs:
@@ -140,17 +347,17 @@ def node_db_answer(state: FinRAGState) -> dict:
         raw_content = doc.page_content
         definition = raw_content.split(":", 1)[1].strip() if ":" in raw_content else raw_content
         context_text += f"- **{word}**: {definition}\n"
-        citations.append(f"- **{word}**: {definition[:60]}... (거리: {score:.4f})")
+        match_text = f"거리: {score:.4f}" if score is not None else "키워드 일치"
+        citations.append(f"- **{word}**: {definition[:60]}... ({match_text})")
+    return context_text, citations
 
+def _rag_chain():
     system_template = load_prompt("finrag_01_system.md")
     rag_prompt = PromptTemplate.from_template(system_template)
-    rag_chain = rag_prompt | llm | StrOutputParser()
-    try:
-        ai_answer = rag_chain.invoke({"context": context_text, "question": korean_query})
-    except Exception as e:
-        ai_answer = f"죄송합니다. 답변 생성 중 오류가 발생했습니다. ({e})"
+    return rag_prompt | llm | StrOutputParser()
 
-    final_output = f"""
+def _render_db_answer(korean_query, original_query, ai_answer, citations):
+    return f"""
 ### 🌏 질문
 - **Original**: {original_query if original_query else korean_query}
 - **Translated**: {korean_query}
@@ -162,7 +369,16 @@ def node_db_answer(state: FinRAGState) -> dict:
 ### 📚 내부 참고 문헌
 {chr(10).join(citations)}
 """
-    return {"final_output": final_output}
+
+def node_db_answer(state: FinRAGState) -> dict:
+    korean_query = state["korean_query"]
+    original_query = state.get("original_query")
+    context_text, citations = _build_context(state.get("relevant_docs") or [])
+    try:
+        ai_answer = _rag_chain().invoke({"context": context_text, "question": korean_query})
+    except Exception as e:
+        ai_answer = f"죄송합니다. 답변 생성 중 오류가 발생했습니다. ({e})"
+    return {"final_output": _render_db_answer(korean_query, original_query, ai_answer, citations)}
 
 def route_after_start(state: FinRAGState) -> Literal["web_search", "db_retrieve"]:
     return "web_search" if state.get("use_web") else "db_retrieve"
@@ -202,6 +418,62 @@ def get_rag_answer(korean_query, original_query=None):
     result = graph.invoke(initial)
     return result.get("final_output", "답변을 생성하지 못했습니다.")
 
+def get_rag_answers(queries, original_query=None, combine=None):
+    """
+    여러 질의를 한 번에 처리합니다.
+    - queries: 문자열(비교 질문 -> 측면별로 분해) 또는 질의 리스트
+    - combine=True : 모든 질의의 문서를 중복 제거해 합친 뒤 답변 생성 1회 -> 문자열
+      combine=False: 질의별 답변 (답변 생성은 LLM batch 호출 1회) -> 리스트
+      기본값: 문자열이면 True, 리스트면 False
+    실시간 키워드가 있는 질의는 기존과 같이 웹 검색으로 처리
+    """
+    if vectorstore is None:
+        load_knowledge_base()
+    if isinstance(queries, str):
+        question = queries
+        queries = decompose_query(queries)
+        combine = True if combine is None else combine
+    else:
+        queries = [q for q in queries if q and q.strip()]
+        question = " / ".join(queries)
+        combine = False if combine is None else combine
+
+    if combine:
+        if any(kw in question for kw in WEB_SEARCH_KEYWORDS):
+            return get_rag_answer(question, original_query)
+        state = {
+            "korean_query": question,
+            "original_query": original_query,
+            "relevant_docs": merge_documents(retrieve_many(queries)),
+        }
+        if not state["relevant_docs"]:
+            return node_web_fallback(state)["final_output"]
+        return node_db_answer(state)["final_output"]
+
+    outputs = [None] * len(queries)
+    db_indexes = [i for i, q in enumerate(queries) if not any(kw in q for kw in WEB_SEARCH_KEYWORDS)]
+    retrieved = dict(zip(db_indexes, retrieve_many([queries[i] for i in db_indexes])))
+    pending = []
+    for i, query in enumerate(queries):
+        state = {"korean_query": query, "relevant_docs": retrieved.get(i) or []}
+        if i not in retrieved:
+            outputs[i] = node_web_search(state)["final_output"]
+        elif not state["relevant_docs"]:
+            outputs[i] = node_web_fallback(state)["final_output"]
+        else:
+            pending.append((i, query, _build_context(state["relevant_docs"])))
+
+    if pending:
+        answers = _rag_chain().batch(
+            [{"context": context_text, "question": query} for _, query, (context_text, _) in pending],
+            return_exceptions=True,
+        )
+        for (i, query, (_, citations)), answer in zip(pending, answers):
+            if isinstance(answer, Exception):
+                answer = f"죄송합니다. 답변 생성 중 오류가 발생했습니다. ({answer})"
+            outputs[i] = _render_db_answer(query, None, answer, citations)
+    return outputs
+
 if __name__ == "__main__":
     load_knowledge_base()
     print(get_rag_answer("금리가 뭐야?"))
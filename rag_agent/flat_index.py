@@ -0,0 +1,179 @@
+import os
+import json
+import time
+import hashlib
+from pathlib import Path
+
+import numpy as np
+from langchain_core.documents import Document
+
+# ---------------------------------------------------------
+# 용어집 전용 NumPy 전수(flat) 검색 백엔드
+# - 용어집은 작아서(수천 건) HNSW 없이 행렬 곱 한 번으로 정확한 top-k 계산이 충분히 빠름
+# - 모든 임베딩을 연속된 행렬 하나로 memmap -> Chroma 클라이언트/SQLite/세그먼트 로딩 없이 검색
+# - int8 양자화(행별 스케일) 선택 가능: 파일/메모리 1/4, 거리는 근사
+#   int8 은 저장용 형식: 검색은 SEARCH_BLOCK_ROWS 행씩 float32 로 풀어 BLAS 행렬 곱
+#   (NumPy 정수 행렬 곱은 BLAS를 쓰지 않아 오히려 느리고, 전체를 한 번에 풀면 임시 행렬이 커짐)
+# - 거리: Chroma "l2" 공간과 같은 제곱 L2 (||q||² + ||x||² - 2 q·x) -> SIMILARITY_THRESHOLD 그대로 사용
+# - finrag_agent 에서 FINRAG_BACKEND=flat | flat_int8 일 때 Chroma 대신 사용
+#   파일이 없으면 Chroma 컬렉션에서 임베딩을 한 번 내보내 생성
+# - utils/set_chromaDB.py 가 컬렉션을 갱신하면 rebuild_flat_indexes 로 기존 flat 파일도 다시 생성
+#   (meta 의 count/fingerprint 로 어떤 컬렉션 내용에서 만든 파일인지 확인 가능)
+# ---------------------------------------------------------
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+FLAT_INDEX_DIR = Path(os.getenv("FLAT_INDEX_DIR", PROJECT_ROOT / "data" / "financial_terms_flat"))
+FLAT_INDEX_VERSION = 1
+FLAT_DTYPES = ("f32", "int8")
+SEARCH_BLOCK_ROWS = 1024
+
+def _paths(directory: Path, dtype: str):
+    directory = Path(directory)
+    return {
+        "meta": directory / f"meta_{dtype}.json",
+        "vectors": directory / f"vectors.{dtype}",
+        "norms": directory / f"norms_{dtype}.f32",
+        "scales": directory / "scales_int8.f32",
+    }
+
+def quantize_int8(matrix):
+    """행별 대칭 스케일 int8 양자화 -> (codes, scales)"""
+    scales = np.abs(matrix).max(axis=1) / 127.0
+    scales[scales == 0] = 1.0
+    codes = np.clip(np.rint(matrix / scales[:, None]), -127, 127).astype(np.int8)
+    return codes, scales.astype(np.float32)
+
+def collection_fingerprint(ids, documents) -> str:
+    """컬렉션 내용(ID + 본문) 해시: flat 파일이 어떤 컬렉션 상태에서 만들어졌는지 비교용"""
+    digest = hashlib.sha1()
+    for doc_id, content in sorted(zip((str(i) for i in ids), (c or "" for c in documents))):
+        digest.update(f"{doc_id}\t{content}\n".encode("utf-8"))
+    return digest.hexdigest()
+
+def export_flat_index(ids, embeddings, documents, metadatas, directory=FLAT_INDEX_DIR, dtype="f32"):
+    """임베딩 행렬과 문서/메타데이터를 flat 인덱스 파일로 저장"""
+    paths = _paths(directory, dtype)
+    Path(directory).mkdir(parents=True, exist_ok=True)
+    matrix = np.ascontiguousarray(np.asarray(embeddings, dtype=np.float32))
+
+    if dtype == "int8":
+        codes, scales = quantize_int8(matrix)
+        codes.tofile(paths["vectors"])
+        scales.tofile(paths["scales"])
+        # 양자화된 벡터 기준의 노름 (검색 시 q·x 도 양자화 값으로 계산하므로)
+        norms = ((codes.astype(np.float32) * scales[:, None]) ** 2).sum(axis=1)
+    else:
+        matrix.tofile(paths["vectors"])
+        norms = (matrix ** 2).sum(axis=1)
+    norms.astype(np.float32).tofile(paths["norms"])
+
+    meta = {
+        "version": FLAT_INDEX_VERSION,
+        "dtype": dtype,
+        "count": int(matrix.shape[0]),
+        "dim": int(matrix.shape[1]),
+        "fingerprint": collection_fingerprint(ids, documents),
+        "ids": [str(i) for i in ids],
+        "documents": list(documents),
+        "metadatas": [dict(m or {}) for m in metadatas],
+    }
+    paths["meta"].write_text(json.dumps(meta, ensure_ascii=False), encoding="utf-8")
+    return paths["meta"]
+
+def export_from_chroma(chroma_store, directory=FLAT_INDEX_DIR, dtype="f32"):
+    """LangChain Chroma 객체의 컬렉션 전체를 flat 인덱스로 내보냄"""
+    data = chroma_store.get(include=["embeddings", "documents", "metadatas"])
+    return export_flat_index(data["ids"], data["embeddings"], data["documents"], data["metadatas"], directory, dtype)
+
+def rebuild_flat_indexes(ids, embeddings, documents, metadatas, directory=FLAT_INDEX_DIR) -> list:
+    """
+    이미 만들어 둔 flat 인덱스(dtype별)를 새 컬렉션 내용으로 다시 생성 (컬렉션 갱신 직후 호출)
+    만든 적 없는 dtype 은 건너뜀 -> 처음 로드 시 load_flat_store 가 생성
+    """
+    rebuilt = []
+    for dtype in FLAT_DTYPES:
+        if FlatVectorStore.exists(directory, dtype):
+            export_flat_index(ids, embeddings, documents, metadatas, directory, dtype)
+            rebuilt.append(dtype)
+    return rebuilt
+
+class FlatVectorStore:
+    """
+    finrag_agent 가 쓰는 Chroma 메서드(similarity_search_with_score, get, embeddings)와 같은 모양의 검색기
+    """
+    def __init__(self, embeddings, directory=FLAT_INDEX_DIR, dtype="f32"):
+        paths = _paths(directory, dtype)
+        meta = json.loads(paths["meta"].read_text(encoding="utf-8"))
+        if meta.get("version") != FLAT_INDEX_VERSION:
+            raise ValueError(f"flat 인덱스 버전이 다릅니다: {meta.get('version')}")
+        self.embeddings = embeddings
+        self.dtype = dtype
+        self.ids = meta["ids"]
+        self.documents = meta["documents"]
+        self.metadatas = meta["metadatas"]
+        self.fingerprint = meta.get("fingerprint")
+        shape = (meta["count"], meta["dim"])
+        self.matrix = np.memmap(paths["vectors"], dtype=np.int8 if dtype == "int8" else np.float32, mode="r", shape=shape)
+        self.norms = np.fromfile(paths["norms"], dtype=np.float32)
+        self.scales = np.fromfile(paths["scales"], dtype=np.float32) if dtype == "int8" else None
+
+    def __len__(self):
+        return len(self.ids)
+
+    @classmethod
+    def exists(cls, directory=FLAT_INDEX_DIR, dtype="f32") -> bool:
+        return _paths(directory, dtype)["meta"].exists()
+
+    def nbytes(self) -> int:
+        total = self.matrix.nbytes + self.norms.nbytes
+        return total + (self.scales.nbytes if self.scales is not None else 0)
+
+    def search_vectors(self, query_vectors, k=5):
+        """
+        질의 벡터 여러 개를 행렬 곱 한 번으로 검색
+        반환: 질의별 [(행 번호, 제곱 L2 거리)] (거리 오름차순)
+        """
+        queries = np.atleast_2d(np.asarray(query_vectors, dtype=np.float32))
+        if self.scales is None:
+            dots = self.matrix @ queries.T
+        else:
+            # int8 -> float32 는 블록 단위로 풀어서 곱함 (행렬 전체 임시 복사 없이 float32 BLAS 사용)
+            dots = np.empty((len(self.ids), queries.shape[0]), dtype=np.float32)
+            for start in range(0, len(self.ids), SEARCH_BLOCK_ROWS):
+                block = self.matrix[start:start + SEARCH_BLOCK_ROWS].astype(np.float32)
+                dots[start:start + SEARCH_BLOCK_ROWS] = block @ queries.T
+            dots *= self.scales[:, None]
+        distances = self.norms[:, None] + (queries ** 2).sum(axis=1)[None, :] - 2.0 * dots
+        np.maximum(distances, 0.0, out=distances)
+
+        k = min(k, len(self.ids))
+        results = []
+        for column in distances.T:
+            top = np.argpartition(column, k - 1)[:k] if k < len(column) else np.arange(len(column))
+            top = top[np.argsort(column[top])]
+            results.append([(int(row), float(column[row])) for row in top])
+        return results
+
+    def _document(self, row) -> Document:
+        return Document(page_content=self.documents[row], metadata=self.metadatas[row], id=self.ids[row])
+
+    def similarity_search_by_vectors(self, query_vectors, k=5):
+        """질의별 [(Document, 거리)]"""
+        return [[(self._document(row), dist) for row, dist in hits] for hits in self.search_vectors(query_vectors, k)]
+
+    def similarity_search_with_score(self, query, k=5):
+        return self.similarity_search_by_vectors([self.embeddings.embed_query(query)], k)[0]
+
+    def get(self, include=None):
+        return {"ids": list(self.ids), "documents": list(self.documents), "metadatas": list(self.metadatas)}
+
+def load_flat_store(embeddings, chroma_factory=None, directory=FLAT_INDEX_DIR, dtype="f32"):
+    """
+    flat 인덱스를 열고, 파일이 없으면 chroma_factory() 로 얻은 Chroma 컬렉션에서 한 번 내보냄
+    """
+    if not FlatVectorStore.exists(directory, dtype):
+        if chroma_factory is None:
+            raise FileNotFoundError(f"flat 인덱스가 없습니다: {directory}")
+        t0 = time.perf_counter()
+        export_from_chroma(chroma_factory(), directory, dtype)
+        print(f"📦 [FlatIndex] Chroma 임베딩 내보내기 완료 ({dtype}, {(time.perf_counter() - t0) * 1000:.0f}ms)")
+    return FlatVectorStore(embeddings, directory, dtype)
@@ -0,0 +1,187 @@
+import re
+import gzip
+import json
+import math
+import time
+import unicodedata
+from pathlib import Path
+
+# ---------------------------------------------------------
+# 금융 용어 어휘(키워드) 인덱스: 문자 2/3-gram BM25
+# - 한국어는 조사/띄어쓰기 변형이 많아 형태소 분석 없이 어절 안의 문자 n-gram으로 색인
+#     "기준금리가" -> 기준, 준금, 금리, 리가, 기준금, 준금리, 금리가
+# - 색인 대상: word + definition (word 쪽 n-gram은 WORD_WEIGHT 배로 가중)
+# - utils/set_chromaDB.py 적재 시 함께 만들어 data/financial_terms 옆에 저장
+# - 벡터 검색 결과와 RRF(reciprocal rank fusion)로 합쳐 사용 (finrag_agent.node_db_retrieve)
+# ---------------------------------------------------------
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+LEXICAL_INDEX_PATH = PROJECT_ROOT / "data" / "financial_terms_bm25.json.gz"
+INDEX_VERSION = 1
+
+NGRAM_SIZES = (2, 3)
+WORD_WEIGHT = 2
+BM25_K1 = 1.2
+BM25_B = 0.75
+RRF_K = 60
+
+_TOKEN_RE = re.compile(r"[0-9a-z가-힣]+")
+
+def char_ngrams(text: str, sizes=NGRAM_SIZES) -> list:
+    """어절별 문자 n-gram (어절이 n보다 짧으면 어절 자체, 1글자 어절은 제외)"""
+    grams = []
+    for token in _TOKEN_RE.findall(unicodedata.normalize("NFKC", text or "").lower()):
+        if len(token) < 2:
+            continue
+        if len(token) < min(sizes):
+            grams.append(token)
+            continue
+        for n in sizes:
+            grams.extend(token[i:i + n] for i in range(len(token) - n + 1))
+    return grams
+
+def _counts(grams) -> dict:
+    counts = {}
+    for gram in grams:
+        counts[gram] = counts.get(gram, 0) + 1
+    return counts
+
+class BM25Index:
+    def __init__(self, ids, words, contents, postings, doc_lengths):
+        """
+        ids/words/contents: 문서 순서대로의 용어 ID(문자열), 용어명, "word: definition" 본문
+        postings: n-gram -> [[문서 번호, 빈도], ...]
+        """
+        self.ids = ids
+        self.words = words
+        self.contents = contents
+        self.postings = postings
+        self.doc_lengths = doc_lengths
+        self.avg_length = (sum(doc_lengths) / len(doc_lengths)) if doc_lengths else 0.0
+        n = len(ids)
+        self.idf = {
+            gram: math.log(1 + (n - len(docs) + 0.5) / (len(docs) + 0.5))
+            for gram, docs in postings.items()
+        }
+        self._word_grams = [set(char_ngrams(word)) for word in words]
+        self._position = {doc_id: i for i, doc_id in enumerate(ids)}
+
+    def __len__(self):
+        return len(self.ids)
+
+    @classmethod
+    def build(cls, records):
+        """records: [{"id", "word", "definition"}] (terms 테이블 행)"""
+        ids, words, contents, lengths = [], [], [], []
+        postings = {}
+        for row in records:
+            if not row.get("word") or not row.get("definition"):
+                continue
+            index = len(ids)
+            grams = char_ngrams(row["word"]) * WORD_WEIGHT + char_ngrams(row["definition"])
+            for gram, tf in _counts(grams).items():
+                postings.setdefault(gram, []).append([index, tf])
+            ids.append(str(row["id"]))
+            words.append(row["word"])
+            contents.append(f"{row['word']}: {row['definition']}")
+            lengths.append(len(grams))
+        return cls(ids, words, contents, postings, lengths)
+
+    @classmethod
+    def from_contents(cls, ids, contents, metadatas):
+        """Chroma 컬렉션 내용("word: definition")으로 구축 (저장된 인덱스가 없을 때)"""
+        records = []
+        for doc_id, content, metadata in zip(ids, contents, metadatas):
+            word = (metadata or {}).get("word")
+            if not word or not content:
+                continue
+            definition = content.split(":", 1)[1].strip() if ":" in content else content
+            records.append({"id": doc_id, "word": word, "definition": definition})
+        return cls.build(records)
+
+    # -----------------------------------------------------
+    # 저장 / 로드
+    # -----------------------------------------------------
+    def save(self, path=LEXICAL_INDEX_PATH):
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        payload = {
+            "version": INDEX_VERSION,
+            "ngram_sizes": list(NGRAM_SIZES),
+            "ids": self.ids,
+            "words": self.words,
+            "contents": self.contents,
+            "postings": self.postings,
+            "doc_lengths": self.doc_lengths,
+        }
+        tmp = path.with_suffix(path.suffix + ".tmp")
+        with gzip.open(tmp, "wt", encoding="utf-8") as f:
+            json.dump(payload, f, ensure_ascii=False, separators=(",", ":"))
+        tmp.replace(path)
+        return path
+
+    @classmethod
+    def load(cls, path=LEXICAL_INDEX_PATH):
+        """저장된 인덱스 (없거나 형식이 다르면 None)"""
+        path = Path(path)
+        if not path.exists():
+            return None
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            payload = json.load(f)
+        if payload.get("version") != INDEX_VERSION or tuple(payload.get("ngram_sizes", ())) != NGRAM_SIZES:
+            return None
+        return cls(payload["ids"], payload["words"], payload["contents"], payload["postings"], payload["doc_lengths"])
+
+    # -----------------------------------------------------
+    # 검색
+    # -----------------------------------------------------
+    def search(self, query: str, k: int = 5) -> list:
+        """
+        BM25 상위 k개
+        반환: [(용어 ID, BM25 점수, 용어명 n-gram 중 질의에 나온 비율)]
+        """
+        query_grams = _counts(char_ngrams(query))
+        scores = {}
+        for gram, qtf in query_grams.items():
+            docs = self.postings.get(gram)
+            if not docs:
+                continue
+            idf = self.idf[gram]
+            for index, tf in docs:
+                norm = BM25_K1 * (1 - BM25_B + BM25_B * self.doc_lengths[index] / self.avg_length)
+                scores[index] = scores.get(index, 0.0) + qtf * idf * tf * (BM25_K1 + 1) / (tf + norm)
+
+        top = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:k]
+        # 용어명 일치 비율은 띄어쓰기를 뺀 질의도 함께 봄 ("기준 금리" -> "기준금리")
+        present = query_grams.keys() | set(char_ngrams(re.sub(r"\s+", "", query or "")))
+        results = []
+        for index, score in top:
+            word_grams = self._word_grams[index]
+            coverage = len(word_grams & present) / len(word_grams) if word_grams else 0.0
+            results.append((self.ids[index], score, coverage))
+        return results
+
+    def get(self, doc_id):
+        """용어 ID -> (용어명, 본문) 또는 None"""
+        index = self._position.get(str(doc_id))
+        if index is None:
+            return None
+        return self.words[index], self.contents[index]
+
+def reciprocal_rank_fusion(rankings, k: int = RRF_K) -> list:
+    """
+    여러 순위 목록(ID 리스트)을 RRF로 합침: score = sum(1 / (k + rank))
+    반환: [(ID, 점수)] 점수 내림차순
+    """
+    scores = {}
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking, start=1):
+            scores[doc_id] = scores.get(doc_id, 0.0) + 1.0 / (k + rank)
+    return sorted(scores.items(), key=lambda item: item[1], reverse=True)
+
+def build_and_save(records, path=LEXICAL_INDEX_PATH):
+    t0 = time.perf_counter()
+    index = BM25Index.build(records)
+    index.save(path)
+    print(f"✅ 어휘 인덱스 저장 완료 ({len(index)}개 용어, n-gram {len(index.postings)}개, "
+          f"{(time.perf_counter() - t0) * 1000:.0f}ms): {path}")
+    return index
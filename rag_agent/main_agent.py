@@ -14,7 +14,9 @@ from langgraph.graph import StateGraph, START, END
 from rag_agent.sql_agent import get_sql_answer
 from rag_agent.finrag_agent import get_rag_answer
 from rag_agent.transfer_agent import get_transfer_answer
+from rag_agent.transfer_context import TransferContext, InvalidTransition
 from rag_agent.web_search_rag import WebSearchRAG
+from utils.sql_metrics import query_trace, summarize_trace
 
 # 환경 변수 로드
 load_dotenv()
@@ -182,13 +184,12 @@ def node_finrag(state: MainAgentState) -> dict:
 
 def node_transfer(state: MainAgentState) -> dict:
     print("\n=== 💸 Transfer Agent 호출 ===")
-    # 최초 송금 요청 시 언어를 컨텍스트에 저장하기 위해 빈 컨텍스트 전달
-    result = get_transfer_answer(state["refined_query"], state["username"], context={})
+    # 최초 송금 요청: 새 컨텍스트(START)로 시작
+    result = get_transfer_answer(state["refined_query"], state["username"], context=None)
     if isinstance(result, dict):
         # 최초 요청이면 언어 정보를 컨텍스트에 저장
-        if result.get("context") and not result["context"].get("source_language"):
-            source_lang = state.get("source_lang", "Korean")
-            result["context"]["source_language"] = source_lang
+        if result.get("context") is not None and not result["context"].source_language:
+            result["context"].source_language = state.get("source_lang", "Korean")
         return {"transfer_result": result, "korean_answer": None}
     print("=== 💸 Transfer Agent 종료 ===\n")
     return {"korean_answer": result, "transfer_result": None}
@@ -310,14 +311,26 @@ def run_fintech_agent(question, username="test_user", transfer_context=None, all
     - transfer_context: 송금 진행 중인 상태 데이터 (있으면 즉시 송금 로직 수행)
     - allowed_views: SQL 에이전트가 조회 가능한 뷰 목록
     """
+    # 요청 단위 DB 트레이스: 하위 에이전트가 날린 쿼리를 agent 이름과 함께 수집
+    with query_trace("main_agent") as db_trace:
+        result = _run_fintech_agent(question, username, transfer_context, allowed_views)
+    print(f"🗄️ [DB Trace] {summarize_trace(db_trace)}")
+    return result
+
+def _run_fintech_agent(question, username, transfer_context, allowed_views):
     print(f"\n[User Input]: {question}")
 
     # [Priority] 송금 컨텍스트가 있으면 LangGraph 거치지 않고 바로 송금 에이전트
     if transfer_context:
         print("💸 [System] 송금 진행 중... (Context 유지)")
-        
+        # 세션/공유 저장소에 저장된 직렬화 상태도 받음
+        try:
+            transfer_context = TransferContext.load(transfer_context)
+        except InvalidTransition as e:
+            return {"status": "ERROR", "message": f"송금 상태가 올바르지 않습니다: {e}"}
+
         # 최초 질문의 언어를 컨텍스트에서 가져오기 (없으면 현재 입력으로 감지)
-        source_lang = transfer_context.get("source_language", "Korean")
+        source_lang = transfer_context.source_language or "Korean"
         
         # 버튼 신호나 숫자 입력은 번역하지 않음 (저장된 언어 사용)
         if question.strip().upper() in ("__YES__", "__NO__"):
@@ -339,7 +352,7 @@ def run_fintech_agent(question, username="test_user", transfer_context=None, all
                 # 컨텍스트에 언어가 없으면 새로 감지한 언어 저장
                 if source_lang == "Korean" and detected_lang != "Korean":
                     source_lang = detected_lang
-                    transfer_context["source_language"] = source_lang
+                    transfer_context.source_language = source_lang
             except Exception:
                 korean_query = question
         
@@ -352,8 +365,8 @@ def run_fintech_agent(question, username="test_user", transfer_context=None, all
             translated_msg = translate_answer(korean_msg, source_lang)
             transfer_result["message"] = translated_msg
             # 컨텍스트에 언어 정보 유지 (진행 중 상태일 때)
-            if "context" in transfer_result:
-                transfer_result["context"]["source_language"] = source_lang
+            if transfer_result.get("context") is not None:
+                transfer_result["context"].source_language = source_lang
         
         return transfer_result
 
@@ -1,6 +1,6 @@
 import os
 from pathlib import Path
-from typing import TypedDict
+from typing import TypedDict, Literal
 from dotenv import load_dotenv
 
 from langchain_openai import ChatOpenAI
@@ -8,7 +8,18 @@ from langchain_core.prompts import PromptTemplate
 from langchain_core.output_parsers import StrOutputParser
 from langgraph.graph import StateGraph, START, END
 
-from utils.handle_sql import get_data
+from utils.handle_sql import get_data, is_connection_error
+from utils.sql_metrics import query_trace
+from utils.schema_catalog import get_schema, invalidate_schema_cache, is_schema_error
+from utils.result_cache import cached_get_data
+from utils.create_view import get_user_id, scope_query
+from rag_agent.sql_result import (
+    MAX_RESULT_ROWS, PROMPT_ROW_LIMIT, inject_limit, numeric_columns,
+    summarize_rows, build_summary_query, parse_summary_row, format_rows,
+)
+from rag_agent.sql_validator import SQLValidationError, validate_sql, check_explain_budget
+from rag_agent.sql_plan_cache import lookup_plan, store_plan, evict_plan
+from rag_agent.sql_intents import INTENT_TEMPLATES, match_intent, render_intent_answer, record_intent_result
 
 # 1. 환경 변수 로드
 load_dotenv()
@@ -35,19 +46,11 @@ def read_prompt(filename: str) -> str:
 # DB 유틸리티 함수
 # ---------------------------------------------------------
 def get_schema_info(allowed_views: list):
+    """프롬프트용 압축 스키마 문자열 (카탈로그 캐시 사용, DESCRIBE 왕복 없음)"""
     try:
         if not allowed_views:
             return "No accessible tables provided."
-        schema_text = ""
-        for view_name in allowed_views:
-            schema_text += f"\n[Table/View: {view_name}]\n"
-            columns = get_data(f"DESCRIBE {view_name}")
-            if columns:
-                for col in columns:
-                    schema_text += f"- {col['Field']} ({col['Type']})\n"
-            else:
-                schema_text += "- (No columns found or permission denied)\n"
-        return schema_text.strip()
+        return get_schema(allowed_views)["compact"]
     except Exception as e:
         return f"스키마 조회 실패: {e}"
 
@@ -66,17 +69,103 @@ def clean_sql_query(text: str) -> str:
                 break
     return text.strip()
 
-def run_db_query(query, username):
+NO_RESULT_TEXT = "검색 결과가 없습니다."
+VALIDATION_FAILED_TEXT = "죄송합니다. 질문을 조회 가능한 형태로 변환하지 못했습니다. 조회 기간이나 항목을 조금 더 구체적으로 말씀해 주세요."
+DB_UNAVAILABLE_TEXT = "죄송합니다. 지금은 데이터베이스에 연결할 수 없습니다. 잠시 후 다시 시도해 주세요."
+MAX_REGENERATIONS = 1  # 검증 실패 시 재생성 횟수
+
+def get_schema_fingerprint(allowed_views: list):
+    """뷰 조합의 스키마 지문 (플랜 캐시 키). 조회 실패 시 None"""
+    try:
+        return get_schema(allowed_views)["fingerprint"] if allowed_views else None
+    except Exception:
+        return None
+
+def _fetch_user_rows(query, args, user_id):
+    """사용자 뷰를 user_id 필터 CTE로 치환해 실행 (사용자별 결과 캐시 경유)"""
+    scoped_query, scoped_args = scope_query(query, user_id, args)
+    return cached_get_data(user_id, scoped_query, scoped_args)
+
+# 플랜 캐시 슬롯 값 검증: 값 종류가 적은 컬럼 -> 값 목록을 읽을 사용자 뷰
+PLAN_SLOT_DOMAINS = {
+    "category": "current_user_transactions",
+    "transaction_type": "current_user_transactions",
+}
+
+def _plan_domain_lookup(user_id):
+    """lookup_plan 용 domain_of(column): 컬럼 값 목록을 요청 안에서 한 번만 조회"""
+    domains = {}
+
+    def domain_of(column):
+        view = PLAN_SLOT_DOMAINS.get(column)
+        if view is None or user_id is None:
+            return None
+        if column not in domains:
+            try:
+                with query_trace("sql_agent"):
+                    rows = _fetch_user_rows(f"SELECT DISTINCT {column} AS value FROM {view}", None, user_id)
+                domains[column] = {str(r["value"]).lower() for r in rows if r["value"] is not None}
+            except Exception as e:
+                print(f"⚠️ [PlanCache] {column} 값 목록 조회 실패, 슬롯 검증 생략: {e}")
+                domains[column] = None
+        return domains[column]
+    return domain_of
+
+def _fetch_summary(query, args, rows, user_id=None):
+    """LIMIT에 잘린 경우 전체 결과에 대한 count/sum/min/max를 DB에서 한 번에 계산"""
+    columns = numeric_columns(rows)
+    try:
+        with query_trace("sql_agent"):
+            summary_rows = _fetch_user_rows(build_summary_query(query, columns), args, user_id)
+        return parse_summary_row(summary_rows[0], columns)
+    except Exception as e:
+        print(f"⚠️ [DB] 결과 요약 쿼리 실패, 가져온 행 기준으로 요약: {e}")
+        # 전체 행 수는 알 수 없음 (가져온 행 수를 전체로 표시하지 않도록)
+        return dict(summarize_rows(rows), row_count=None)
+
+def _execute_query(query, args=None, user_id=None):
+    """쿼리를 실행하고 (프롬프트용 결과 문자열, 오류)를 반환"""
     try:
         if not query:
-            return "생성된 쿼리가 없습니다."
-        print(f"🔄 [DB Executing]: {query}")
-        result = get_data(query)
+            return "생성된 쿼리가 없습니다.", None
+        # 상한 + 1행을 가져와서 잘렸는지 판단
+        limited_query, limited_args = inject_limit(query, MAX_RESULT_ROWS + 1, args)
+        print(f"🔄 [DB Executing]: {limited_query}" + (f" | params={limited_args}" if limited_args else ""))
+        with query_trace("sql_agent") as trace:
+            result = _fetch_user_rows(limited_query, limited_args, user_id)
+        if trace:
+            last = trace[-1]
+            print(f"⏱️ [DB] {last['total_ms']:.1f}ms (connect {last['connect_ms']:.1f} / execute {last['execute_ms']:.1f} / fetch {last['fetch_ms']:.1f}), {last['rows']}행")
         if not result:
-            return "검색 결과가 없습니다."
-        return str(result)
+            return NO_RESULT_TEXT, None
+        rows = list(result)
+        truncated = len(rows) > MAX_RESULT_ROWS
+        if truncated:
+            rows = rows[:MAX_RESULT_ROWS]
+            summary = _fetch_summary(query, args, rows, user_id)
+        elif len(rows) > PROMPT_ROW_LIMIT:
+            summary = summarize_rows(rows)
+        else:
+            summary = None
+        return format_rows(rows, summary, truncated), None
     except Exception as e:
-        return f"SQL 실행 오류: {e}"
+        return f"SQL 실행 오류: {e}", e
+
+def resolve_user_id(username):
+    """사용자 뷰 필터/결과 캐시 키용 user_id (조회 실패 시 None -> 사용자 뷰 조회 불가)"""
+    try:
+        return get_user_id(username) if username else None
+    except Exception:
+        return None
+
+def run_db_query(query, username, args=None):
+    return _execute_query(query, args, resolve_user_id(username))[0]
+
+def render_query(query, args=None):
+    """파라미터가 바인딩된 쿼리를 사람이 읽을 수 있는 형태로 (답변 프롬프트용)"""
+    if not args:
+        return query
+    return query % tuple(f"'{a}'" if isinstance(a, str) else a for a in args)
 
 # ---------------------------------------------------------
 # [LangGraph] SQL 에이전트 상태
@@ -84,32 +173,143 @@ def run_db_query(query, username):
 class SQLAgentState(TypedDict, total=False):
     question: str
     username: str
+    user_id: int
     allowed_views: list
     schema: str
     query: str
     result: str
     response: str
+    intent: str
+    schema_fingerprint: str
+    query_args: tuple
+    plan_key: tuple
+    plan_rejected: bool
+    validation_error: str
+    gen_attempts: int
 
 # ---------------------------------------------------------
 # [LangGraph] 노드
 # ---------------------------------------------------------
+def node_intent(state: SQLAgentState) -> dict:
+    """자주 묻는 의도는 LLM 없이 고정 쿼리 + 템플릿 답변으로 처리"""
+    matched = match_intent(state["question"], state.get("allowed_views") or [])
+    if matched is None:
+        record_intent_result(None)
+        return {}
+    intent, args = matched
+    try:
+        query = INTENT_TEMPLATES[intent]["query"]
+        print(f"⚡ [Intent] '{intent}' 템플릿 매칭 -> LLM 생략")
+        with query_trace("sql_agent"):
+            rows = _fetch_user_rows(query, args, state.get("user_id"))
+        response = render_intent_answer(intent, rows)
+    except Exception as e:
+        # 템플릿 실행 실패 시 기존 Text-to-SQL 경로로 폴백
+        print(f"⚠️ [Intent] '{intent}' 실행 실패, LLM 경로로 전환: {e}")
+        record_intent_result(None)
+        return {}
+    record_intent_result(intent)
+    return {"intent": intent, "query": query, "response": response}
+
+def _refreshed_schema(state: SQLAgentState) -> dict:
+    """캐시된 스키마가 실제 DB와 맞지 않을 때: 스키마 캐시를 비우고 새 스키마/지문을 반환"""
+    invalidate_schema_cache()
+    allowed_views = state.get("allowed_views") or []
+    return {"schema": get_schema_info(allowed_views), "schema_fingerprint": get_schema_fingerprint(allowed_views)}
+
+def _reject_plan(state: SQLAgentState, error) -> dict:
+    """캐시된 플랜이 검증/실행에 실패: 플랜을 제거하고 새로 생성하도록 상태 초기화"""
+    evict_plan(state["plan_key"])
+    print(f"↪️ [PlanCache] 플랜 실패, SQL 새로 생성: {error}")
+    return {"plan_key": None, "query": None, "query_args": None, "validation_error": None, "plan_rejected": True}
+
 def node_schema(state: SQLAgentState) -> dict:
-    schema = get_schema_info(state.get("allowed_views") or [])
-    return {"schema": schema}
+    allowed_views = state.get("allowed_views") or []
+    schema = get_schema_info(allowed_views)
+    return {"schema": schema, "schema_fingerprint": get_schema_fingerprint(allowed_views)}
+
+def node_plan_lookup(state: SQLAgentState) -> dict:
+    """같은 골격의 질문에 대해 검증된 SQL 템플릿이 있으면 리터럴만 바인딩해 재사용"""
+    fingerprint = state.get("schema_fingerprint")
+    if not fingerprint:
+        return {}
+    hit = lookup_plan(state["question"], fingerprint, _plan_domain_lookup(state.get("user_id")))
+    if hit is None:
+        return {}
+    plan_key, query, args = hit
+    print(f"♻️ [PlanCache] 적중: '{plan_key[1]}' -> SQL 생성 생략")
+    return {"plan_key": plan_key, "query": query, "query_args": args}
 
 def node_sql_gen(state: SQLAgentState) -> dict:
     template = read_prompt("sql_01_generation.md")
     prompt = PromptTemplate.from_template(template)
     chain = prompt | llm | StrOutputParser()
+    # 이전 시도가 검증에 실패했다면 사유를 함께 전달해 재생성
+    error = state.get("validation_error")
+    feedback = (
+        f"# Previous Attempt (REJECTED)\n{state.get('query', '')}\n"
+        f"- Reason: {error}\n- Fix the problem and write the query again.\n"
+    ) if error else ""
     raw = chain.invoke({
         "question": state["question"],
         "schema": state["schema"],
+        "feedback": feedback,
     })
     query = clean_sql_query(raw)
-    return {"query": query}
+    return {
+        "query": query, "gen_attempts": state.get("gen_attempts", 0) + 1,
+        "validation_error": None, "plan_rejected": False,
+    }
+
+def node_validate(state: SQLAgentState) -> dict:
+    """
+    실행 전 로컬 파싱/권한 검사 + EXPLAIN 예상 행 수 검사
+    플랜 캐시 적중도 바인딩된 값으로 같은 검사를 거치고, 실패하면 플랜을 버리고 새로 생성
+    """
+    refreshed = {}
+    try:
+        query = validate_sql(state.get("query"), state.get("allowed_views") or [])
+        limited_query, limited_args = inject_limit(query, MAX_RESULT_ROWS + 1, state.get("query_args"))
+        explain_query, explain_args = scope_query(limited_query, state.get("user_id"), limited_args)
+        with query_trace("sql_agent"):
+            plan = get_data("EXPLAIN " + explain_query, explain_args)
+        estimate = check_explain_budget(plan)
+        print(f"🛡️ [Validate] 통과 (예상 처리 행 수: {estimate:,})")
+        return {"query": query, "validation_error": None}
+    except SQLValidationError as e:
+        error = str(e)
+    except Exception as e:
+        if is_connection_error(e):
+            # DB 장애는 SQL 문제가 아니므로 재생성(LLM 호출) 없이 종료
+            print(f"⚠️ [Validate] DB 연결 실패, 재생성 없이 종료: {e}")
+            return {"validation_error": f"DB 연결 오류: {e}", "response": DB_UNAVAILABLE_TEXT}
+        # EXPLAIN 단계의 문법 오류 등 (데이터 스캔 없이 검출)
+        error = f"MySQL 오류: {e}"
+        if is_schema_error(e):
+            # 캐시된 스키마로 만든 SQL이 실제 DB와 맞지 않음 -> 새 스키마로 재생성
+            refreshed = _refreshed_schema(state)
+    print(f"🛡️ [Validate] 거부: {error}")
+    if state.get("plan_key"):
+        return {**_reject_plan(state, error), **refreshed}
+    if state.get("gen_attempts", 0) > MAX_REGENERATIONS:
+        return {"validation_error": error, "response": VALIDATION_FAILED_TEXT}
+    return {"validation_error": error, **refreshed}
 
 def node_execute(state: SQLAgentState) -> dict:
-    result = run_db_query(state["query"], state["username"])
+    query = state.get("query")
+    result, error = _execute_query(query, state.get("query_args"), state.get("user_id"))
+    plan_key = state.get("plan_key")
+    if error is not None:
+        if plan_key and not is_connection_error(error):
+            # 캐시된 플랜이 실패하면 제거하고 SQL을 새로 생성 (스키마 오류면 새 스키마로)
+            refreshed = _refreshed_schema(state) if is_schema_error(error) else {}
+            return {**_reject_plan(state, error), **refreshed}
+        if is_schema_error(error):
+            invalidate_schema_cache()
+        return {"result": result}
+    # 새로 생성된 SQL이 실행에 성공하고 결과가 있으면 플랜으로 저장
+    if not plan_key and query and result != NO_RESULT_TEXT and state.get("schema_fingerprint"):
+        store_plan(state["question"], query, state["schema_fingerprint"])
     return {"result": result}
 
 def node_answer(state: SQLAgentState) -> dict:
@@ -118,11 +318,27 @@ def node_answer(state: SQLAgentState) -> dict:
     chain = prompt | llm | StrOutputParser()
     response = chain.invoke({
         "question": state["question"],
-        "query": state["query"],
+        "query": render_query(state["query"], state.get("query_args")),
         "result": state["result"],
     })
     return {"response": response}
 
+def route_after_intent(state: SQLAgentState) -> Literal["schema", "end"]:
+    return "end" if state.get("response") else "schema"
+
+def route_after_plan(state: SQLAgentState) -> Literal["validate", "sql_gen"]:
+    return "validate" if state.get("plan_key") else "sql_gen"
+
+def route_after_validate(state: SQLAgentState) -> Literal["execute", "sql_gen", "end"]:
+    if state.get("plan_rejected"):
+        return "sql_gen"
+    if not state.get("validation_error"):
+        return "execute"
+    return "end" if state.get("response") else "sql_gen"
+
+def route_after_execute(state: SQLAgentState) -> Literal["answer", "sql_gen"]:
+    return "sql_gen" if state.get("plan_rejected") else "answer"
+
 # ---------------------------------------------------------
 # 그래프 빌드
 # ---------------------------------------------------------
@@ -132,14 +348,20 @@ def _get_sql_graph():
     global _sql_graph
     if _sql_graph is None:
         builder = StateGraph(SQLAgentState)
+        builder.add_node("intent", node_intent)
         builder.add_node("schema", node_schema)
+        builder.add_node("plan_lookup", node_plan_lookup)
         builder.add_node("sql_gen", node_sql_gen)
+        builder.add_node("validate", node_validate)
         builder.add_node("execute", node_execute)
         builder.add_node("answer", node_answer)
-        builder.add_edge(START, "schema")
-        builder.add_edge("schema", "sql_gen")
-        builder.add_edge("sql_gen", "execute")
-        builder.add_edge("execute", "answer")
+        builder.add_edge(START, "intent")
+        builder.add_conditional_edges("intent", route_after_intent, {"end": END, "schema": "schema"})
+        builder.add_edge("schema", "plan_lookup")
+        builder.add_conditional_edges("plan_lookup", route_after_plan, {"validate": "validate", "sql_gen": "sql_gen"})
+        builder.add_edge("sql_gen", "validate")
+        builder.add_conditional_edges("validate", route_after_validate, {"execute": "execute", "sql_gen": "sql_gen", "end": END})
+        builder.add_conditional_edges("execute", route_after_execute, {"answer": "answer", "sql_gen": "sql_gen"})
         builder.add_edge("answer", END)
         _sql_graph = builder.compile()
     return _sql_graph
@@ -153,11 +375,13 @@ def get_sql_answer(question, username, allowed_views=None):
             allowed_views = []
         print(f"\n🔍 [SQL Agent] 질문 분석: '{question}' (User: {username})")
         graph = _get_sql_graph()
-        result = graph.invoke({
-            "question": question,
-            "username": username,
-            "allowed_views": allowed_views,
-        })
+        with query_trace("sql_agent"):
+            result = graph.invoke({
+                "question": question,
+                "username": username,
+                "user_id": resolve_user_id(username),
+                "allowed_views": allowed_views,
+            })
         return result.get("response", "응답을 생성하지 못했습니다.")
     except Exception as e:
         error_msg = f"데이터 조회 중 오류가 발생했습니다: {e}"
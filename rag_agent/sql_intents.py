@@ -0,0 +1,192 @@
+import re
+import threading
+from collections import Counter
+
+# ---------------------------------------------------------
+# 자주 묻는 DATABASE 의도 템플릿
+# - 질문을 로컬 정규식으로 매칭 -> 미리 작성된 파라미터 쿼리 실행 -> 템플릿으로 답변
+# - 매칭되지 않으면 None을 반환하고 기존 LLM Text-to-SQL 경로로 넘어갑니다.
+# - 답변은 한국어 템플릿이며, 다른 언어 사용자는 main_agent 역번역 단계에서 번역됩니다.
+# ---------------------------------------------------------
+DEFAULT_RECENT_COUNT = 5
+MAX_RECENT_COUNT = 20
+
+_PRIMARY_RE = re.compile(r"주\s*계좌|대표\s*계좌|주거래\s*계좌|월급\s*통장")
+_BALANCE_RE = re.compile(r"잔액|잔고|얼마\s*있|돈\s*얼마")
+_TRANSACTION_RE = re.compile(r"거래|내역|썼|쓴|지출|소비|입금|출금")
+_RECENT_RE = re.compile(r"최근|마지막|최신")
+_COUNT_RE = re.compile(r"(\d+)\s*(?:건|개(?!월)|번)")
+_THIS_MONTH_RE = re.compile(r"이번\s*달|이번\s*월|당월|이달")
+_CATEGORY_RE = re.compile(r"카테고리|항목|분야|종류|분류")
+_SPENDING_RE = re.compile(r"지출|소비|썼|쓴|사용")
+_LIST_RE = re.compile(r"거래|내역")
+
+# 템플릿이 반영하지 못하는 조건 (기간/거래 유형/카테고리)
+# -> 템플릿이 직접 쓰는 표현을 뺀 나머지에 하나라도 있으면 다른 질문이므로 LLM 경로로
+_QUALIFIER_RES = {
+    "time": re.compile(
+        r"지난|저번|전\s*달|전월|작년|올해|금년|어제|오늘|그제|내일|이번\s*(?:주|달|월|해)|이달|당월|주말|평일"
+        r"|분기|상반기|하반기|일주일|한\s*달|\d+\s*(?:년|월|일|주|개월|시)|부터|까지|동안|이후|이전|전에"
+    ),
+    "type": re.compile(r"입금|출금|송금|이체|결제|환전|환불|수입|월급|급여|받은|보낸|들어온|나간|지출|소비|썼|쓴|사용"),
+    "category": re.compile(
+        r"식비|음식|외식|배달|카페|커피|편의점|마트|쇼핑|교통|택시|주유|통신|주거|월세|관리비|공과금|의료|병원|약국"
+        r"|보험|교육|학원|문화|여가|여행|구독|생활|기타|카테고리|항목|분야|종류|분류"
+    ),
+}
+
+TRANSACTION_TYPE_LABELS = {"TRANSFER": "송금", "DEPOSIT": "입금", "WITHDRAWAL": "출금", "PAYMENT": "결제"}
+
+INTENT_TEMPLATES = {
+    "primary_balance": {
+        "views": ["current_user_accounts"],
+        "query": "SELECT balance FROM current_user_accounts WHERE is_primary = 1 LIMIT 1",
+        "answer": "주 계좌 잔액은 **{balance:,}원**입니다.",
+    },
+    "total_balance": {
+        "views": ["current_user_accounts"],
+        "query": """
+            SELECT COUNT(*) AS account_count, COALESCE(SUM(balance), 0) AS total_balance
+            FROM current_user_accounts
+        """,
+        "answer": "현재 잔액은 **{total_balance:,}원**입니다.",
+        "answer_multi": "현재 잔액은 계좌 {account_count}개 합계 **{total_balance:,}원**입니다.",
+    },
+    "recent_transactions": {
+        "views": ["current_user_transactions"],
+        "query": """
+            SELECT transaction_type, amount, balance_after, description, category, created_at
+            FROM current_user_transactions
+            ORDER BY created_at DESC
+            LIMIT %s
+        """,
+        "header": "최근 거래 내역 {count}건입니다.",
+        "line": "- {date} {label} {amount:+,}원 (잔액 {balance_after:,}원)",
+    },
+    "monthly_category_spending": {
+        "views": ["current_user_transactions"],
+        "query": """
+            SELECT COALESCE(category, '기타') AS category, SUM(-amount) AS total
+            FROM current_user_transactions
+            WHERE amount < 0
+            AND created_at >= DATE_FORMAT(CURDATE(), '%%Y-%%m-01')
+            GROUP BY COALESCE(category, '기타')
+            ORDER BY total DESC
+        """,
+        "header": "이번 달 카테고리별 지출 내역입니다.",
+        "line": "- {category}: {total:,}원",
+        "footer": "합계: **{grand_total:,}원**",
+    },
+}
+
+EMPTY_ANSWER = "해당 조건에 맞는 내역을 찾을 수 없습니다."
+
+# ---------------------------------------------------------
+# 적중률 지표
+# ---------------------------------------------------------
+_metrics_lock = threading.Lock()
+_hits = Counter()
+_misses = 0
+
+def record_intent_result(intent: str | None):
+    global _misses
+    with _metrics_lock:
+        if intent:
+            _hits[intent] += 1
+        else:
+            _misses += 1
+
+def get_intent_metrics() -> dict:
+    with _metrics_lock:
+        hits = sum(_hits.values())
+        total = hits + _misses
+        return {
+            "hits": hits,
+            "misses": _misses,
+            "hit_rate": hits / total if total else 0.0,
+            "by_intent": dict(_hits),
+        }
+
+# ---------------------------------------------------------
+# 매칭
+# ---------------------------------------------------------
+def unbound_qualifiers(text: str, bound=()) -> list:
+    """템플릿이 이미 반영한 표현(bound 정규식)을 지운 뒤 남아 있는 조건 종류 목록"""
+    for pattern in bound:
+        text = pattern.sub(" ", text)
+    return [name for name, pattern in _QUALIFIER_RES.items() if pattern.search(text)]
+
+def match_intent(question: str, allowed_views: list):
+    """
+    질문을 의도 템플릿에 매칭합니다.
+    반환: (intent 이름, 쿼리 파라미터 tuple) 또는 None
+    """
+    text = (question or "").strip()
+    if not text:
+        return None
+
+    intent, args, bound = None, (), ()
+    if _THIS_MONTH_RE.search(text) and _CATEGORY_RE.search(text) and _SPENDING_RE.search(text):
+        intent, bound = "monthly_category_spending", (_THIS_MONTH_RE, _CATEGORY_RE, _SPENDING_RE)
+    elif _RECENT_RE.search(text) and _LIST_RE.search(text):
+        count_match = _COUNT_RE.search(text)
+        count = int(count_match.group(1)) if count_match else DEFAULT_RECENT_COUNT
+        intent, args = "recent_transactions", (max(1, min(count, MAX_RECENT_COUNT)),)
+        bound = (_RECENT_RE, _LIST_RE, _COUNT_RE)
+    elif _BALANCE_RE.search(text) and not _TRANSACTION_RE.search(text):
+        intent = "primary_balance" if _PRIMARY_RE.search(text) else "total_balance"
+        bound = (_PRIMARY_RE, _BALANCE_RE)
+
+    if intent is None:
+        return None
+    # "지난달 잔액", "최근 입금 내역", "최근 식비 거래 5건" 처럼 템플릿에 없는 조건이 붙으면 LLM 경로로
+    unbound = unbound_qualifiers(text, bound)
+    if unbound:
+        print(f"↪️ [Intent] '{intent}' 후보지만 템플릿에 없는 조건({', '.join(unbound)})이 있어 LLM 경로로")
+        return None
+    # 템플릿이 쓰는 뷰가 현재 사용자에게 허용되지 않았다면 LLM 경로로
+    if not all(v in (allowed_views or []) for v in INTENT_TEMPLATES[intent]["views"]):
+        return None
+    return intent, args
+
+# ---------------------------------------------------------
+# 답변 렌더링
+# ---------------------------------------------------------
+def _won(value) -> int:
+    return int(round(float(value or 0)))
+
+def render_intent_answer(intent: str, rows: list) -> str:
+    template = INTENT_TEMPLATES[intent]
+    if not rows:
+        return EMPTY_ANSWER
+
+    if intent == "primary_balance":
+        return template["answer"].format(balance=_won(rows[0]["balance"]))
+
+    if intent == "total_balance":
+        row = rows[0]
+        count = int(row["account_count"] or 0)
+        if count == 0:
+            return EMPTY_ANSWER
+        key = "answer_multi" if count > 1 else "answer"
+        return template[key].format(account_count=count, total_balance=_won(row["total_balance"]))
+
+    if intent == "recent_transactions":
+        lines = [template["header"].format(count=len(rows))]
+        for row in rows:
+            created_at = row.get("created_at")
+            lines.append(template["line"].format(
+                date=created_at.strftime("%Y-%m-%d") if hasattr(created_at, "strftime") else str(created_at or ""),
+                label=row.get("description") or TRANSACTION_TYPE_LABELS.get(row.get("transaction_type"), row.get("transaction_type") or ""),
+                amount=_won(row["amount"]),
+                balance_after=_won(row["balance_after"]),
+            ))
+        return "\n".join(lines)
+
+    if intent == "monthly_category_spending":
+        lines = [template["header"]]
+        lines.extend(template["line"].format(category=row["category"], total=_won(row["total"])) for row in rows)
+        lines.append(template["footer"].format(grand_total=sum(_won(row["total"]) for row in rows)))
+        return "\n".join(lines)
+
+    return EMPTY_ANSWER
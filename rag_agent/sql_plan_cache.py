@@ -0,0 +1,255 @@
+import re
+import threading
+from collections import OrderedDict
+
+# ---------------------------------------------------------
+# Text-to-SQL 플랜 캐시
+# - 검증된(실행 성공) 생성 SQL을 파라미터 템플릿으로 저장
+# - 키: (스키마 지문, 질문 골격)  예) "지난달 {0} 얼마 썼어"
+# - 적중 시 새 질문의 리터럴을 바인딩하고 생성 LLM 호출을 생략
+# - 적중해도 검증(validate) 단계를 거치며, 검증/실행 오류가 나면 제거 후 SQL을 새로 생성. 스키마 지문이 바뀌어도 제거
+# - 문자열 슬롯은 비교 대상 컬럼을 기억해 두고, 바인딩 값이 그 컬럼의 값 목록(domain_of)에 없으면 미적중
+#   예) "지난달 {0} 얼마 썼어" 에 '전체' 는 category 값이 아니므로 재사용하지 않음
+# - 날짜 리터럴('2026-09-01', YEAR(...) = 2026)이 박힌 SQL은 달이 바뀌면 틀리므로 저장하지 않음
+# ---------------------------------------------------------
+MAX_PLANS = 256
+
+# 한국어 조사: 리터럴 뒤에 붙어도 같은 슬롯으로 인정
+_PARTICLES = ("으로", "에서", "은", "는", "이", "가", "을", "를", "로", "에", "도", "만")
+
+_SQL_STRING_RE = re.compile(r"'((?:[^'\\]|\\.|'')*)'")
+_SQL_NUMBER_RE = re.compile(r"(?<![\w.'])\d+(?:\.\d+)?(?![\w.'])")
+_QUESTION_NUMBER_RE = re.compile(r"\d+(?:\.\d+)?")
+_LIKE_RE = re.compile(r"^(%?)(.*?)(%?)$", re.S)
+_BINDABLE_TEXT_RE = re.compile(r"^[0-9A-Za-z가-힣]+$")
+# 리터럴 바로 앞의 "컬럼 =", "컬럼 LIKE", "컬럼 IN (..." -> 슬롯의 컬럼
+_COMPARED_COLUMN_RE = re.compile(
+    r"([A-Za-z_][\w.]*)`?\s*(?:=|!=|<>|(?:NOT\s+)?LIKE|(?:NOT\s+)?IN\s*\([^()]*?)\s*$", re.I
+)
+_DATE_LITERAL_RE = re.compile(r"'\d{4}-\d{1,2}(?:-\d{1,2})?(?:[ T][\d:.]+)?'")
+_DATE_PART_COMPARE_RE = re.compile(r"\b(?:YEAR|MONTH|QUARTER|WEEK|DAY)\s*\([^()]*\)\s*(?:=|<>|!=|>=|<=|>|<|IN|BETWEEN)\s*\(?\s*\d", re.I)
+# 어떤 컬럼 값도 아닌 범위 표현 (값 목록을 모를 때도 슬롯에 넣지 않음)
+_NON_VALUE_WORDS = {"전체", "모든", "모두", "전부", "다", "총", "합계", "전체적", "각", "각각", "all", "total"}
+
+_lock = threading.Lock()
+_plans = OrderedDict()
+_stats = {"hits": 0, "misses": 0, "stores": 0, "evictions": 0}
+
+def normalize_question(question: str) -> str:
+    text = re.sub(r"\s+", " ", (question or "").strip())
+    return text.rstrip("?!.。 ").strip()
+
+def _sql_literals(sql: str):
+    """SQL 안의 문자열/숫자 리터럴 위치 목록 [(start, end, kind, value)]"""
+    literals = []
+    string_spans = []
+    for m in _SQL_STRING_RE.finditer(sql):
+        literals.append((m.start(), m.end(), "str", m.group(1)))
+        string_spans.append((m.start(), m.end()))
+    for m in _SQL_NUMBER_RE.finditer(sql):
+        if any(s <= m.start() < e for s, e in string_spans):
+            continue
+        literals.append((m.start(), m.end(), "num", m.group(0)))
+    return sorted(literals)
+
+def _compared_column(sql: str, start: int):
+    match = _COMPARED_COLUMN_RE.search(sql[:start])
+    return match.group(1).split(".")[-1].strip("`").lower() if match else None
+
+def is_time_dependent(sql: str) -> bool:
+    """오늘 날짜에 따라 달라져야 하는 리터럴 날짜 조건이 있는지 (플랜으로 저장 불가)"""
+    return bool(_DATE_LITERAL_RE.search(sql) or _DATE_PART_COMPARE_RE.search(sql))
+
+def _split_particle(token: str):
+    for particle in _PARTICLES:
+        if token.endswith(particle) and len(token) > len(particle):
+            yield token[: -len(particle)], particle
+    yield token, ""
+
+def build_plan(question: str, sql: str):
+    """
+    (질문, 실행에 성공한 SQL)로부터 플랜을 만듭니다.
+    질문 토큰과 SQL 리터럴이 일치하는 부분을 슬롯으로 치환합니다.
+    반환: {"skeleton", "pattern", "sql", "slots"}
+    """
+    question = normalize_question(question)
+    literals = _sql_literals(sql)
+
+    skeleton_parts, pattern_parts, slots = [], [], []
+    slot_of_value = {}
+
+    for i, token in enumerate(question.split(" ")):
+        if i:
+            skeleton_parts.append(" ")
+            pattern_parts.append(" ")
+        slotted = False
+        for core, particle in _split_particle(token):
+            if not core:
+                continue
+            for start, _, kind, value in literals:
+                like = _LIKE_RE.match(value) if kind == "str" else None
+                if kind == "str" and like.group(2) == core and _BINDABLE_TEXT_RE.match(core):
+                    slot_key = ("str", core)
+                    regex = r"([0-9A-Za-z가-힣]+?)"
+                elif kind == "num" and value == core:
+                    slot_key = ("num", core)
+                    regex = r"(\d+(?:\.\d+)?)"
+                else:
+                    continue
+                if slot_key not in slot_of_value:
+                    slot_of_value[slot_key] = len(slots)
+                    slots.append({
+                        "kind": slot_key[0],
+                        "value": core,
+                        "column": _compared_column(sql, start) if kind == "str" else None,
+                        "like": bool(like and (like.group(1) or like.group(3))),
+                    })
+                idx = slot_of_value[slot_key]
+                skeleton_parts.append(f"{{{idx}}}{particle}")
+                pattern_parts.append(f"{regex}{re.escape(particle)}")
+                slotted = True
+                break
+            if slotted:
+                break
+        if not slotted:
+            # 토큰 안의 숫자(예: "3건")도 SQL 숫자 리터럴과 같으면 슬롯
+            pos = 0
+            for m in _QUESTION_NUMBER_RE.finditer(token):
+                if not any(kind == "num" and value == m.group(0) for _, _, kind, value in literals):
+                    continue
+                slot_key = ("num", m.group(0))
+                if slot_key not in slot_of_value:
+                    slot_of_value[slot_key] = len(slots)
+                    slots.append({"kind": "num", "value": m.group(0)})
+                idx = slot_of_value[slot_key]
+                skeleton_parts.append(token[pos:m.start()] + f"{{{idx}}}")
+                pattern_parts.append(re.escape(token[pos:m.start()]) + r"(\d+(?:\.\d+)?)")
+                pos = m.end()
+            skeleton_parts.append(token[pos:])
+            pattern_parts.append(re.escape(token[pos:]))
+
+    # SQL 템플릿: 슬롯 리터럴 -> %s, 나머지 '%'는 pymysql 포맷용으로 이스케이프
+    sql_parts, param_slots, pos = [], [], 0
+    for start, end, kind, value in literals:
+        like = _LIKE_RE.match(value) if kind == "str" else None
+        core = like.group(2) if like else value
+        idx = slot_of_value.get((kind, core))
+        if idx is None:
+            continue
+        sql_parts.append(sql[pos:start].replace("%", "%%"))
+        sql_parts.append("%s")
+        param_slots.append((idx, like.group(1) if like else "", like.group(3) if like else ""))
+        pos = end
+    sql_parts.append(sql[pos:].replace("%", "%%"))
+
+    return {
+        "skeleton": "".join(skeleton_parts),
+        "pattern": re.compile("".join(pattern_parts)),
+        "sql": "".join(sql_parts),
+        "params": param_slots,
+        "slots": slots,
+    }
+
+def _valid_slot_value(slot: dict, value: str, domain_of) -> bool:
+    """문자열 슬롯 값 검사: 범위 표현 거부, 값 목록을 아는 컬럼(=, IN)이면 목록 안의 값만 허용"""
+    if value == slot["value"]:
+        return True
+    if value.lower() in _NON_VALUE_WORDS:
+        return False
+    if slot.get("like") or not slot.get("column") or domain_of is None:
+        return True
+    domain = domain_of(slot["column"])
+    return domain is None or value.lower() in domain
+
+def _bind(plan: dict, match, domain_of=None):
+    """슬롯 값을 SQL 파라미터로 변환. 값이 슬롯의 도메인에 맞지 않으면 None"""
+    values = []
+    for slot, raw in zip(plan["slots"], match.groups()):
+        if slot["kind"] == "num":
+            values.append(float(raw) if "." in raw else int(raw))
+        elif _valid_slot_value(slot, raw, domain_of):
+            values.append(raw)
+        else:
+            print(f"↪️ [PlanCache] '{raw}' 는 {slot.get('column') or '슬롯'} 값이 아니므로 플랜 재사용 안 함")
+            return None
+    params = []
+    for idx, prefix, suffix in plan["params"]:
+        value = values[idx]
+        params.append(f"{prefix}{value}{suffix}" if (prefix or suffix) else value)
+    return tuple(params)
+
+# ---------------------------------------------------------
+# 외부 호출용 함수
+# ---------------------------------------------------------
+def lookup_plan(question: str, schema_fingerprint: str, domain_of=None):
+    """
+    캐시된 플랜에 질문을 매칭합니다.
+    domain_of(column) -> 소문자 값 집합 | None : 문자열 슬롯 값 검증용 (None 이면 검증 생략)
+    반환: (plan_key, sql, params) 또는 None
+    """
+    question = normalize_question(question)
+    with _lock:
+        # 스키마가 바뀌었으면 이전 지문의 플랜은 모두 제거
+        stale = [key for key in _plans if key[0] != schema_fingerprint]
+        for key in stale:
+            del _plans[key]
+        _stats["evictions"] += len(stale)
+        matches = []
+        for key, plan in reversed(_plans.items()):
+            match = plan["pattern"].fullmatch(question)
+            if match is not None:
+                matches.append((key, plan, match))
+
+    # 도메인 조회(DB)는 락 밖에서
+    for key, plan, match in matches:
+        params = _bind(plan, match, domain_of)
+        if params is None:
+            continue
+        with _lock:
+            if key in _plans:
+                _plans.move_to_end(key)
+            _stats["hits"] += 1
+        return key, plan["sql"], params
+    with _lock:
+        _stats["misses"] += 1
+    return None
+
+def store_plan(question: str, sql: str, schema_fingerprint: str):
+    """실행에 성공한 생성 SQL을 플랜으로 저장하고 plan_key를 반환"""
+    if is_time_dependent(sql):
+        print("⏭️ [PlanCache] 날짜 리터럴이 있는 SQL은 플랜으로 저장하지 않음")
+        return None
+    try:
+        plan = build_plan(question, sql)
+    except Exception as e:
+        print(f"⚠️ [PlanCache] 플랜 생성 실패: {e}")
+        return None
+    key = (schema_fingerprint, plan["skeleton"])
+    with _lock:
+        _plans[key] = plan
+        _plans.move_to_end(key)
+        _stats["stores"] += 1
+        while len(_plans) > MAX_PLANS:
+            _plans.popitem(last=False)
+            _stats["evictions"] += 1
+    print(f"💾 [PlanCache] 저장: '{plan['skeleton']}' (슬롯 {len(plan['slots'])}개)")
+    return key
+
+def evict_plan(plan_key):
+    """실행 오류가 난 플랜 제거"""
+    with _lock:
+        if _plans.pop(plan_key, None) is not None:
+            _stats["evictions"] += 1
+            print(f"🗑️ [PlanCache] 제거: '{plan_key[1]}'")
+
+def clear_plans():
+    with _lock:
+        _stats["evictions"] += len(_plans)
+        _plans.clear()
+
+def get_plan_cache_stats() -> dict:
+    with _lock:
+        stats = dict(_stats, size=len(_plans))
+    total = stats["hits"] + stats["misses"]
+    stats["hit_rate"] = stats["hits"] / total if total else 0.0
+    return stats
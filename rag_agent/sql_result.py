@@ -0,0 +1,146 @@
+import io
+import csv
+import re
+import datetime
+from decimal import Decimal
+
+# ---------------------------------------------------------
+# SQL 결과 정리 (답변 프롬프트 크기 제한)
+# - 생성 SQL에 LIMIT 주입 -> 가져오는 행 수 상한
+# - 컬럼명은 한 번만, 값은 CSV 행으로 직렬화
+# - 행이 많으면 컬럼별 count/sum/min/max 요약 + 앞부분 일부만 포함
+# ---------------------------------------------------------
+MAX_RESULT_ROWS = 200      # DB에서 가져오는 최대 행 수
+PROMPT_ROW_LIMIT = 50      # 이 이하면 전체 행을 프롬프트에 포함
+PROMPT_SAMPLE_ROWS = 20    # 초과 시 요약과 함께 보여줄 앞부분 행 수
+
+# LIMIT 값은 숫자 또는 플랜 캐시 템플릿의 %s 슬롯 ("최근 거래 5건" -> LIMIT %s)
+_TRAILING_LIMIT_RE = re.compile(
+    r"\blimit\s+(\d+|%s)(?:\s*,\s*(\d+|%s))?(?:\s+offset\s+(?:\d+|%s))?\s*$", re.I
+)
+_PLACEHOLDER_RE = re.compile(r"%%|%s")
+
+def _placeholder_index(query: str, pos: int) -> int:
+    """query[pos] 의 %s 가 몇 번째 파라미터인지 ('%%' 는 건너뜀)"""
+    return sum(1 for m in _PLACEHOLDER_RE.finditer(query[:pos]) if m.group() == "%s")
+
+def inject_limit(query: str, limit: int, args=None):
+    """
+    최상위 LIMIT이 없으면 추가하고, 상한보다 크면 상한으로 줄입니다.
+    ("LIMIT offset, count" 형식은 count 기준)
+    LIMIT 값이 %s 파라미터면 쿼리 대신 바인딩 값을 줄입니다.
+    반환: (쿼리, 파라미터)
+    """
+    query = query.strip().rstrip(";").strip()
+    match = _TRAILING_LIMIT_RE.search(query)
+    if match is None:
+        return f"{query}\nLIMIT {limit}", args
+    group = 2 if match.group(2) is not None else 1
+    value = match.group(group)
+    if value == "%s":
+        index = _placeholder_index(query, match.start(group))
+        if args is None or index >= len(args):
+            raise ValueError("LIMIT 파라미터가 바인딩되지 않았습니다.")
+        if int(args[index]) <= limit:
+            return query, args
+        args = tuple(args)
+        return query, args[:index] + (limit,) + args[index + 1:]
+    if int(value) <= limit:
+        return query, args
+    return f"{query[:match.start(group)]}{limit}{query[match.end(group):]}", args
+
+def _is_numeric(value) -> bool:
+    return isinstance(value, (int, float, Decimal)) and not isinstance(value, bool)
+
+def _format_value(value) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, Decimal):
+        text = format(value.normalize(), "f")
+        return text
+    if isinstance(value, float):
+        return f"{value:.10g}"
+    if isinstance(value, datetime.datetime):
+        return value.strftime("%Y-%m-%d %H:%M:%S")
+    if isinstance(value, datetime.date):
+        return value.isoformat()
+    return str(value)
+
+def numeric_columns(rows: list) -> list:
+    """값이 있는 행 기준으로 숫자형 컬럼 목록"""
+    if not rows:
+        return []
+    columns = []
+    for col in rows[0].keys():
+        values = [r[col] for r in rows if r.get(col) is not None]
+        if values and all(_is_numeric(v) for v in values):
+            columns.append(col)
+    return columns
+
+def summarize_rows(rows: list) -> dict:
+    """가져온 행으로 컬럼별 요약 통계를 계산 (전체 행이 메모리에 있을 때)"""
+    summary = {"row_count": len(rows), "columns": {}}
+    for col in numeric_columns(rows):
+        values = [r[col] for r in rows if r.get(col) is not None]
+        summary["columns"][col] = {
+            "sum": sum(values),
+            "min": min(values),
+            "max": max(values),
+        }
+    return summary
+
+def build_summary_query(query: str, columns: list) -> str:
+    """LIMIT에 잘린 결과 전체에 대한 집계 쿼리 (원본 쿼리를 서브쿼리로 감쌈)"""
+    select_parts = ["COUNT(*) AS row_count"]
+    for i, col in enumerate(columns):
+        quoted = "`" + col.replace("`", "``") + "`"
+        select_parts.append(f"SUM({quoted}) AS sum_{i}, MIN({quoted}) AS min_{i}, MAX({quoted}) AS max_{i}")
+    inner = query.strip().rstrip(";")
+    return f"SELECT {', '.join(select_parts)} FROM (\n{inner}\n) AS result_set"
+
+def parse_summary_row(row: dict, columns: list) -> dict:
+    summary = {"row_count": int(row["row_count"]), "columns": {}}
+    for i, col in enumerate(columns):
+        summary["columns"][col] = {"sum": row[f"sum_{i}"], "min": row[f"min_{i}"], "max": row[f"max_{i}"]}
+    return summary
+
+def format_rows(rows: list, summary: dict | None = None, truncated: bool = False) -> str:
+    """
+    결과를 프롬프트용 압축 텍스트로 직렬화합니다.
+    예)
+      rows: 2
+      balance,is_primary
+      3096547,1
+    잘린 결과의 전체 행 수를 모르면(summary["row_count"] 가 None) 가져온 행 수를 전체로 쓰지 않고
+    MAX_RESULT_ROWS 에서 잘렸다고 표시하며, 요약도 가져온 행 기준임을 밝힘
+    """
+    if not rows:
+        return ""
+    columns = list(rows[0].keys())
+    total = summary["row_count"] if summary else len(rows)
+    shown = rows if len(rows) <= PROMPT_ROW_LIMIT else rows[:PROMPT_SAMPLE_ROWS]
+
+    lines = []
+    if truncated and (not summary or total is None):
+        lines.append(f"rows: more than {MAX_RESULT_ROWS} (truncated at {MAX_RESULT_ROWS}, total unknown; showing first {len(shown)})")
+        label = f"summary of first {MAX_RESULT_ROWS} rows"
+    elif summary and (truncated or len(shown) < len(rows)):
+        lines.append(f"rows: {total} (showing first {len(shown)})")
+        label = "summary"
+    else:
+        lines.append(f"rows: {len(shown)}")
+        label = None
+    if label and summary:
+        for col, stats in summary["columns"].items():
+            lines.append(
+                f"{label} {col}: sum={_format_value(stats['sum'])}, "
+                f"min={_format_value(stats['min'])}, max={_format_value(stats['max'])}"
+            )
+
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    writer.writerow(columns)
+    for row in shown:
+        writer.writerow([_format_value(row.get(col)) for col in columns])
+    lines.append(buffer.getvalue().rstrip("\n"))
+    return "\n".join(lines)
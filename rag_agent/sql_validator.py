@@ -0,0 +1,242 @@
+import os
+import re
+
+# ---------------------------------------------------------
+# 생성 SQL 로컬 검증
+# - MySQL 왕복 전에 토큰 단위로 파싱하여 잘못된/위험한 SQL을 걸러냄
+#   1) 따옴표/주석/괄호 짝, 단일 문장
+#   2) SELECT(WITH) 문만 허용, 쓰기/잠금/파일 접근 키워드 거부
+#   3) FROM/JOIN 대상이 allowed_views(+ CTE 이름) 안에 있는지
+# - EXPLAIN 예상 행 수가 예산을 넘으면 거부 (풀스캔 방지)
+# ---------------------------------------------------------
+EXPLAIN_ROW_BUDGET = int(os.getenv("SQL_EXPLAIN_ROW_BUDGET", 100000))
+
+class SQLValidationError(ValueError):
+    """검증 실패 사유 (LLM 재생성 프롬프트에 그대로 전달됨)"""
+
+_TOKEN_RE = re.compile(
+    r"""
+    (?P<ws>\s+)
+  | (?P<comment>--[^\n]*|\#[^\n]*|/\*.*?\*/)
+  | (?P<string>'(?:[^'\\]|\\.|'')*'|"(?:[^"\\]|\\.|"")*")
+  | (?P<quoted>`(?:[^`]|``)+`)
+  | (?P<number>\d+(?:\.\d+)?(?:[eE][-+]?\d+)?)
+  | (?P<word>[^\W\d][\w$]*)
+  | (?P<param>%s|%%)
+  | (?P<op><=>|<=|>=|<>|!=|\|\||&&|:=|[-+*/%=<>(),.;!~^&|@?])
+    """,
+    re.S | re.X | re.U,
+)
+
+# 함수 호출 형태 "NAME(" 이면 허용되는 키워드 (문자열 함수 REPLACE(), INSERT() 등)
+_FORBIDDEN_WORDS = {
+    "INSERT", "UPDATE", "DELETE", "REPLACE", "DROP", "ALTER", "CREATE", "TRUNCATE",
+    "GRANT", "REVOKE", "RENAME", "CALL", "LOAD", "HANDLER", "LOCK", "UNLOCK",
+    "INTO", "OUTFILE", "DUMPFILE", "PREPARE", "EXECUTE", "DEALLOCATE", "SHUTDOWN", "KILL",
+}
+_FORBIDDEN_FUNCTIONS = {"SLEEP", "BENCHMARK", "LOAD_FILE", "GET_LOCK", "RELEASE_LOCK"}
+# FROM 절이 끝나는 키워드 (ON/USING 뒤에도 콤마 조인이 이어질 수 있으므로 제외)
+_FROM_END_WORDS = {
+    "WHERE", "GROUP", "ORDER", "HAVING", "LIMIT", "UNION", "EXCEPT", "INTERSECT", "WINDOW", "FOR", "SELECT",
+}
+
+def tokenize(query: str) -> list:
+    """(kind, text) 토큰 목록. 공백/주석은 제외. 해석 불가 문자가 있으면 예외"""
+    tokens = []
+    pos = 0
+    while pos < len(query):
+        match = _TOKEN_RE.match(query, pos)
+        if match is None:
+            snippet = query[pos:pos + 20]
+            if snippet[:1] in ("'", '"', "`"):
+                raise SQLValidationError(f"닫히지 않은 따옴표가 있습니다: {snippet}")
+            if snippet.startswith("/*"):
+                raise SQLValidationError("닫히지 않은 주석이 있습니다.")
+            raise SQLValidationError(f"해석할 수 없는 문자가 있습니다: {snippet}")
+        kind = match.lastgroup
+        if kind not in ("ws", "comment"):
+            tokens.append((kind, match.group()))
+        pos = match.end()
+    return tokens
+
+def _upper(token) -> str:
+    return token[1].upper() if token[0] == "word" else ""
+
+def _identifier(token) -> str | None:
+    if token[0] == "word":
+        return token[1]
+    if token[0] == "quoted":
+        return token[1][1:-1].replace("``", "`")
+    return None
+
+def _skip_parens(tokens, i) -> int:
+    """tokens[i] == '(' 위치에서 짝이 맞는 ')' 다음 위치를 반환"""
+    depth = 0
+    while i < len(tokens):
+        if tokens[i][1] == "(":
+            depth += 1
+        elif tokens[i][1] == ")":
+            depth -= 1
+            if depth == 0:
+                return i + 1
+        i += 1
+    raise SQLValidationError("괄호 짝이 맞지 않습니다.")
+
+def _collect_ctes(tokens) -> list:
+    """WITH 절의 CTE 목록 [(이름, 본문 시작, 본문 끝)] (본문은 괄호 안쪽 토큰 범위)"""
+    ctes = []
+    i = 0
+    while i < len(tokens):
+        if _upper(tokens[i]) == "WITH":
+            i += 1
+            if i < len(tokens) and _upper(tokens[i]) == "RECURSIVE":
+                i += 1
+            while i < len(tokens):
+                name = _identifier(tokens[i])
+                if name is None:
+                    break
+                i += 1
+                if i < len(tokens) and tokens[i][1] == "(":
+                    i = _skip_parens(tokens, i)  # 컬럼 목록
+                if i < len(tokens) and _upper(tokens[i]) == "AS":
+                    i += 1
+                if i < len(tokens) and tokens[i][1] == "(":
+                    body_end = _skip_parens(tokens, i)
+                    ctes.append((name.lower(), i + 1, body_end - 1))
+                    i = body_end
+                if i < len(tokens) and tokens[i][1] == ",":
+                    i += 1
+                    continue
+                break
+        i += 1
+    return ctes
+
+def _referenced_tables(tokens) -> list:
+    """
+    FROM/JOIN 뒤(및 FROM 절 최상위 콤마 뒤)에 오는 테이블(뷰) 이름 목록
+    괄호 깊이별로 FROM 절 여부를 추적하므로 서브쿼리 안의 참조도 모두 잡힘
+    """
+    tables = []
+    in_from = {0: False}
+    depth = 0
+    expect_table = False
+    i = 0
+    while i < len(tokens):
+        token = tokens[i]
+        word = _upper(token)
+        if token[1] == "(":
+            depth += 1
+            # "FROM (members)", "JOIN (a JOIN b)" 처럼 괄호로 감싼 테이블 참조는 안쪽 첫 식별자도 검사
+            # 파생 테이블 "(SELECT ...)" / "(WITH ...)" 만 제외 (내부 토큰은 계속 검사)
+            nested = expect_table and i + 1 < len(tokens) and _upper(tokens[i + 1]) not in ("SELECT", "WITH")
+            in_from[depth] = nested
+            expect_table = nested
+        elif token[1] == ")":
+            in_from[depth] = False
+            depth -= 1
+        elif word == "FROM":
+            in_from[depth] = True
+            expect_table = True
+        elif word in ("JOIN", "STRAIGHT_JOIN"):
+            expect_table = True
+        elif word in _FROM_END_WORDS:
+            in_from[depth] = False
+        elif expect_table:
+            name = _identifier(token)
+            if name is not None:
+                # db.table 형태
+                if i + 2 < len(tokens) and tokens[i + 1][1] == ".":
+                    name = f"{name}.{_identifier(tokens[i + 2]) or tokens[i + 2][1]}"
+                    i += 2
+                tables.append(name)
+            expect_table = False
+        elif token[1] == "," and in_from.get(depth):
+            # 콤마 조인 "FROM a, b"
+            expect_table = True
+        i += 1
+    return tables
+
+def validate_sql(query: str, allowed_views: list) -> str:
+    """
+    생성 SQL을 로컬에서 검증하고 정리된 문장을 반환합니다.
+    실패 시 SQLValidationError (메시지는 재생성 피드백으로 사용)
+    """
+    if not query or not query.strip():
+        raise SQLValidationError("생성된 쿼리가 비어 있습니다.")
+    query = query.strip()
+    tokens = tokenize(query)
+
+    # 단일 문장: 세미콜론은 맨 끝에만 허용
+    while tokens and tokens[-1][1] == ";":
+        tokens.pop()
+        query = query.rstrip().rstrip(";").rstrip()
+    if any(t[1] == ";" for t in tokens):
+        raise SQLValidationError("여러 개의 SQL 문장은 허용되지 않습니다. SELECT 문 하나만 작성하세요.")
+
+    depth = 0
+    for t in tokens:
+        if t[1] == "(":
+            depth += 1
+        elif t[1] == ")":
+            depth -= 1
+            if depth < 0:
+                break
+    if depth != 0:
+        raise SQLValidationError("괄호 짝이 맞지 않습니다.")
+
+    first = next((_upper(t) for t in tokens if t[1] != "("), "")
+    if first not in ("SELECT", "WITH"):
+        raise SQLValidationError(f"SELECT 문만 허용됩니다. (입력: {first or tokens[0][1]})")
+
+    for i, t in enumerate(tokens):
+        word = _upper(t)
+        is_call = i + 1 < len(tokens) and tokens[i + 1][1] == "("
+        if word in _FORBIDDEN_WORDS and not (is_call and word in ("REPLACE", "INSERT")):
+            raise SQLValidationError(f"허용되지 않는 키워드입니다: {word}")
+        if word in _FORBIDDEN_FUNCTIONS and is_call:
+            raise SQLValidationError(f"허용되지 않는 함수입니다: {word}()")
+        if t[1] == "@":
+            raise SQLValidationError("사용자/시스템 변수(@)는 사용할 수 없습니다.")
+
+    allowed = {v.lower() for v in (allowed_views or [])} | {"dual"}
+    # CTE 본문은 자기 자신/뒤에 정의된 CTE 이름을 쓸 수 없음 (같은 이름의 원본 테이블 우회 방지)
+    body_spans = []
+    for name, start, end in _collect_ctes(tokens):
+        _check_tables(_referenced_tables(tokens[start:end]), allowed, allowed_views)
+        allowed.add(name)
+        body_spans.append((start, end))
+    rest = [t for i, t in enumerate(tokens) if not any(s <= i < e for s, e in body_spans)]
+    _check_tables(_referenced_tables(rest), allowed, allowed_views)
+    return query
+
+def _check_tables(tables, allowed, allowed_views):
+    for table in tables:
+        if table.lower() not in allowed:
+            raise SQLValidationError(
+                f"허용되지 않은 테이블/뷰입니다: {table}. 사용 가능: {', '.join(allowed_views or [])}"
+            )
+
+def estimate_explain_rows(explain_rows: list) -> int:
+    """
+    EXPLAIN 결과로 예상 처리 행 수를 계산합니다.
+    같은 SELECT 안의 조인은 rows * filtered% 의 곱, SELECT 단위끼리는 합
+    """
+    per_select = {}
+    for row in explain_rows or []:
+        rows = row.get("rows")
+        if rows is None:
+            continue
+        filtered = row.get("filtered")
+        estimate = float(rows) * (float(filtered) / 100 if filtered is not None else 1.0)
+        key = row.get("id")
+        per_select[key] = per_select.get(key, 1.0) * max(estimate, 1.0)
+    return int(sum(per_select.values()))
+
+def check_explain_budget(explain_rows: list, budget: int = EXPLAIN_ROW_BUDGET) -> int:
+    estimate = estimate_explain_rows(explain_rows)
+    if estimate > budget:
+        raise SQLValidationError(
+            f"예상 처리 행 수({estimate:,})가 허용 범위({budget:,})를 초과합니다. "
+            f"조건(WHERE, 기간)을 좁히거나 집계 쿼리로 작성하세요."
+        )
+    return estimate
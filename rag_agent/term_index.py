@@ -0,0 +1,189 @@
+import re
+import time
+import threading
+import unicodedata
+from collections import deque
+
+from langchain_core.documents import Document
+
+# ---------------------------------------------------------
+# 금융 용어 정확 일치 인덱스
+# - 용어집은 닫힌 어휘(terms.word)라서 질의에 용어가 그대로 들어 있으면 임베딩/벡터 검색이 필요 없음
+# - load_knowledge_base 시점에 Chroma 컬렉션 메타데이터(word)와 문서로 한 번 구축
+# - 정규화(NFKC, 소문자, 공백/가운뎃점 제거)한 용어 + 별칭을 Aho-Corasick 오토마톤 하나로 검색
+#     "PER(주가수익비율)" -> 별칭 "per", "주가수익비율"
+# - 영문 약어는 앞뒤가 영문/숫자가 아닐 때만 일치 ("super" 안의 "per" 제외)
+# - 일치한 용어가 없으면 기존 벡터 검색으로 진행
+# ---------------------------------------------------------
+MIN_TERM_LENGTH = 2
+
+# 용어명에서 자동으로 뽑을 수 없는 별칭 (별칭 -> 용어)
+TERM_ALIASES = {
+    "상장지수펀드": "ETF",
+    "주가수익비율": "PER",
+    "주가순자산비율": "PBR",
+    "자기자본이익률": "ROE",
+    "예금자보호": "예금자보호제도",
+}
+
+_REMOVE_RE = re.compile(r"[\s·ㆍ\-_/]+")
+_PAREN_RE = re.compile(r"[(\[（](.*?)[)\]）]")
+_ASCII_ALNUM_RE = re.compile(r"[a-z0-9]")
+
+def normalize_term(text: str) -> str:
+    text = unicodedata.normalize("NFKC", text or "").lower()
+    return _REMOVE_RE.sub("", text)
+
+def term_aliases(word: str) -> set:
+    """용어명에서 검색 키 후보 (본 이름, 괄호 밖 이름, 괄호 안 이름)"""
+    keys = {normalize_term(word)}
+    inner = _PAREN_RE.findall(word or "")
+    outer = _PAREN_RE.sub("", word or "")
+    keys.add(normalize_term(outer))
+    for part in inner:
+        for alt in re.split(r"[,;]", part):
+            keys.add(normalize_term(alt))
+    return {key for key in keys if len(key) >= MIN_TERM_LENGTH}
+
+# ---------------------------------------------------------
+# Aho-Corasick
+# ---------------------------------------------------------
+class AhoCorasick:
+    """여러 패턴을 문자열 한 번 순회로 찾는 오토마톤 (순수 파이썬)"""
+    def __init__(self, patterns):
+        self.patterns = list(patterns)
+        self._goto = [{}]
+        self._fail = [0]
+        self._out = [[]]
+        for index, pattern in enumerate(self.patterns):
+            node = 0
+            for ch in pattern:
+                nxt = self._goto[node].get(ch)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto[node][ch] = nxt
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append([])
+                node = nxt
+            self._out[node].append(index)
+
+        # BFS로 실패 링크 연결 (실패 노드의 출력도 이어 붙임)
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, nxt in self._goto[node].items():
+                queue.append(nxt)
+                fail = self._fail[node]
+                while fail and ch not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[nxt] = self._goto[fail].get(ch, 0)
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+
+    def iter_matches(self, text):
+        """(시작, 끝(미포함), 패턴 번호) 를 순서대로 반환"""
+        node = 0
+        for i, ch in enumerate(text):
+            while node and ch not in self._goto[node]:
+                node = self._fail[node]
+            node = self._goto[node].get(ch, 0)
+            for index in self._out[node]:
+                yield i + 1 - len(self.patterns[index]), i + 1, index
+
+# ---------------------------------------------------------
+# 용어 인덱스
+# ---------------------------------------------------------
+class TermIndex:
+    def __init__(self, documents: dict, keys: dict):
+        """
+        documents: 용어 ID -> Document (page_content = "word: definition", metadata["word"])
+        keys: 정규화한 검색 키 -> 용어 ID
+        """
+        self.documents = documents
+        self.keys = keys
+        self._patterns = list(keys)
+        self._automaton = AhoCorasick(self._patterns)
+        self._lock = threading.Lock()
+        self._stats = {"lookups": 0, "hits": 0, "total_us": 0.0}
+
+    def __len__(self):
+        return len(self.documents)
+
+    @classmethod
+    def from_records(cls, ids, documents, metadatas, aliases=TERM_ALIASES):
+        """Chroma collection.get() 결과(ids/documents/metadatas)로 구축"""
+        docs, word_keys, alias_owners = {}, {}, {}
+        for term_id, content, metadata in zip(ids, documents, metadatas):
+            metadata = metadata or {}
+            word = metadata.get("word")
+            if not word or not content:
+                continue
+            docs[term_id] = Document(page_content=content, metadata=dict(metadata, id=term_id))
+            word_keys.setdefault(normalize_term(word), term_id)
+            for key in term_aliases(word):
+                alias_owners.setdefault(key, set()).add(term_id)
+
+        # 용어명 그대로인 키가 우선, 자동 별칭은 한 용어에만 해당할 때만 사용
+        keys = dict(word_keys)
+        for key, owners in alias_owners.items():
+            if key not in keys and len(owners) == 1:
+                keys[key] = next(iter(owners))
+        for alias, word in aliases.items():
+            term_id = word_keys.get(normalize_term(word))
+            if term_id is not None:
+                keys.setdefault(normalize_term(alias), term_id)
+        keys = {key: term_id for key, term_id in keys.items() if len(key) >= MIN_TERM_LENGTH}
+        return cls(docs, keys)
+
+    def lookup(self, word: str):
+        """용어명/별칭 정확 일치 -> Document 또는 None"""
+        term_id = self.keys.get(normalize_term(word))
+        return self.documents.get(term_id) if term_id is not None else None
+
+    def find_terms(self, query: str, limit: int = 3) -> list:
+        """
+        질의에 포함된 용어를 찾아 Document 리스트로 반환 (긴 일치 우선, 겹치는 짧은 일치 제외)
+        """
+        t0 = time.perf_counter()
+        text = normalize_term(query)
+        matches = []
+        for start, end, index in self._automaton.iter_matches(text):
+            pattern = self._patterns[index]
+            if _ASCII_ALNUM_RE.match(pattern[0]) and start > 0 and _ASCII_ALNUM_RE.match(text[start - 1]):
+                continue
+            if _ASCII_ALNUM_RE.match(pattern[-1]) and end < len(text) and _ASCII_ALNUM_RE.match(text[end]):
+                continue
+            matches.append((start, end, self.keys[pattern]))
+
+        # "기준금리" 안의 "금리" 처럼 더 긴 일치에 덮이는 짧은 일치는 버림
+        matches.sort(key=lambda m: (-(m[1] - m[0]), m[0]))
+        taken, found = [], []
+        for start, end, term_id in matches:
+            if any(start < t_end and t_start < end for t_start, t_end in taken):
+                continue
+            taken.append((start, end))
+            if term_id not in found:
+                found.append(term_id)
+        # 질의에 나온 순서대로
+        first_seen = {}
+        for start, _, term_id in matches:
+            first_seen[term_id] = min(start, first_seen.get(term_id, start))
+        found.sort(key=lambda term_id: first_seen[term_id])
+        result = [self.documents[term_id] for term_id in found[:limit]]
+
+        with self._lock:
+            self._stats["lookups"] += 1
+            self._stats["hits"] += 1 if result else 0
+            self._stats["total_us"] += (time.perf_counter() - t0) * 1_000_000
+        return result
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+        stats.update(
+            terms=len(self.documents),
+            keys=len(self.keys),
+            hit_rate=round(stats["hits"] / stats["lookups"], 4) if stats["lookups"] else 0.0,
+            avg_us=round(stats["total_us"] / stats["lookups"], 1) if stats["lookups"] else 0.0,
+        )
+        return stats
@@ -1,9 +1,12 @@
 import os
 import json
+import time
+import uuid
+import threading
+from dataclasses import dataclass, field
 from pathlib import Path
 from typing import TypedDict, List
 from dotenv import load_dotenv
-import bcrypt
 
 from langchain_openai import ChatOpenAI
 from langchain_core.prompts import PromptTemplate
@@ -11,7 +14,18 @@ from langchain_core.output_parsers import StrOutputParser
 from langgraph.graph import StateGraph, START, END
 
 # 사용자 원본 코드의 유틸리티 (DB 핸들러가 있다고 가정)
-from utils.handle_sql import get_data, execute_query
+from utils.handle_sql import get_data, use_primary
+from utils.sql_metrics import query_trace
+from utils.result_cache import register_account_owner
+from utils.transfer_executor import execute_transfer, execute_batch_transfer
+from utils.rate_cache import get_rate_quote
+from utils.pin_verifier import verify_secret, VerificationUnavailable
+from rag_agent.contact_matcher import match_contact, record_match
+from rag_agent.transfer_parser import parse_transfer_request, parse_amount, extract_target, is_complete
+from rag_agent.batch_transfer import is_batch_request, parse_batch_request, prepare_batch, render_batch_confirmation
+from rag_agent.transfer_scheduler import register_scheduled_transfer
+# LangGraph START 와 이름이 겹치므로 컨텍스트 상태 START 는 CTX_START 로 가져옴
+from rag_agent.transfer_context import TransferContext, InvalidTransition, START as CTX_START, NEED_INFO, CONFIRM, PASSWORD, DONE
 
 # 1. 환경 설정
 load_dotenv()
@@ -154,323 +168,439 @@ def _find_best_match_contact_llm(user_input: str, contacts: List[dict]) -> str |
 # DB 검증 및 로직 함수들
 # ---------------------------------------------------------
 
-def get_member_id(username):
-    query = f"SELECT user_id FROM members WHERE username = '{username}'"
-    result = get_data(query)
-    return result[0]["user_id"] if result else None
+# ---------------------------------------------------------
+# 세션 단위 사용자 프로필 (송금 플로우 동안 재사용)
+# - 플로우 시작 시 회원/주계좌/연락처/PIN 해시를 한 번의 쿼리로 로드
+# - NEED_INFO -> CONFIRM -> NEED_PASSWORD 단계에서는 메모리 값을 재사용
+# - 잔액은 참고용 스냅샷: 실제 차감 시점에는 DB에서 다시 읽음
+# ---------------------------------------------------------
+@dataclass
+class TransferProfile:
+    username: str
+    user_id: int
+    pin_hash: str | None
+    account_id: int | None
+    balance: float | None
+    contacts: list = field(default_factory=list)
+    loaded_at: float = field(default_factory=time.monotonic)
+
+    def find_contact(self, contact_name):
+        for c in self.contacts:
+            if c["contact_name"] == contact_name:
+                return c
+        return None
+
+_profiles = {}
+_profiles_lock = threading.Lock()
+
+def load_transfer_profile(username):
+    """회원 + 주계좌 + 연락처를 한 번에 조회 (연락처 수만큼 행이 나옴)"""
+    query = """
+    SELECT m.user_id, m.pin_code, a.account_id, a.balance,
+           c.contact_id, c.contact_name, c.relationship, c.target_currency_code
+    FROM members m
+    LEFT JOIN accounts a ON a.user_id = m.user_id AND a.is_primary = 1
+    LEFT JOIN contacts c ON c.user_id = m.user_id
+    WHERE m.username = %s
+    """
+    rows = get_data(query, (username,))
+    if not rows:
+        return None
+    first = rows[0]
+    contacts = [
+        {
+            "contact_id": r["contact_id"],
+            "contact_name": r["contact_name"],
+            "relationship": r["relationship"],
+            "target_currency_code": r["target_currency_code"],
+        }
+        for r in rows if r["contact_id"] is not None
+    ]
+    return TransferProfile(
+        username=username,
+        user_id=first["user_id"],
+        pin_hash=first["pin_code"],
+        account_id=first["account_id"],
+        balance=float(first["balance"]) if first["balance"] is not None else None,
+        contacts=contacts,
+    )
+
+def get_transfer_profile(username, refresh=False):
+    """세션 프로필 반환. 플로우 시작(refresh=True)이거나 캐시에 없으면 새로 로드"""
+    if not refresh:
+        with _profiles_lock:
+            profile = _profiles.get(username)
+        if profile is not None:
+            return profile
+    profile = load_transfer_profile(username)
+    if profile is not None:
+        with _profiles_lock:
+            _profiles[username] = profile
+        if profile.account_id is not None:
+            register_account_owner(profile.account_id, profile.user_id)
+    return profile
+
+def drop_transfer_profile(username):
+    """송금 플로우 종료 시 프로필 제거"""
+    with _profiles_lock:
+        _profiles.pop(username, None)
 
 def get_contact(user_id, target):
-    # target 이름으로 정확히 조회
-    query = f"""
+    # target 이름으로 정확히 조회 (세션 프로필에 없는 경우의 폴백)
+    query = """
     SELECT contact_id, contact_name, relationship, target_currency_code
     FROM contacts
-    WHERE user_id = {user_id}
-    AND contact_name = '{target}'
+    WHERE user_id = %s
+    AND contact_name = %s
     """
-    result = get_data(query)
+    result = get_data(query, (user_id, target))
     return result[0] if result else None
 
 def get_all_contacts(user_id):
-    query = f"SELECT contact_name, relationship FROM contacts WHERE user_id = {user_id}"
-    return get_data(query)
+    query = "SELECT contact_name, relationship FROM contacts WHERE user_id = %s"
+    return get_data(query, (user_id,))
 
-def resolve_contact_name(user_id, user_input):
+def resolve_contact_name(user_id, user_input, contacts=None):
     """
     사용자 입력을 바탕으로 정확한 DB 내 연락처 이름(contact_name)을 찾습니다.
-    1. 정확한 이름 매칭
-    2. 관계(relationship) 매칭
-    3. LLM 의미 기반 매칭 (New)
+    1. 로컬 매칭 (정확한 이름 / 호칭 제거 / 관계 별칭 / 오타 허용)
+    2. 상위 후보가 애매하면 후보만, 후보가 없으면 전체 연락처로 LLM 의미 기반 매칭
+       (별칭표에 없는 관계 표현 "동생" -> "남동생" 등)
+    contacts: 세션 프로필에 이미 로드된 연락처 (없으면 DB 조회)
     """
-    contacts = get_all_contacts(user_id)
+    if contacts is None:
+        contacts = get_all_contacts(user_id)
     if not contacts:
         return None
-        
-    user_input_clean = user_input.strip()
-    user_input_lower = user_input_clean.lower()
-
-    # 1. 1차 시도: 정확한 문자열 매칭 (Python Loop) - 속도 최우선
-    for c in contacts:
-        # 이름 비교
-        if user_input_lower == c["contact_name"].lower():
-            return c["contact_name"]
-        # 관계 비교 (DB에 relationship 컬럼이 있는 경우)
-        if c.get("relationship") and user_input_lower == str(c["relationship"]).lower():
-            return c["contact_name"]
-            
-    # 2. 2차 시도: LLM을 이용한 의미론적 매칭 (엄마 -> Mother 해결)
-    print(f"🔀 '{user_input}' 정확한 매칭 실패. LLM 매칭 시도...")
-    matched_name = _find_best_match_contact_llm(user_input_clean, contacts)
-    
+
+    # 1. 로컬 매칭: 정규화 이름 / 관계 별칭 / 자모 편집 거리 순위
+    matched_name, source, candidates = match_contact(user_id, user_input, contacts)
     if matched_name:
-        print(f"✅ LLM 매칭 성공: {user_input} -> {matched_name}")
+        print(f"✅ 연락처 매칭 ({source}): {user_input} -> {matched_name}")
+        record_match(user_input, source, matched_name)
         return matched_name
+    if candidates:
+        print(f"🔀 '{user_input}' 후보 {len(candidates)}명 애매. LLM 매칭 시도...")
+    else:
+        # 로컬 후보가 없으면 기존처럼 전체 연락처로 LLM 판단
+        print(f"🔀 '{user_input}' 로컬 후보 없음. 전체 연락처로 LLM 매칭 시도...")
+        candidates = contacts
 
-    return None
+    # 2. LLM 의미 매칭
+    matched_name = _find_best_match_contact_llm(user_input.strip(), candidates)
+    record_match(user_input, "llm" if matched_name else "llm_none", matched_name, len(candidates))
 
-def get_primary_account(user_id):
-    query = f"""
-    SELECT account_id, balance
-    FROM accounts
-    WHERE user_id = {user_id}
-    AND is_primary = 1
-    """
-    result = get_data(query)
-    return result[0] if result else None
+    if matched_name:
+        print(f"✅ LLM 매칭 성공: {user_input} -> {matched_name}")
+        return matched_name
 
-def get_user_password(username):
-    query = f"SELECT pin_code FROM members WHERE username = '{username}'"
-    result = get_data(query)
-    return result[0]["pin_code"] if result else None
+    return None
 
 def get_exchange_rate(currency):
-    if currency == "KRW":
-        return 1.0
-
-    query = f"""
-    SELECT send_rate
-    FROM exchange_rates
-    WHERE currency_code = '{currency}'
-    ORDER BY reference_date DESC
-    LIMIT 1
-    """
-    result = get_data(query)
-    if not result:
-        return None
-    return float(result[0]["send_rate"])
-
-def update_balance(account_id, new_balance):
-    query = f"UPDATE accounts SET balance = {new_balance} WHERE account_id = {account_id}"
-    execute_query(query)
-
-def insert_ledger(
-    account_id, contact_id, amount_krw, balance_after,
-    exchange_rate, target_amount, target_currency
-):
-    query = f"""
-    INSERT INTO ledger (
-        account_id, contact_id, transaction_type, amount, balance_after,
-        exchange_rate, target_amount, target_currency_code, description, category
-    )
-    VALUES (
-        {account_id}, {contact_id}, 'TRANSFER', {-amount_krw}, {balance_after},
-        {exchange_rate}, {target_amount}, '{target_currency}', '송금', '이체'
-    )
-    """
-    execute_query(query)
+    # 환율은 수집 주기(6시간)마다만 바뀌므로 메모리 캐시에서 조회
+    quote = get_rate_quote(currency)
+    return quote["send_rate"] if quote else None
 
 # ---------------------------------------------------------
 # 메인 송금 로직
 # ---------------------------------------------------------
-
-def process_transfer(question: str, username: str, context: dict | None = None):
-
-    context = context or {}
-
-    user_id = get_member_id(username)
-    if not user_id:
-        return {"status": "ERROR", "message": "사용자를 찾을 수 없습니다."}
+# 플로우가 끝나는 상태 -> 컨텍스트 종료 + 세션 프로필 제거
+TERMINAL_STATUSES = {"SUCCESS", "CANCEL", "FAIL", "ERROR"}
+YES_SIGNALS = ["__yes__", "y", "yes", "네", "응", "맞아"]
+NO_SIGNALS = ["__no__", "n", "no", "아니", "취소"]
+MAX_PIN_ATTEMPTS = 5
+
+def _reply(status, message, ctx=None, **extra):
+    """응답 dict. 종료 상태면 컨텍스트를 DONE으로 닫고 반환하지 않음"""
+    result = {"status": status, "message": message}
+    if status in TERMINAL_STATUSES:
+        if ctx is not None and ctx.can(DONE):
+            ctx.finish()
+    elif ctx is not None:
+        result["context"] = ctx
+    result.update(extra)
+    return result
+
+def process_transfer(question: str, username: str, context=None):
+
+    # 저장된 상태 해석 + 버튼 신호 유효성 검사는 DB 조회 전에 (만료된 클릭 등은 바로 거절)
+    try:
+        ctx = TransferContext.load(context)
+    except InvalidTransition as e:
+        return _reply("ERROR", f"송금 상태가 올바르지 않습니다: {e}")
+    signal = question.strip().lower()
+    if signal in ("__yes__", "__no__") and ctx.state != CONFIRM:
+        return _reply("ERROR", "이미 처리되었거나 만료된 확인 요청입니다.")
+
+    # 플로우 시작(START)이면 프로필을 새로 읽고, 이후 단계에서는 재사용
+    profile = get_transfer_profile(username, refresh=ctx.state == CTX_START)
+    if profile is None:
+        return _reply("ERROR", "사용자를 찾을 수 없습니다.")
+    user_id = profile.user_id
 
     # --------------------------------------------------
     # 1. PIN Code 입력 단계
     # --------------------------------------------------
-    if context.get("awaiting_password"):
-        stored_pin = get_user_password(username)
+    if ctx.state == PASSWORD:
+        stored_pin = profile.pin_hash
         if not stored_pin:
-            return {"status": "ERROR", "message": "사용자 정보를 찾을 수 없습니다."}
-
-        if isinstance(stored_pin, str):
-            stored_pin = stored_pin.encode('utf-8')
-
-        # 패스워드 검증
-        if bcrypt.checkpw(question.encode('utf-8'), stored_pin) == False:
-            context["password_attempts"] = context.get("password_attempts", 0) + 1
-            if context["password_attempts"] >= 5:
-                return {"status": "FAIL", "message": "PIN Code 5회 오류. 송금 실패."}
-
-            return {
-                "status": "NEED_PASSWORD",
-                "message": f"PIN Code 오류. 남은 기회: {5 - context['password_attempts']}",
-                "context": context
-            }
-
-        # 송금 실행 (DB 업데이트)
-        account = get_primary_account(user_id)
-        # 중요: context["target"]은 이미 검증된 'contact_name'이어야 함
-        contact = get_contact(user_id, context["target"]) 
-
-        new_balance = float(account["balance"]) - context["amount_krw"]
-        update_balance(account["account_id"], new_balance)
-
-        insert_ledger(
-            account["account_id"],
+            return _reply("ERROR", "사용자 정보를 찾을 수 없습니다.", ctx)
+
+        # PIN 검증 (bcrypt는 전용 워커 프로세스에서, 시도 제한은 해시 전에 검사)
+        try:
+            pin_ok = verify_secret(username, question, stored_pin, kind="pin")
+        except VerificationUnavailable as e:
+            return _reply("NEED_PASSWORD", str(e), ctx)
+
+        if not pin_ok:
+            ctx.password_attempts += 1
+            if ctx.password_attempts >= MAX_PIN_ATTEMPTS:
+                return _reply("FAIL", f"PIN Code {MAX_PIN_ATTEMPTS}회 오류. 송금 실패.", ctx)
+            return _reply("NEED_PASSWORD", f"PIN Code 오류. 남은 기회: {MAX_PIN_ATTEMPTS - ctx.password_attempts}", ctx)
+
+        if ctx.is_batch:
+            return _execute_batch_step(profile, ctx)
+
+        # 송금 실행: 잔액 검사/차감/원장 기록을 한 트랜잭션으로 (동시 송금 시 갱신 손실 방지)
+        # 중요: ctx.target은 이미 검증된 'contact_name'이어야 함
+        contact = profile.find_contact(ctx.target) or get_contact(user_id, ctx.target)
+        if contact is None or profile.account_id is None:
+            return _reply("ERROR", "송금 정보를 확인할 수 없습니다.", ctx)
+
+        outcome = execute_transfer(
+            profile.account_id,
             contact["contact_id"],
-            context["amount_krw"],
-            new_balance,
-            context["exchange_rate"],
-            context["amount"],
-            context["currency"]
+            ctx.amount_krw,
+            ctx.exchange_rate,
+            ctx.amount,
+            ctx.currency,
+            idempotency_key=ctx.idempotency_key
         )
+        if outcome["replayed"]:
+            # 버튼 중복 클릭/재실행: 다시 차감하지 않고 처음 결과를 안내
+            print(f"♻️ [Transfer] 이미 처리된 송금 요청 ({ctx.idempotency_key})")
+        if not outcome["ok"]:
+            if outcome["reason"] == "INSUFFICIENT_FUNDS":
+                return _reply("FAIL", f"잔액이 부족하여 송금하지 못했습니다. (잔액: {int(outcome['balance_after']):,}원)", ctx)
+            return _reply("ERROR", "주 계좌를 찾을 수 없습니다.", ctx)
 
-        return {"status": "SUCCESS", "message": f"송금이 완료되었습니다. (잔액: {int(new_balance):,}원)"}
+        return _reply("SUCCESS", f"송금이 완료되었습니다. (잔액: {int(outcome['balance_after']):,}원)", ctx)
 
     # --------------------------------------------------
     # 2. 확인 단계
     # --------------------------------------------------
-    if context.get("awaiting_confirm"):
-        yes_signals = ["__yes__", "y", "yes", "네", "응", "맞아"]
-        no_signals  = ["__no__",  "n", "no", "아니", "취소"]
-
-        answer = question.strip().lower()
-
-        if answer in no_signals:
-            return {"status": "CANCEL", "message": "송금이 취소되었습니다."}
-
-        if answer not in yes_signals:
-            return {
-                "status": "CONFIRM",
-                "message": context.get("confirm_message", "송금을 확인해주세요."),
-                "context": context,
-                "ui_type": "confirm_buttons"
-            }
-
-        context["awaiting_confirm"] = False
-        context["awaiting_password"] = True
-        context["password_attempts"] = 0
-
-        return {
-            "status": "NEED_PASSWORD",
-            "message": "PIN Code를 입력해주세요.",
-            "context": context
-        }
+    if ctx.state == CONFIRM:
+        if signal in NO_SIGNALS:
+            return _reply("CANCEL", "송금이 취소되었습니다.", ctx)
+
+        if signal not in YES_SIGNALS:
+            return _reply("CONFIRM", ctx.confirm_message or "송금을 확인해주세요.", ctx, ui_type="confirm_buttons")
+
+        ctx.await_password()
+        return _reply("NEED_PASSWORD", "PIN Code를 입력해주세요.", ctx)
 
     # --------------------------------------------------
     # 3. HITL (Human-in-the-Loop) - 부족 정보 보완
     # --------------------------------------------------
-    if context.get("missing_field"):
-        field = context["missing_field"]
+    if ctx.state == NEED_INFO:
+        field = ctx.missing_field
 
         if field == "target":
-            # [수정] 여기서도 향상된 resolve 로직 사용
-            resolved = resolve_contact_name(user_id, question)
+            # "엄마한테" 처럼 조사가 붙어 들어와도 대상 어절만 사용
+            resolved = resolve_contact_name(user_id, extract_target(question) or question, profile.contacts)
             if not resolved:
-                return {
-                    "status": "NEED_INFO",
-                    "field": "target",
-                    "message": "연락처를 찾을 수 없습니다. 정확한 이름을 입력해주세요.",
-                    "context": context
-                }
-            context["target"] = resolved
+                return _reply("NEED_INFO", "연락처를 찾을 수 없습니다. 정확한 이름을 입력해주세요.", ctx, field="target")
+            ctx.target = resolved
 
         elif field == "amount":
-            try:
-                # 간단한 숫자 처리 (복잡한 건 LLM이 했어야 함)
-                clean_amt = question.strip().replace(",", "").replace("원", "")
-                context["amount"] = float(clean_amt)
-            except:
-                return {
-                    "status": "NEED_INFO",
-                    "field": "amount",
-                    "message": "금액을 숫자로 입력해주세요.",
-                    "context": context
-                }
+            # "3만 5천원", "100달러" 등 한글 단위/통화까지 로컬에서 해석
+            parsed = parse_amount(question)
+            if not parsed:
+                return _reply("NEED_INFO", "금액을 숫자로 입력해주세요.", ctx, field="amount")
+            ctx.amount = float(parsed[0])
+            if parsed[1]:
+                ctx.currency = parsed[1]
 
         elif field == "currency":
-            context["currency"] = question.strip().upper()
+            ctx.currency = question.strip().upper()
 
-        context.pop("missing_field")
+        ctx.missing_field = None
 
     # --------------------------------------------------
-    # 4. 최초 요청 (LangGraph 추출)
+    # 4. 최초 요청 (로컬 파서 -> LangGraph 추출)
     # --------------------------------------------------
-    if not context.get("target") and not context.get("amount"):
-        info = _invoke_transfer_extract(question)
-        context["target"]   = info.get("target")
-        context["amount"]   = info.get("amount")
-        context["currency"] = info.get("currency")
-
-    target   = context.get("target")
-    amount   = context.get("amount")
-    currency = context.get("currency")
+    if ctx.state == CTX_START and is_batch_request(question):
+        # 여러 대상 요청은 일괄 송금으로 (확인/PIN/트랜잭션 각 1회)
+        return _start_batch(question, profile, ctx)
+
+    if ctx.state == CTX_START:
+        # 로컬 파서로 먼저 시도하고, 대상/금액 중 하나라도 못 찾으면 LLM 추출로 보완
+        info = parse_transfer_request(question)
+        if is_complete(info):
+            print(f"🔹 [Extraction Result] (local): {info}")
+        else:
+            llm_info = _invoke_transfer_extract(question)
+            info = {k: llm_info.get(k) or info.get(k) for k in ("target", "amount", "currency")}
+        ctx.target   = info.get("target")
+        ctx.amount   = info.get("amount")
+        ctx.currency = info.get("currency")
 
     # 대상 검증 및 해결
-    if not target:
-        context["missing_field"] = "target"
-        return {
-            "status": "NEED_INFO",
-            "field": "target",
-            "message": "송금할 대상을 입력해주세요.",
-            "context": context
-        }
+    if not ctx.target:
+        ctx.need_info("target")
+        return _reply("NEED_INFO", "송금할 대상을 입력해주세요.", ctx, field="target")
 
-    # [수정] LLM 매칭 포함된 함수 호출
-    resolved = resolve_contact_name(user_id, target)
+    resolved = resolve_contact_name(user_id, ctx.target, profile.contacts)
     if not resolved:
-        context["missing_field"] = "target"
-        return {
-            "status": "NEED_INFO",
-            "field": "target",
-            "message": f"'{target}'님을 연락처에서 찾을 수 없습니다. 정확한 이름을 알려주세요.",
-            "context": context
-        }
-    context["target"] = resolved  # DB에 있는 정확한 이름으로 갱신
+        original = ctx.target
+        ctx.need_info("target")
+        return _reply("NEED_INFO", f"'{original}'님을 연락처에서 찾을 수 없습니다. 정확한 이름을 알려주세요.", ctx, field="target")
+    ctx.target = resolved  # DB에 있는 정확한 이름으로 갱신
 
     # 금액 검증
-    if not amount:
-        context["missing_field"] = "amount"
-        return {
-            "status": "NEED_INFO",
-            "field": "amount",
-            "message": "송금 금액을 입력해주세요.",
-            "context": context
-        }
+    if not ctx.amount:
+        ctx.need_info("amount")
+        return _reply("NEED_INFO", "송금 금액을 입력해주세요.", ctx, field="amount")
 
-    if not currency:
-        context["currency"] = "KRW"
-        currency = "KRW"
+    if not ctx.currency:
+        ctx.currency = "KRW"
+    currency = ctx.currency
+    amount = float(ctx.amount)
 
     # 환율 및 잔액 체크
-    rate = get_exchange_rate(currency)
-    if rate is None:
-        return {"status": "ERROR", "message": f"{currency} 환율 정보를 찾을 수 없습니다."}
+    quote = get_rate_quote(currency)
+    if quote is None:
+        return _reply("ERROR", f"{currency} 환율 정보를 찾을 수 없습니다.", ctx)
+    rate = quote["send_rate"]
+    rate_date = quote["reference_date"]
 
-    account = get_primary_account(user_id)
-    if not account:
-        return {"status": "ERROR", "message": "주 계좌를 찾을 수 없습니다."}
+    if profile.account_id is None:
+        return _reply("ERROR", "주 계좌를 찾을 수 없습니다.", ctx)
 
-    amount_krw = float(amount) * rate
+    amount_krw = amount * rate
 
-    if amount_krw > float(account["balance"]):
-        return {"status": "ERROR", "message": "잔액이 부족합니다."}
+    # 확인 단계용 사전 체크 (플로우 시작 시점 잔액 기준, 실행 시 다시 확인)
+    if amount_krw > profile.balance:
+        return _reply("ERROR", "잔액이 부족합니다.", ctx)
 
     confirm_message = f"{resolved}님에게 {int(amount):,} {currency} ({int(amount_krw):,}원) 송금하시겠습니까?"
+    if rate_date is not None:
+        # 외화 송금은 적용 환율과 기준일을 함께 안내
+        rate_text = f"{rate:,.2f}" if rate >= 1 else f"{rate:.4f}"
+        confirm_message += f"\n(적용 환율: 1 {currency} = {rate_text}원, {rate_date} 기준)"
+
+    ctx.amount        = amount
+    ctx.amount_krw    = amount_krw
+    ctx.exchange_rate = rate
+    ctx.rate_date     = str(rate_date) if rate_date is not None else None
+    # 확인된 송금 1건당 하나의 키 -> 실행기가 중복 실행을 막고 재시도를 안전하게 만듦
+    ctx.await_confirm(confirm_message, uuid.uuid4().hex)
+
+    return _reply("CONFIRM", confirm_message, ctx, ui_type="confirm_buttons")
 
-    context.update({
-        "target":           resolved,
-        "amount":           float(amount),
-        "currency":         currency,
-        "amount_krw":       amount_krw,
-        "exchange_rate":    rate,
-        "awaiting_confirm": True,
-        "confirm_message":  confirm_message,
-    })
-
-    return {
-        "status":   "CONFIRM",
-        "message":  confirm_message,
-        "context":  context,
-        "ui_type":  "confirm_buttons"
-    }
+# ---------------------------------------------------------
+# 일괄 송금 단계
+# ---------------------------------------------------------
+def _start_batch(question, profile, ctx):
+    prepared = prepare_batch(profile.user_id, profile.contacts, parse_batch_request(question))
+    if prepared["unresolved"]:
+        return _reply(
+            "ERROR",
+            f"다음 대상을 확인할 수 없습니다: {', '.join(prepared['unresolved'])}. 이름을 확인해 다시 요청해주세요.",
+            ctx,
+        )
+    if not prepared["items"]:
+        return _reply("ERROR", "송금할 대상을 찾을 수 없습니다.", ctx)
+    if profile.account_id is None:
+        return _reply("ERROR", "주 계좌를 찾을 수 없습니다.", ctx)
+    if prepared["total_krw"] > profile.balance:
+        return _reply("ERROR", f"잔액이 부족합니다. (필요: {int(prepared['total_krw']):,}원)", ctx)
+
+    confirm_message = render_batch_confirmation(prepared)
+    ctx.batch      = prepared["items"]
+    ctx.amount_krw = prepared["total_krw"]
+    ctx.await_confirm(confirm_message, uuid.uuid4().hex)
+    return _reply("CONFIRM", confirm_message, ctx, ui_type="confirm_buttons")
+
+def _execute_batch_step(profile, ctx):
+    if profile.account_id is None:
+        return _reply("ERROR", "주 계좌를 찾을 수 없습니다.", ctx)
+    outcome = execute_batch_transfer(profile.account_id, ctx.batch, idempotency_key=ctx.idempotency_key)
+    if not outcome["ok"]:
+        if outcome["reason"] == "INSUFFICIENT_FUNDS":
+            return _reply("FAIL", f"잔액이 부족하여 일괄 송금하지 못했습니다. (잔액: {int(outcome['balance_after']):,}원)", ctx)
+        return _reply("ERROR", "주 계좌를 찾을 수 없습니다.", ctx)
+    return _reply(
+        "SUCCESS",
+        f"{len(ctx.batch)}건 송금이 완료되었습니다. "
+        f"(총 {int(ctx.amount_krw):,}원, 잔액: {int(outcome['balance_after']):,}원)",
+        ctx,
+    )
+
+def submit_batch_transfer(username, text, pin, idempotency_key=None):
+    """
+    대화 없이 일괄 송금을 실행하는 API (급여/정기 송금 고객용)
+    text: 줄 단위 요청 ("엄마 10만원\n동생 5만원") / PIN은 한 번만 검증
+    """
+    with query_trace("transfer_batch"), use_primary():
+        profile = load_transfer_profile(username)
+        if profile is None:
+            return _reply("ERROR", "사용자를 찾을 수 없습니다.")
+        try:
+            if not verify_secret(username, pin, profile.pin_hash, kind="pin"):
+                return _reply("FAIL", "PIN Code가 일치하지 않습니다.")
+        except VerificationUnavailable as e:
+            return _reply("ERROR", str(e))
+
+        ctx = TransferContext()
+        started = _start_batch(text, profile, ctx)
+        if started["status"] != "CONFIRM":
+            return started
+        if idempotency_key:
+            ctx.idempotency_key = idempotency_key
+        ctx.await_password()
+        result = _execute_batch_step(profile, ctx)
+        result["items"] = ctx.batch
+        return result
+
+def schedule_batch_transfer(username, text, cadence, pin):
+    """
+    정기 송금 등록 (PIN은 등록 시 한 번 확인, 실행은 transfer_scheduler 프로세스가 담당)
+    cadence: "daily@09:00", "weekly:0@09:00", "monthly:25@09:00"
+    """
+    with use_primary():
+        profile = load_transfer_profile(username)
+        if profile is None or profile.account_id is None:
+            return {"status": "ERROR", "message": "사용자 계좌를 찾을 수 없습니다."}
+        try:
+            if not verify_secret(username, pin, profile.pin_hash, kind="pin"):
+                return {"status": "FAIL", "message": "PIN Code가 일치하지 않습니다."}
+        except VerificationUnavailable as e:
+            return {"status": "ERROR", "message": str(e)}
+
+        prepared = prepare_batch(profile.user_id, profile.contacts, parse_batch_request(text))
+        if prepared["unresolved"] or not prepared["items"]:
+            return {"status": "ERROR", "message": f"다음 대상을 확인할 수 없습니다: {', '.join(prepared['unresolved'])}"}
+        first_run_at = register_scheduled_transfer(profile.user_id, profile.account_id, prepared["items"], cadence)
+    return {"status": "SUCCESS", "message": f"정기 송금이 등록되었습니다. (첫 실행: {first_run_at:%Y-%m-%d %H:%M})"}
 
 # ---------------------------------------------------------
 # 외부 호출 함수
 # ---------------------------------------------------------
 def get_transfer_answer(question, username, context=None):
+    result = None
     try:
-        return process_transfer(question, username, context)
+        # 잔액 읽기 -> 차감 -> 원장 기록이 한 흐름이므로 전 구간 primary 고정
+        with query_trace("transfer_agent"), use_primary():
+            result = process_transfer(question, username, context)
+        return result
     except Exception as e:
         import traceback
         traceback.print_exc()
         return {"status": "ERROR", "message": f"시스템 오류가 발생했습니다: {e}"}
+    finally:
+        if result is None or result.get("status") in TERMINAL_STATUSES:
+            drop_transfer_profile(username)
 
 if __name__ == "__main__":
     print("Transfer Agent with Advanced Matching Ready")
\ No newline at end of file
@@ -0,0 +1,152 @@
+import json
+import zlib
+
+# ---------------------------------------------------------
+# 송금 플로우 상태 객체
+# - 자유 형식 dict 대신 __slots__ 고정 필드 + 명시적 상태 전이
+# - 직렬화: 버전이 붙은 위치 기반 JSON 배열 (필드명 없이 압축) / zlib 바이너리
+#   -> 공유 저장소에 넣어두고 어느 워커에서든 이어서 처리 가능
+# - 잘못된 전이(만료된 버튼 클릭 등)는 DB 조회 전에 바로 거절
+# ---------------------------------------------------------
+SCHEMA_VERSION = 1
+_BINARY_MAGIC = b"TC"
+
+# 상태
+START = "START"              # 아직 아무 정보도 없음 (최초 요청 처리 전)
+NEED_INFO = "NEED_INFO"      # 대상/금액 등 부족 정보 입력 대기
+CONFIRM = "CONFIRM"          # 확인 버튼 대기
+PASSWORD = "PASSWORD"        # PIN 입력 대기
+DONE = "DONE"                # 종료 (SUCCESS/CANCEL/FAIL) -> 저장하지 않음
+
+TRANSITIONS = {
+    START: {NEED_INFO, CONFIRM, DONE},
+    NEED_INFO: {NEED_INFO, CONFIRM, DONE},
+    CONFIRM: {CONFIRM, PASSWORD, DONE},
+    PASSWORD: {PASSWORD, DONE},
+    DONE: set(),
+}
+_STATES = (START, NEED_INFO, CONFIRM, PASSWORD, DONE)
+
+class InvalidTransition(ValueError):
+    """허용되지 않은 상태 전이 또는 해석할 수 없는 저장 상태"""
+
+class TransferContext:
+    __slots__ = (
+        "state", "target", "amount", "currency", "amount_krw", "exchange_rate", "rate_date",
+        "missing_field", "password_attempts", "confirm_message", "idempotency_key",
+        "batch", "source_language",
+    )
+    # 직렬화 순서 (state 제외) - 필드를 추가할 때는 맨 뒤에 붙이고 SCHEMA_VERSION 을 올림
+    _FIELDS = __slots__[1:]
+
+    def __init__(self, state=START, **fields):
+        self.state = state
+        for name in self._FIELDS:
+            setattr(self, name, fields.pop(name, None))
+        if fields:
+            raise TypeError(f"알 수 없는 필드: {', '.join(fields)}")
+        if self.password_attempts is None:
+            self.password_attempts = 0
+
+    def __repr__(self):
+        filled = {name: getattr(self, name) for name in self._FIELDS if getattr(self, name) not in (None, 0)}
+        return f"TransferContext({self.state}, {filled})"
+
+    # -----------------------------------------------------
+    # 상태 전이
+    # -----------------------------------------------------
+    def can(self, new_state) -> bool:
+        return new_state in TRANSITIONS[self.state]
+
+    def transition(self, new_state):
+        if not self.can(new_state):
+            raise InvalidTransition(f"{self.state} -> {new_state} 전이는 허용되지 않습니다.")
+        self.state = new_state
+        return self
+
+    def need_info(self, field):
+        self.transition(NEED_INFO)
+        self.missing_field = field
+        return self
+
+    def await_confirm(self, confirm_message, idempotency_key):
+        self.transition(CONFIRM)
+        self.missing_field = None
+        self.confirm_message = confirm_message
+        self.idempotency_key = idempotency_key
+        return self
+
+    def await_password(self):
+        self.transition(PASSWORD)
+        self.password_attempts = 0
+        return self
+
+    def finish(self):
+        self.transition(DONE)
+        return self
+
+    @property
+    def is_batch(self) -> bool:
+        return bool(self.batch)
+
+    # -----------------------------------------------------
+    # 직렬화
+    # -----------------------------------------------------
+    def to_list(self) -> list:
+        return [SCHEMA_VERSION, _STATES.index(self.state)] + [getattr(self, name) for name in self._FIELDS]
+
+    @classmethod
+    def from_list(cls, values):
+        if not isinstance(values, list) or len(values) < 2:
+            raise InvalidTransition("송금 상태를 해석할 수 없습니다.")
+        version, state_code, *rest = values
+        if version != SCHEMA_VERSION:
+            raise InvalidTransition(f"지원하지 않는 송금 상태 버전입니다: {version}")
+        if not isinstance(state_code, int) or not 0 <= state_code < len(_STATES):
+            raise InvalidTransition("송금 상태 값이 올바르지 않습니다.")
+        if len(rest) != len(cls._FIELDS):
+            raise InvalidTransition("송금 상태 필드 수가 맞지 않습니다.")
+        return cls(_STATES[state_code], **dict(zip(cls._FIELDS, rest)))
+
+    def dumps(self) -> str:
+        return json.dumps(self.to_list(), ensure_ascii=False, separators=(",", ":"))
+
+    @classmethod
+    def loads(cls, text: str):
+        try:
+            values = json.loads(text)
+        except ValueError:
+            raise InvalidTransition("송금 상태를 해석할 수 없습니다.")
+        return cls.from_list(values)
+
+    def to_bytes(self) -> bytes:
+        return _BINARY_MAGIC + zlib.compress(self.dumps().encode("utf-8"))
+
+    @classmethod
+    def from_bytes(cls, data: bytes):
+        if not data.startswith(_BINARY_MAGIC):
+            raise InvalidTransition("송금 상태를 해석할 수 없습니다.")
+        try:
+            text = zlib.decompress(data[len(_BINARY_MAGIC):]).decode("utf-8")
+        except zlib.error:
+            raise InvalidTransition("송금 상태를 해석할 수 없습니다.")
+        return cls.loads(text)
+
+    @classmethod
+    def load(cls, value):
+        """None / TransferContext / JSON 문자열 / 바이너리 -> TransferContext (없으면 새 START 상태)"""
+        if value is None or value == "" or value == {}:
+            return cls()
+        if isinstance(value, cls):
+            return value
+        if isinstance(value, (bytes, bytearray)):
+            return cls.from_bytes(bytes(value))
+        if isinstance(value, str):
+            return cls.loads(value)
+        raise InvalidTransition(f"송금 상태 형식이 올바르지 않습니다: {type(value).__name__}")
+
+def serialize_context(context):
+    """세션/공유 저장소 저장용 (종료 상태나 None은 None)"""
+    if context is None or context.state == DONE:
+        return None
+    return context.dumps()
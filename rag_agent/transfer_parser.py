@@ -0,0 +1,156 @@
+import re
+
+from rag_agent.contact_matcher import relation_of
+
+# ---------------------------------------------------------
+# 송금 문장 로컬 파서 (LLM 추출 전에 먼저 시도)
+# - 금액: 숫자/한글 수사 + 단위 (천/만/억/조) 혼용  예) "10만", "3만 5천", "1억 2천만", "삼만오천"
+# - 통화: 한글/영문 별칭 + ISO 코드          예) "동" -> VND, "달러" -> USD, "엔" -> JPY
+#   통화/기호가 붙은 후보 우선, 수량/날짜 숫자("2024년", "2명") 제외, 후보가 애매하면 None
+# - 대상: "~한테", "~에게", "~께", "to ~" (이름 뒤 호칭 "님/씨" 제거, 인원수 "2명"은 대상 아님)
+# - 못 찾은 필드는 None -> 호출하는 쪽에서 LLM 추출로 보완
+# ---------------------------------------------------------
+CURRENCY_ALIASES = {
+    "KRW": ["원", "won", "krw", "₩"],
+    "USD": ["달러", "딸라", "불", "dollars", "dollar", "usd", "$"],
+    "JPY": ["엔", "yen", "jpy", "¥"],
+    "VND": ["동", "dong", "đồng", "vnd"],
+    "CNY": ["위안", "yuan", "cny"],
+    "EUR": ["유로", "euros", "euro", "eur", "€"],
+    "IDR": ["루피아", "rupiah", "idr"],
+    "PHP": ["페소", "pesos", "peso", "php"],
+    "THB": ["바트", "baht", "thb"],
+    "GBP": ["파운드", "pounds", "pound", "gbp", "£"],
+}
+_ALIAS_TO_CODE = {alias: code for code, aliases in CURRENCY_ALIASES.items() for alias in aliases}
+# 긴 별칭부터 매칭 ("dollars" 가 "dollar" 보다 먼저)
+_CURRENCY_PATTERN = "|".join(re.escape(a) for a in sorted(_ALIAS_TO_CODE, key=len, reverse=True))
+_ISO_RE = re.compile(r"\b([A-Z]{3})\b")
+
+_HANGUL_DIGITS = {"일": 1, "이": 2, "삼": 3, "사": 4, "오": 5, "육": 6, "칠": 7, "팔": 8, "구": 9}
+_SMALL_UNITS = {"십": 10, "백": 100, "천": 1000}
+_BIG_UNITS = {"만": 10**4, "억": 10**8, "조": 10**12}
+
+_NUM_TOKEN = r"\d[\d,]*(?:\.\d+)?|[일이삼사오육칠팔구십백천만억조]"
+# 금액 표현: 한글 단어 중간에서 시작하지 않음 ("동생이 5만원"의 '이' 제외)
+_AMOUNT_RE = re.compile(
+    r"(?P<symbol>[$₩¥€£]\s*)?"
+    rf"(?<![가-힣\w])(?P<amount>(?:{_NUM_TOKEN})(?:\s?(?:{_NUM_TOKEN}))*)"
+    rf"(?:\s*(?P<currency>{_CURRENCY_PATTERN}))?"
+    # 통화 뒤에는 공백/문장부호/조사만 허용 ("5만 동생한테"의 '동' 제외)
+    r"(?(currency)(?=$|[\s.,!?~]|[을를이가만씩쯤은는도]|정도|어치)|)",
+    re.I,
+)
+_TOKEN_RE = re.compile(_NUM_TOKEN)
+# 금액이 아닌 숫자: 바로 뒤에 수량/날짜 단위가 오는 경우 ("2024년", "2명", "3건", "10월")
+_COUNTER_RE = re.compile(r"\s?(?:년|명|건|개|월|시|분|번|회|살|층|달|사람)")
+# "5일"의 '일'은 수사로도 잡히므로 금액 토큰 끝에서 따로 확인
+_DATE_DAY_RE = re.compile(r"\d\s?일$")
+
+# 대상: 조사 앞의 한 어절
+_TARGET_RE = re.compile(r"(?P<target>[^\s,.!?]+?)\s*(?:에게로|한테로|에게|한테|께)(?![가-힣])")
+_COUNT_TARGET_RE = re.compile(r"^(?:\d+|[한두세네]|다섯|여섯|몇)?\s*(?:명|분|사람)$")
+_TARGET_EN_RE = re.compile(r"\bto\s+(?P<target>[A-Za-z][\w.'-]*(?:\s+[A-Z][\w.'-]*)?)")
+
+def parse_korean_number(text: str):
+    """'3만 5천', '1억2천만', '10,000', '1.5만', '삼만오천' -> 숫자. 해석 불가면 None"""
+    tokens = _TOKEN_RE.findall(text or "")
+    if not tokens:
+        return None
+    total = 0       # 만/억/조 단위로 확정된 값
+    section = 0     # 만 미만 구간
+    current = None  # 단위가 붙기 전의 숫자
+    for tok in tokens:
+        if tok[0].isdigit():
+            current = float(tok.replace(",", ""))
+        elif tok in _HANGUL_DIGITS:
+            current = _HANGUL_DIGITS[tok]
+        elif tok in _SMALL_UNITS:
+            section += (current if current is not None else 1) * _SMALL_UNITS[tok]
+            current = None
+        else:
+            section += current or 0
+            total += (section or 1) * _BIG_UNITS[tok]
+            section = 0
+            current = None
+    value = total + section + (current or 0)
+    if value <= 0:
+        return None
+    return int(value) if float(value).is_integer() else value
+
+def _candidates(text: str):
+    """문장 안의 금액 후보 [(금액, 통화코드 | None, 통화/기호 표시 여부)] (수량/날짜 숫자는 제외)"""
+    found = []
+    for match in _AMOUNT_RE.finditer(text or ""):
+        raw = match.group("amount").strip()
+        currency = match.group("currency")
+        symbol = match.group("symbol")
+        # 숫자가 전혀 없는 한글 수사는 통화 단위가 붙은 경우만 금액으로 인정 ("오빠" 오인 방지)
+        if not any(ch.isdigit() for ch in raw) and currency is None and not symbol:
+            continue
+        if currency is None and not symbol:
+            # "2024년", "2명", "3건", "5일" 처럼 뒤에 수량/날짜 단위가 붙은 숫자는 금액이 아님
+            if _DATE_DAY_RE.search(raw) or _COUNTER_RE.match(text, match.end()):
+                continue
+        amount = parse_korean_number(raw)
+        if amount is None:
+            continue
+        code = _ALIAS_TO_CODE.get(currency.lower()) if currency else None
+        if code is None and symbol:
+            code = _ALIAS_TO_CODE[symbol.strip()]
+        if code is None:
+            iso = _ISO_RE.search(text[match.end():match.end() + 8])
+            if iso and iso.group(1) in CURRENCY_ALIASES:
+                code = iso.group(1)
+        found.append((amount, code, code is not None))
+    return found
+
+def parse_amount(text: str):
+    """
+    문장에서 (금액, 통화코드) 추출. 통화가 없으면 통화코드 None, 금액이 없으면 None
+    통화/기호가 붙은 후보를 우선하고, 서로 다른 금액 후보가 둘 이상이면 애매하므로 None (LLM 판단)
+    """
+    found = _candidates(text)
+    marked = [c for c in found if c[2]]
+    found = marked or found
+    if len({(amount, code) for amount, code, _ in found}) != 1:
+        return None
+    amount, code, _ = found[0]
+    return amount, code
+
+def _clean_target(target: str):
+    """대상 어절 정리: 인원수("2명", "두 분")는 대상이 아님, 이름 뒤 호칭("김철수님", "철수씨")은 제거"""
+    if _COUNT_TARGET_RE.match(target):
+        return None
+    # "어머님", "사장님", "형님" 처럼 호칭까지가 관계 이름인 경우는 그대로
+    if relation_of(target) or target.endswith("선생님"):
+        return target
+    for suffix in ("님", "씨"):
+        if target.endswith(suffix) and len(target) > len(suffix) + 1:
+            return target[:-len(suffix)]
+    return target
+
+def extract_target(text: str):
+    """'엄마한테 10만원 보내줘' -> '엄마', 'send 100 dollars to Mom' -> 'Mom'"""
+    match = _TARGET_RE.search(text or "")
+    if match:
+        return _clean_target(match.group("target"))
+    match = _TARGET_EN_RE.search(text or "")
+    if match:
+        return match.group("target")
+    return None
+
+def parse_transfer_request(text: str) -> dict:
+    """
+    {"target", "amount", "currency"} (모르는 값은 None)
+    금액은 찾았는데 통화가 없으면 KRW (LLM 추출 규칙과 동일)
+    """
+    target = extract_target(text)
+    parsed = parse_amount(text)
+    amount, currency = parsed if parsed else (None, None)
+    if amount is not None and currency is None:
+        currency = "KRW"
+    return {"target": target, "amount": amount, "currency": currency}
+
+def is_complete(parsed: dict) -> bool:
+    return bool(parsed.get("target")) and parsed.get("amount") is not None
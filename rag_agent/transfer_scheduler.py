@@ -0,0 +1,168 @@
+"""
+예약(정기) 송금 스케줄러
+
+요청 처리 경로와 분리된 별도 프로세스로 실행합니다.
+    python rag_agent/transfer_scheduler.py
+
+- 등록: register_scheduled_transfer (PIN 확인은 등록 시점에 호출하는 쪽에서 수행)
+- 실행: 주기적으로 기한이 된 예약을 찾아 execute_batch_transfer 로 실행
+  멱등성 키 = 예약 ID + 예정 시각 -> 워커가 여러 개이거나 재시작되어도 같은 회차는 한 번만 출금
+- 다음 회차로 넘어가는 것은 결과가 확정된 경우(성공/잔액 부족/계좌 없음)뿐
+  DB 장애 같은 예외는 같은 회차(같은 키)를 지수 백오프로 재시도 -> 재시도해도 중복 출금 없음
+- 주기 형식: "daily@09:00", "weekly:0@09:00" (0=월요일), "monthly:25@09:00" (말일보다 크면 말일)
+"""
+import os
+import sys
+import json
+import time
+import calendar
+import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import schedule
+
+from utils.handle_sql import get_data, execute_query, use_primary
+from utils.transfer_executor import execute_batch_transfer, check_transfer_tables
+from utils.sql_metrics import query_trace
+from rag_agent.batch_transfer import requote_items
+
+SCHEDULER_INTERVAL_SECONDS = int(os.getenv("TRANSFER_SCHEDULER_INTERVAL", 60))
+DUE_BATCH_SIZE = 50
+# 일시적 오류(ERROR)는 같은 회차를 지수 백오프로 재시도, 이 횟수를 넘기면 그 회차는 포기하고 다음 회차로
+SCHEDULE_MAX_RETRIES = int(os.getenv("TRANSFER_SCHEDULE_MAX_RETRIES", 5))
+SCHEDULE_RETRY_BASE_SECONDS = int(os.getenv("TRANSFER_SCHEDULE_RETRY_BASE", 60))
+
+SCHEDULED_TRANSFERS_DDL = """
+CREATE TABLE IF NOT EXISTS scheduled_transfers (
+    schedule_id INT AUTO_INCREMENT PRIMARY KEY,
+    user_id INT NOT NULL,
+    account_id INT NOT NULL,
+    items TEXT NOT NULL,
+    cadence VARCHAR(40) NOT NULL,
+    next_run_at DATETIME NOT NULL,
+    active TINYINT NOT NULL DEFAULT 1,
+    last_run_at DATETIME,
+    last_status VARCHAR(40),
+    retry_count INT NOT NULL DEFAULT 0,
+    retry_at DATETIME,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    INDEX idx_due (active, next_run_at)
+)
+"""
+
+# ---------------------------------------------------------
+# 주기 계산
+# ---------------------------------------------------------
+def _parse_cadence(cadence: str):
+    kind, _, at = cadence.partition("@")
+    hour, minute = (int(x) for x in (at or "09:00").split(":"))
+    kind, _, arg = kind.partition(":")
+    if kind not in ("daily", "weekly", "monthly"):
+        raise ValueError(f"지원하지 않는 주기입니다: {cadence}")
+    return kind, int(arg) if arg else None, hour, minute
+
+def next_run_after(cadence: str, after: datetime.datetime) -> datetime.datetime:
+    """after 이후(초과) 첫 실행 시각"""
+    kind, arg, hour, minute = _parse_cadence(cadence)
+    if kind == "daily":
+        candidate = after.replace(hour=hour, minute=minute, second=0, microsecond=0)
+        return candidate if candidate > after else candidate + datetime.timedelta(days=1)
+    if kind == "weekly":
+        candidate = after.replace(hour=hour, minute=minute, second=0, microsecond=0)
+        candidate += datetime.timedelta(days=(arg - candidate.weekday()) % 7)
+        return candidate if candidate > after else candidate + datetime.timedelta(days=7)
+    # monthly
+    year, month = after.year, after.month
+    for _ in range(2):
+        day = min(arg, calendar.monthrange(year, month)[1])
+        candidate = datetime.datetime(year, month, day, hour, minute)
+        if candidate > after:
+            return candidate
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+    return candidate
+
+# ---------------------------------------------------------
+# 등록 / 실행
+# ---------------------------------------------------------
+def register_scheduled_transfer(user_id, account_id, items, cadence, first_run_at=None):
+    """일괄 송금 항목(prepare_batch 결과의 items)을 주기적으로 실행하도록 등록"""
+    first_run_at = first_run_at or next_run_after(cadence, datetime.datetime.now())
+    stored_items = [
+        {k: item[k] for k in ("contact_id", "contact_name", "amount", "currency")}
+        for item in items
+    ]
+    execute_query(
+        "INSERT INTO scheduled_transfers (user_id, account_id, items, cadence, next_run_at) "
+        "VALUES (%s, %s, %s, %s, %s)",
+        (user_id, account_id, json.dumps(stored_items, ensure_ascii=False), cadence, first_run_at),
+    )
+    return first_run_at
+
+def cancel_scheduled_transfer(schedule_id, user_id):
+    return execute_query(
+        "UPDATE scheduled_transfers SET active = 0 WHERE schedule_id = %s AND user_id = %s",
+        (schedule_id, user_id),
+    )
+
+def _run_one(row, now):
+    scheduled_at = row["next_run_at"]
+    key = f"sched-{row['schedule_id']}-{scheduled_at:%Y%m%d%H%M}"
+    try:
+        # 환율은 실행 시점 기준으로 다시 계산
+        items = requote_items(json.loads(row["items"]))
+        outcome = execute_batch_transfer(row["account_id"], items, idempotency_key=key)
+        status = "SUCCESS" if outcome["ok"] else outcome["reason"]
+    except Exception as e:
+        print(f"❌ [Scheduler] 예약 {row['schedule_id']} 실행 실패: {e}")
+        status = "ERROR"
+
+    retry_count = row.get("retry_count") or 0
+    if status == "ERROR" and retry_count < SCHEDULE_MAX_RETRIES:
+        # 결과 미확정: next_run_at(=멱등성 키)은 그대로 두고 재시도 시각만 미룸
+        retry_at = now + datetime.timedelta(seconds=SCHEDULE_RETRY_BASE_SECONDS * (2 ** retry_count))
+        execute_query(
+            "UPDATE scheduled_transfers SET retry_count = %s, retry_at = %s, last_run_at = %s, last_status = %s "
+            "WHERE schedule_id = %s AND next_run_at = %s",
+            (retry_count + 1, retry_at, now, status, row["schedule_id"], scheduled_at),
+        )
+        print(f"🔁 [Scheduler] 예약 {row['schedule_id']} 재시도 예정 ({retry_count + 1}/{SCHEDULE_MAX_RETRIES}, {retry_at})")
+        return status
+
+    # 밀린 회차는 건너뛰고 다음 미래 시각으로 (next_run_at 조건으로 다른 워커와 중복 갱신 방지)
+    next_run = next_run_after(row["cadence"], max(scheduled_at, now))
+    execute_query(
+        "UPDATE scheduled_transfers SET next_run_at = %s, last_run_at = %s, last_status = %s, "
+        "retry_count = 0, retry_at = NULL "
+        "WHERE schedule_id = %s AND next_run_at = %s",
+        (next_run, now, status, row["schedule_id"], scheduled_at),
+    )
+    print(f"🗓️ [Scheduler] 예약 {row['schedule_id']} -> {status} (다음 실행 {next_run})")
+    return status
+
+def run_due_transfers(now=None):
+    """기한이 된 예약 송금을 실행하고 실행 건수를 반환"""
+    now = now or datetime.datetime.now()
+    with query_trace("transfer_scheduler"), use_primary():
+        rows = get_data(
+            "SELECT schedule_id, account_id, items, cadence, next_run_at, retry_count FROM scheduled_transfers "
+            "WHERE active = 1 AND next_run_at <= %s AND (retry_at IS NULL OR retry_at <= %s) "
+            "ORDER BY next_run_at LIMIT %s",
+            (now, now, DUE_BATCH_SIZE),
+        )
+        for row in rows:
+            _run_one(row, now)
+    return len(rows)
+
+def main():
+    # 마이그레이션 전 DB면 매 회차 실패 기록을 남기지 않고 시작 단계에서 종료
+    check_transfer_tables()
+    print(f"🚀 예약 송금 스케줄러 시작 ({SCHEDULER_INTERVAL_SECONDS}초 주기)")
+    schedule.every(SCHEDULER_INTERVAL_SECONDS).seconds.do(run_due_transfers)
+    run_due_transfers()
+    while True:
+        schedule.run_pending()
+        time.sleep(1)
+
+if __name__ == "__main__":
+    main()
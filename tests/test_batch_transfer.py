@@ -0,0 +1,27 @@
+import pytest
+
+from benchmarks.bench_transfer_parser import batch_fields, load_corpus
+from rag_agent.batch_transfer import is_batch_request, parse_batch_request
+
+CORPUS = load_corpus()
+BATCH_CASES = [case for case in CORPUS if "batch" in case]
+# "친구 2명한테 3만원씩" 같은 그룹 + 씩 요청은 일괄 송금이 맞으므로 제외
+SINGLE_CASES = [case for case in CORPUS if "batch" not in case and not any(w in case["text"] for w in ("각각", "씩"))]
+
+@pytest.mark.parametrize("case", BATCH_CASES, ids=[case["text"] for case in BATCH_CASES])
+def test_batch_corpus(case):
+    assert batch_fields(parse_batch_request(case["text"])) == batch_fields(case["batch"])
+    assert is_batch_request(case["text"])
+
+@pytest.mark.parametrize("case", SINGLE_CASES, ids=[case["text"] for case in SINGLE_CASES])
+def test_single_requests_are_not_batches(case):
+    assert not is_batch_request(case["text"])
+
+def test_listed_targets_share_group_expansion():
+    requests = parse_batch_request("가족, 친구들한테 각각 1만원")
+    assert [r["target"] for r in requests] == ["가족", "친구들"]
+    assert requests[0]["group"] and requests[1]["group"] == {"friend"}
+
+def test_listed_targets_without_each_are_not_expanded():
+    # "각각/씩" 이 없으면 나눠 보낼지 각자 보낼지 알 수 없으므로 나열된 앞 대상은 붙이지 않음
+    assert [r["target"] for r in parse_batch_request("엄마, 아빠한테 5만원 보내줘")] == ["아빠"]
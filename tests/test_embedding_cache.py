@@ -0,0 +1,113 @@
+import multiprocessing
+
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("langchain_core")
+
+from rag_agent import embedding_cache
+from rag_agent.embedding_cache import DiskEmbeddingStore
+
+DIM = 4
+MODEL = "test-model"
+
+def _vector(key):
+    seed = sum(key.encode("utf-8"))
+    return np.arange(DIM, dtype=np.float32) + seed
+
+def _writer(directory, prefix, count):
+    store = DiskEmbeddingStore(MODEL, directory)
+    for i in range(count):
+        # 일부 키는 다른 프로세스와 겹침
+        key = f"shared-{i}" if i % 5 == 0 else f"{prefix}-{i}"
+        store.put(key, _vector(key))
+
+def _paths(tmp_path):
+    return tmp_path / f"{MODEL}.f32", tmp_path / f"{MODEL}.keys"
+
+def test_put_get_and_reload(tmp_path):
+    store = DiskEmbeddingStore(MODEL, tmp_path)
+    for key in ("a", "b", "c"):
+        store.put(key, _vector(key))
+    store.put("a", _vector("other"))   # 이미 있는 키는 덮어쓰지 않음
+
+    reloaded = DiskEmbeddingStore(MODEL, tmp_path)
+    assert len(reloaded) == 3
+    for key in ("a", "b", "c"):
+        assert np.array_equal(reloaded.get(key), _vector(key))
+    assert reloaded.get("missing") is None
+
+def test_dimension_mismatch_is_rejected(tmp_path):
+    store = DiskEmbeddingStore(MODEL, tmp_path)
+    store.put("a", _vector("a"))
+    with pytest.raises(ValueError):
+        store.put("b", np.zeros(DIM + 1))
+
+def test_load_truncates_vector_without_key(tmp_path):
+    store = DiskEmbeddingStore(MODEL, tmp_path)
+    store.put("a", _vector("a"))
+    vec_path, _ = _paths(tmp_path)
+    with open(vec_path, "ab") as f:
+        f.write(_vector("orphan").tobytes() + b"\x00\x01")   # 키 기록 전에 중단된 쓰기
+
+    reloaded = DiskEmbeddingStore(MODEL, tmp_path)
+    assert vec_path.stat().st_size == DIM * 4
+    reloaded.put("b", _vector("b"))
+    assert np.array_equal(DiskEmbeddingStore(MODEL, tmp_path).get("b"), _vector("b"))
+
+def test_load_drops_key_without_vector(tmp_path):
+    store = DiskEmbeddingStore(MODEL, tmp_path)
+    store.put("a", _vector("a"))
+    _, key_path = _paths(tmp_path)
+    with open(key_path, "a", encoding="utf-8") as f:
+        f.write("ghost\n")
+
+    reloaded = DiskEmbeddingStore(MODEL, tmp_path)
+    assert len(reloaded) == 1 and reloaded.get("ghost") is None
+    assert key_path.read_text(encoding="utf-8") == "a\n"
+
+def test_put_truncates_orphan_tail_left_by_other_writer(tmp_path):
+    store = DiskEmbeddingStore(MODEL, tmp_path)
+    store.put("a", _vector("a"))
+    vec_path, _ = _paths(tmp_path)
+    with open(vec_path, "ab") as f:
+        f.write(_vector("crashed").tobytes())   # 다른 프로세스가 벡터만 쓰고 죽음
+
+    store.put("b", _vector("b"))
+    assert vec_path.stat().st_size == 2 * DIM * 4
+    assert np.array_equal(DiskEmbeddingStore(MODEL, tmp_path).get("b"), _vector("b"))
+
+def test_reads_keys_written_by_other_instance(tmp_path):
+    first = DiskEmbeddingStore(MODEL, tmp_path)
+    second = DiskEmbeddingStore(MODEL, tmp_path)
+    first.put("a", _vector("a"))
+    second.put("b", _vector("b"))
+    assert np.array_equal(first.get("b"), _vector("b"))
+    assert np.array_equal(second.get("a"), _vector("a"))
+
+def test_partial_key_line_is_ignored(tmp_path):
+    store = DiskEmbeddingStore(MODEL, tmp_path)
+    store.put("a", _vector("a"))
+    _, key_path = _paths(tmp_path)
+    with open(key_path, "a", encoding="utf-8") as f:
+        f.write("half-writ")   # 줄바꿈 전까지 기록 중
+    assert store.get("half-writ") is None
+
+@pytest.mark.skipif(embedding_cache.fcntl is None, reason="파일 잠금(fcntl)이 없는 플랫폼")
+def test_concurrent_writers_keep_rows_aligned(tmp_path):
+    ctx = multiprocessing.get_context("spawn")
+    workers = [ctx.Process(target=_writer, args=(str(tmp_path), f"p{n}", 40)) for n in range(3)]
+    for p in workers:
+        p.start()
+    for p in workers:
+        p.join(60)
+        assert p.exitcode == 0
+
+    store = DiskEmbeddingStore(MODEL, tmp_path)
+    vec_path, key_path = _paths(tmp_path)
+    keys = key_path.read_text(encoding="utf-8").split()
+    assert vec_path.stat().st_size == len(keys) * DIM * 4
+    expected = {f"shared-{i}" for i in range(0, 40, 5)} | {f"p{n}-{i}" for n in range(3) for i in range(40) if i % 5}
+    assert set(keys) == expected and len(keys) == len(expected)
+    for key in expected:
+        assert np.array_equal(store.get(key), _vector(key)), key
@@ -0,0 +1,70 @@
+import threading
+
+import pytest
+
+pytest.importorskip("bcrypt")
+
+from utils import pin_verifier
+from utils.pin_verifier import MAX_ATTEMPTS, TooManyAttempts, VerifierBusy, VerifierTimeout, verify_secret
+
+@pytest.fixture(autouse=True)
+def local_checkpw(monkeypatch):
+    # 워커 프로세스 대신 같은 스레드에서 비교 (해시 대신 평문 비교)
+    monkeypatch.setattr(pin_verifier, "_run_checkpw", lambda secret, hashed: secret == hashed)
+
+def test_wrong_pins_are_throttled():
+    for _ in range(MAX_ATTEMPTS):
+        assert verify_secret("wrong-user", "0000", "1234", kind="pin") is False
+    with pytest.raises(TooManyAttempts):
+        verify_secret("wrong-user", "1234", "1234", kind="pin")
+
+def test_success_clears_failures():
+    for _ in range(MAX_ATTEMPTS - 1):
+        verify_secret("ok-user", "0000", "1234", kind="pin")
+    assert verify_secret("ok-user", "1234", "1234", kind="pin") is True
+    for _ in range(MAX_ATTEMPTS - 1):
+        assert verify_secret("ok-user", "0000", "1234", kind="pin") is False
+
+def test_busy_rejections_do_not_count(monkeypatch):
+    full = threading.BoundedSemaphore(1)
+    full.acquire()
+    monkeypatch.setattr(pin_verifier, "_slots", full)
+    for _ in range(MAX_ATTEMPTS * 2):
+        with pytest.raises(VerifierBusy):
+            verify_secret("busy-user", "1234", "1234", kind="pin")
+    full.release()
+    assert verify_secret("busy-user", "1234", "1234", kind="pin") is True
+
+def test_timeouts_do_not_count(monkeypatch):
+    def timeout(secret, hashed):
+        raise VerifierTimeout()
+
+    monkeypatch.setattr(pin_verifier, "_run_checkpw", timeout)
+    for _ in range(MAX_ATTEMPTS * 2):
+        with pytest.raises(VerifierTimeout):
+            verify_secret("slow-user", "1234", "1234", kind="pin")
+    assert pin_verifier._inflight.get(("pin", "slow-user")) is None
+
+def test_in_flight_attempts_count_toward_limit(monkeypatch):
+    release = threading.Event()
+    started = threading.Semaphore(0)
+
+    def blocked(secret, hashed):
+        started.release()
+        release.wait(5)
+        return False
+
+    monkeypatch.setattr(pin_verifier, "_run_checkpw", blocked)
+    monkeypatch.setattr(pin_verifier, "_slots", threading.BoundedSemaphore(MAX_ATTEMPTS + 1))
+    threads = [threading.Thread(target=verify_secret, args=("burst-user", "0000", "1234", "pin")) for _ in range(MAX_ATTEMPTS)]
+    for t in threads:
+        t.start()
+    for _ in threads:
+        assert started.acquire(timeout=5)
+    try:
+        with pytest.raises(TooManyAttempts):
+            verify_secret("burst-user", "1234", "1234", kind="pin")
+    finally:
+        release.set()
+        for t in threads:
+            t.join()
@@ -0,0 +1,64 @@
+import pytest
+
+pytest.importorskip("pymysql")
+
+from utils import rate_cache
+from utils.rate_cache import get_rate_quote
+
+USD = {"currency_code": "USD", "currency_name": "미국 달러", "base_rate": 1400, "send_rate": 1420,
+       "get_rate": 1380, "reference_date": "2026-10-19"}
+
+class FakeDB:
+    def __init__(self, rows):
+        self.rows = rows
+        self.version = 1
+        self.loads = 0
+        self.fail = False
+
+    def get_data(self, query, args=None):
+        if self.fail:
+            raise RuntimeError("DB 연결 실패")
+        if "exchange_rate_version" in query:
+            return [{"version": self.version}]
+        self.loads += 1
+        return list(self.rows)
+
+@pytest.fixture
+def db(monkeypatch):
+    db = FakeDB([])
+    monkeypatch.setattr(rate_cache, "get_data", db.get_data)
+    for name, value in (("_rates", {}), ("_loaded", False), ("_loaded_at", 0.0), ("_version", None),
+                        ("_version_checked_at", 0.0), ("_refreshing", False)):
+        monkeypatch.setattr(rate_cache, name, value)
+    return db
+
+def test_empty_table_is_cached(db):
+    for _ in range(5):
+        assert get_rate_quote("USD") is None
+    assert db.loads == 1
+
+def test_empty_table_reloads_on_version_change(db, monkeypatch):
+    get_rate_quote("USD")
+    db.rows, db.version = [USD], 2
+    monkeypatch.setattr(rate_cache, "RATE_VERSION_CHECK_INTERVAL", 0)
+    assert get_rate_quote("USD")["send_rate"] == 1420.0
+    assert db.loads == 2
+
+def test_unchanged_version_skips_reload(db, monkeypatch):
+    db.rows = [USD]
+    get_rate_quote("USD")
+    monkeypatch.setattr(rate_cache, "RATE_VERSION_CHECK_INTERVAL", 0)
+    get_rate_quote("USD")
+    assert db.loads == 1
+
+def test_refresh_error_keeps_cached_table(db, monkeypatch):
+    db.rows = [USD]
+    get_rate_quote("USD")
+    db.fail = True
+    monkeypatch.setattr(rate_cache, "RATE_CACHE_TTL", 0)
+    assert get_rate_quote("USD")["send_rate"] == 1420.0
+
+def test_cold_start_error_raises(db):
+    db.fail = True
+    with pytest.raises(RuntimeError):
+        get_rate_quote("USD")
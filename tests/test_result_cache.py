@@ -0,0 +1,81 @@
+import pytest
+
+pytest.importorskip("pymysql")
+
+from utils import result_cache
+from utils.result_cache import USER_VERSION_SQL, cached_get_data, invalidate_account, register_account_owner
+
+USER_ID = 3
+ACCOUNT_ID = 30
+QUERY = "SELECT balance FROM current_user_accounts"
+
+class FakeDB:
+    """account_versions 합과 잔액만 가진 DB 대역 (실행된 쿼리 기록)"""
+    def __init__(self):
+        self.version = 0
+        self.balance = 1000
+        self.fail_version = False
+        self.queries = []
+
+    def get_data(self, query, args=None):
+        self.queries.append(query)
+        if query == USER_VERSION_SQL:
+            if self.fail_version:
+                raise RuntimeError("Table 'account_versions' doesn't exist")
+            return [{"version": self.version}]
+        return [{"balance": self.balance}]
+
+    def count(self, kind):
+        return sum(1 for q in self.queries if (q == USER_VERSION_SQL) == (kind == "version"))
+
+@pytest.fixture
+def db(monkeypatch):
+    db = FakeDB()
+    monkeypatch.setattr(result_cache, "get_data", db.get_data)
+    result_cache.clear_result_cache()
+    register_account_owner(ACCOUNT_ID, USER_ID)
+    yield db
+    result_cache.clear_result_cache()
+
+def test_hit_skips_database(db):
+    assert cached_get_data(USER_ID, QUERY) == [{"balance": 1000}]
+    db.balance = 500
+    assert cached_get_data(USER_ID, QUERY) == [{"balance": 1000}]
+    assert db.count("data") == 1
+    # 버전은 확인 주기 안에서 한 번만 조회
+    assert db.count("version") == 1
+
+def test_local_write_invalidates(db):
+    cached_get_data(USER_ID, QUERY)
+    db.balance = 500
+    invalidate_account(ACCOUNT_ID)
+    assert cached_get_data(USER_ID, QUERY) == [{"balance": 500}]
+
+def test_remote_write_invalidates_after_check_interval(db, monkeypatch):
+    cached_get_data(USER_ID, QUERY)
+    db.balance, db.version = 500, 1   # 다른 프로세스의 송금 커밋
+    assert cached_get_data(USER_ID, QUERY) == [{"balance": 1000}]
+
+    monkeypatch.setattr(result_cache, "VERSION_CHECK_SECONDS", 0)
+    assert cached_get_data(USER_ID, QUERY) == [{"balance": 500}]
+    assert result_cache.get_result_cache_stats()["remote_invalidations"] >= 1
+
+def test_unchanged_version_keeps_entries(db, monkeypatch):
+    monkeypatch.setattr(result_cache, "VERSION_CHECK_SECONDS", 0)
+    cached_get_data(USER_ID, QUERY)
+    db.balance = 500
+    assert cached_get_data(USER_ID, QUERY) == [{"balance": 1000}]
+    assert db.count("version") == 2
+
+def test_version_failure_reads_uncached(db):
+    db.fail_version = True
+    cached_get_data(USER_ID, QUERY)
+    db.balance = 500
+    assert cached_get_data(USER_ID, QUERY) == [{"balance": 500}]
+    assert db.count("data") == 2
+
+def test_anonymous_reads_bypass_cache(db):
+    cached_get_data(None, QUERY)
+    cached_get_data(None, QUERY)
+    assert db.count("data") == 2
+    assert db.count("version") == 0
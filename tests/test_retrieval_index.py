@@ -0,0 +1,65 @@
+import pytest
+
+pytest.importorskip("langchain_core")
+
+from rag_agent.lexical_index import BM25Index, char_ngrams, reciprocal_rank_fusion
+from rag_agent.term_index import TermIndex, term_aliases
+
+TERMS = [
+    {"id": "1", "word": "기준금리", "definition": "중앙은행이 정하는 정책 금리로 시중 금리의 기준이 된다."},
+    {"id": "2", "word": "금리", "definition": "빌린 돈에 붙는 이자의 비율."},
+    {"id": "3", "word": "PER(주가수익비율)", "definition": "주가를 주당순이익으로 나눈 값."},
+    {"id": "4", "word": "ETF", "definition": "지수를 따라가도록 설계되어 거래소에서 사고파는 펀드."},
+]
+
+@pytest.fixture(scope="module")
+def term_index():
+    return TermIndex.from_records(
+        [t["id"] for t in TERMS],
+        [f"{t['word']}: {t['definition']}" for t in TERMS],
+        [{"word": t["word"]} for t in TERMS],
+    )
+
+def _words(docs):
+    return [doc.metadata["word"] for doc in docs]
+
+def test_term_aliases_include_parenthesized_names():
+    assert term_aliases("PER(주가수익비율)") == {"per(주가수익비율)", "per", "주가수익비율"}
+
+def test_lookup_by_name_and_alias(term_index):
+    assert term_index.lookup("기준 금리").metadata["word"] == "기준금리"
+    assert term_index.lookup("주가수익비율").metadata["word"] == "PER(주가수익비율)"
+    assert term_index.lookup("상장지수펀드").metadata["word"] == "ETF"
+    assert term_index.lookup("환율") is None
+
+def test_longer_match_wins(term_index):
+    assert _words(term_index.find_terms("기준금리가 오르면 어떻게 돼?")) == ["기준금리"]
+
+def test_terms_in_query_order(term_index):
+    assert _words(term_index.find_terms("ETF랑 per 차이")) == ["ETF", "PER(주가수익비율)"]
+
+def test_ascii_terms_need_word_boundaries(term_index):
+    assert term_index.find_terms("super 마켓 가격") == []
+
+def test_char_ngrams():
+    assert char_ngrams("기준금리가") == ["기준", "준금", "금리", "리가", "기준금", "준금리", "금리가"]
+    assert char_ngrams("a 금") == []
+
+def test_bm25_ranks_matching_term_first():
+    index = BM25Index.build(TERMS)
+    results = index.search("주당순이익 대비 주가", k=2)
+    assert results[0][0] == "3"
+    assert index.get("3")[0] == "PER(주가수익비율)"
+    assert index.search("없는단어zzz") == []
+
+def test_bm25_save_and_load(tmp_path):
+    index = BM25Index.build(TERMS)
+    path = index.save(tmp_path / "bm25.json.gz")
+    loaded = BM25Index.load(path)
+    assert loaded.search("기준금리", k=1)[0][0] == index.search("기준금리", k=1)[0][0]
+    assert BM25Index.load(tmp_path / "missing.json.gz") is None
+
+def test_reciprocal_rank_fusion():
+    fused = reciprocal_rank_fusion([["a", "b", "c"], ["b", "c", "d"]], k=60)
+    assert [doc_id for doc_id, _ in fused] == ["b", "c", "a", "d"]
+    assert fused[0][1] == pytest.approx(1 / 62 + 1 / 61)
@@ -0,0 +1,130 @@
+import os
+
+import pytest
+
+from rag_agent.sql_plan_cache import build_plan, clear_plans, lookup_plan, store_plan
+from rag_agent.sql_result import inject_limit
+
+RECENT_SQL = "SELECT amount, created_at FROM current_user_transactions ORDER BY created_at DESC LIMIT 5"
+
+@pytest.fixture(autouse=True)
+def empty_plan_cache():
+    clear_plans()
+    yield
+    clear_plans()
+
+@pytest.mark.parametrize("query, args, expected", [
+    ("SELECT 1", None, ("SELECT 1\nLIMIT 201", None)),
+    ("SELECT 1 LIMIT 10;", None, ("SELECT 1 LIMIT 10", None)),
+    ("SELECT 1 LIMIT 1000", None, ("SELECT 1 LIMIT 201", None)),
+    ("SELECT 1 LIMIT 5, 1000", None, ("SELECT 1 LIMIT 5, 201", None)),
+    # 플랜 템플릿: 쿼리는 그대로, 바인딩 값만 상한으로
+    ("SELECT 1 LIMIT %s", (5,), ("SELECT 1 LIMIT %s", (5,))),
+    ("SELECT 1 LIMIT %s", (1000,), ("SELECT 1 LIMIT %s", (201,))),
+    ("SELECT 1 WHERE c = %s AND d LIKE '%%a' LIMIT %s", ("x", 900), ("SELECT 1 WHERE c = %s AND d LIKE '%%a' LIMIT %s", ("x", 201))),
+    ("SELECT 1 LIMIT %s, %s", (10, 900), ("SELECT 1 LIMIT %s, %s", (10, 201))),
+])
+def test_inject_limit(query, args, expected):
+    assert inject_limit(query, 201, args) == expected
+
+def test_inject_limit_requires_bound_limit():
+    with pytest.raises(ValueError):
+        inject_limit("SELECT 1 LIMIT %s", 201)
+
+def test_build_plan_slots_question_numbers():
+    plan = build_plan("최근 거래 5건 보여줘", RECENT_SQL)
+    assert plan["skeleton"] == "최근 거래 {0}건 보여줘"
+    assert plan["sql"].endswith("LIMIT %s")
+
+def test_lookup_binds_new_literals():
+    store_plan("최근 거래 5건 보여줘", RECENT_SQL, "fp")
+    hit = lookup_plan("최근 거래 12건 보여줘", "fp")
+    assert hit is not None
+    _, sql, params = hit
+    assert params == (12,)
+    assert inject_limit(sql, 201, params) == (sql, (12,))
+
+def test_lookup_misses_on_other_schema():
+    store_plan("최근 거래 5건 보여줘", RECENT_SQL, "fp")
+    assert lookup_plan("최근 거래 12건 보여줘", "other") is None
+
+def test_string_slot_keeps_like_wildcards():
+    sql = "SELECT SUM(amount) AS total FROM current_user_transactions WHERE description LIKE '%스타벅스%'"
+    store_plan("스타벅스에서 얼마 썼어", sql, "fp")
+    _, template, params = lookup_plan("이디야에서 얼마 썼어", "fp")
+    assert "LIKE %s" in template
+    assert params == ("%이디야%",)
+
+def test_time_dependent_sql_is_not_stored():
+    sql = "SELECT SUM(amount) FROM current_user_transactions WHERE created_at >= '2026-09-01'"
+    assert store_plan("9월 지출 합계", sql, "fp") is None
+
+def test_cached_template_executes_with_single_limit(monkeypatch):
+    pytest.importorskip("langchain_openai")
+    pytest.importorskip("langgraph")
+    # 모듈 로드 시 ChatOpenAI 를 만들기 때문에 키 형식만 채움 (LLM 호출 없음)
+    monkeypatch.setenv("OPENAI_API_KEY", os.getenv("OPENAI_API_KEY", "test"))
+    from rag_agent import sql_agent
+
+    executed = []
+
+    def fake_fetch(query, args, user_id):
+        if query.startswith("SELECT COUNT(*)"):
+            # 잘린 결과의 요약 쿼리: 사용자가 요청한 LIMIT 그대로 집계
+            return [{"row_count": args[-1], "sum_0": -1000 * args[-1], "min_0": -1000, "max_0": -1000}]
+        executed.append((query, args))
+        return [{"amount": -1000, "created_at": None}] * args[-1]
+
+    monkeypatch.setattr(sql_agent, "_fetch_user_rows", fake_fetch)
+
+    store_plan("최근 거래 5건 보여줘", RECENT_SQL, "fp")
+    for count, bound in ((3, 3), (500, sql_agent.MAX_RESULT_ROWS + 1)):
+        _, sql, params = lookup_plan(f"최근 거래 {count}건 보여줘", "fp")
+        result, error = sql_agent._execute_query(sql, params, user_id=1)
+        query, args = executed[-1]
+        assert error is None
+        assert query.upper().count("LIMIT") == 1
+        assert args == (bound,)
+        assert result.startswith(f"rows: {count}")
+
+@pytest.fixture
+def sql_agent(monkeypatch):
+    pytest.importorskip("langchain_openai")
+    pytest.importorskip("langgraph")
+    pymysql = pytest.importorskip("pymysql")
+    monkeypatch.setenv("OPENAI_API_KEY", os.getenv("OPENAI_API_KEY", "test"))
+    from rag_agent import sql_agent
+
+    def failing_fetch(query, args, user_id):
+        raise pymysql.err.ProgrammingError(1064, "You have an error in your SQL syntax")
+
+    monkeypatch.setattr(sql_agent, "_fetch_user_rows", failing_fetch)
+    monkeypatch.setattr(sql_agent, "get_data", lambda query, args=None: failing_fetch(query, args, None))
+    return sql_agent
+
+def _plan_hit_state():
+    store_plan("최근 거래 5건 보여줘", RECENT_SQL, "fp")
+    plan_key, sql, params = lookup_plan("최근 거래 3건 보여줘", "fp")
+    return {
+        "question": "최근 거래 3건 보여줘", "user_id": 1, "allowed_views": ["current_user_transactions"],
+        "schema_fingerprint": "fp", "plan_key": plan_key, "query": sql, "query_args": params,
+    }
+
+def test_plan_hit_goes_through_validate(sql_agent):
+    assert sql_agent.route_after_plan(_plan_hit_state()) == "validate"
+
+def test_plan_failing_validation_regenerates(sql_agent):
+    state = _plan_hit_state()
+    state.update(sql_agent.node_validate(state))
+
+    assert state["plan_rejected"] and state["plan_key"] is None and state["query_args"] is None
+    assert sql_agent.route_after_validate(state) == "sql_gen"
+    assert lookup_plan("최근 거래 3건 보여줘", "fp") is None
+
+def test_plan_failing_execution_regenerates(sql_agent):
+    state = _plan_hit_state()
+    state.update(sql_agent.node_execute(state))
+
+    assert state["plan_rejected"] and "result" not in state
+    assert sql_agent.route_after_execute(state) == "sql_gen"
+    assert lookup_plan("최근 거래 3건 보여줘", "fp") is None
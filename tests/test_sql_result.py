@@ -0,0 +1,28 @@
+from decimal import Decimal
+
+from rag_agent.sql_result import MAX_RESULT_ROWS, PROMPT_SAMPLE_ROWS, format_rows, summarize_rows
+
+ROWS = [{"category": "식비", "amount": Decimal(1000 + i)} for i in range(MAX_RESULT_ROWS)]
+
+def test_small_result_lists_all_rows():
+    text = format_rows(ROWS[:2])
+    assert text.splitlines() == ["rows: 2", "category,amount", "식비,1000", "식비,1001"]
+
+def test_truncated_result_uses_database_total():
+    summary = {"row_count": 1234, "columns": {"amount": {"sum": 99, "min": 1, "max": 50}}}
+    lines = format_rows(ROWS, summary, truncated=True).splitlines()
+    assert lines[0] == f"rows: 1234 (showing first {PROMPT_SAMPLE_ROWS})"
+    assert lines[1] == "summary amount: sum=99, min=1, max=50"
+
+def test_truncated_result_without_total_is_not_reported_as_total():
+    summary = dict(summarize_rows(ROWS), row_count=None)
+    lines = format_rows(ROWS, summary, truncated=True).splitlines()
+    assert lines[0].startswith(f"rows: more than {MAX_RESULT_ROWS} (truncated at {MAX_RESULT_ROWS}, total unknown")
+    assert lines[1].startswith(f"summary of first {MAX_RESULT_ROWS} rows amount:")
+    assert f"rows: {MAX_RESULT_ROWS}" not in lines[0]
+
+def test_untruncated_large_result_summarizes_fetched_rows():
+    rows = ROWS[:80]
+    lines = format_rows(rows, summarize_rows(rows)).splitlines()
+    assert lines[0] == f"rows: 80 (showing first {PROMPT_SAMPLE_ROWS})"
+    assert len(lines) == 2 + 1 + PROMPT_SAMPLE_ROWS
@@ -0,0 +1,48 @@
+import pytest
+
+from rag_agent.sql_validator import SQLValidationError, validate_sql
+
+VIEWS = ["current_user_profile", "current_user_accounts", "current_user_transactions"]
+
+@pytest.mark.parametrize("query", [
+    "SELECT balance FROM current_user_accounts",
+    "SELECT * FROM (current_user_profile)",
+    "SELECT * FROM (SELECT * FROM current_user_transactions) t",
+    "SELECT * FROM ((SELECT 1 FROM current_user_profile)) t",
+    "SELECT * FROM current_user_profile p JOIN (current_user_accounts a) ON 1=1",
+    "WITH recent AS (SELECT * FROM current_user_transactions) SELECT * FROM (recent)",
+    "SELECT * FROM current_user_transactions WHERE amount IN (1, 2) "
+    "AND account_id IN (SELECT account_id FROM current_user_accounts)",
+    "SELECT REPLACE(username, 'a', 'b') FROM current_user_profile;",
+    # 따옴표 없는 한글 별칭/식별자
+    "SELECT SUM(amount) AS 총지출 FROM current_user_transactions WHERE amount < 0",
+    "SELECT category AS 분류, COUNT(*) AS 건수 FROM current_user_transactions GROUP BY 분류 ORDER BY 건수 DESC",
+    "SELECT 거래.amount FROM current_user_transactions 거래",
+    "WITH 지출 AS (SELECT amount FROM current_user_transactions) SELECT SUM(amount) FROM 지출",
+])
+def test_allowed(query):
+    validate_sql(query, VIEWS)
+
+@pytest.mark.parametrize("query", [
+    "SELECT * FROM members",
+    # 괄호로 감싼 테이블 참조
+    "SELECT * FROM (members)",
+    "SELECT * FROM ((members))",
+    "SELECT * FROM current_user_profile p JOIN (members m) ON 1=1",
+    "SELECT * FROM 회원",
+    "SELECT * FROM current_user_profile 프로필, members",
+    "SELECT pin_code FROM current_user_profile, (members)",
+    "SELECT * FROM (current_user_profile JOIN members ON 1=1)",
+    "SELECT * FROM (current_user_profile p, members)",
+    # 서브쿼리/CTE 안의 참조
+    "SELECT * FROM (SELECT * FROM members) t",
+    "WITH m AS (SELECT * FROM members) SELECT * FROM m",
+    # 쓰기/다중 문장/변수
+    "DELETE FROM current_user_accounts",
+    "SELECT 1; DROP TABLE members",
+    "SELECT @@version",
+    "SELECT SLEEP(10)",
+])
+def test_rejected(query):
+    with pytest.raises(SQLValidationError):
+        validate_sql(query, VIEWS)
@@ -0,0 +1,181 @@
+import os
+import time
+import threading
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+pymysql = pytest.importorskip("pymysql")
+
+from benchmarks.stress_transfer import check_invariants, run_stress
+from utils import transfer_executor
+from utils.transfer_executor import (
+    BALANCE_SQL, BUMP_VERSION_SQL, CLAIM_SQL, DEBIT_SQL, LEDGER_SQL, RECORD_SQL,
+    execute_batch_transfer, execute_transfer,
+)
+
+ACCOUNT_ID = 1
+CONTACT_ID = 7
+
+# ---------------------------------------------------------
+# DB 대역: 계좌 행 잠금 + 트랜잭션 롤백 + 멱등성 키 잠금만 흉내
+# - DEBIT_SQL 에서 계좌 행 잠금을 잡고 커밋/롤백까지 유지 (InnoDB 행 잠금처럼)
+# - 변경은 트랜잭션 안에만 쌓였다가 커밋 시 반영
+# - CLAIM_SQL 은 같은 키의 트랜잭션이 끝날 때까지 대기 -> 커밋됐으면 1062, 롤백됐으면 성공
+# ---------------------------------------------------------
+class FakeBank:
+    def __init__(self, balance):
+        self.balance = balance
+        self.ledger = []
+        self.requests = {}
+        self.row_lock = threading.Lock()
+        self.key_locks = {}
+        self.meta_lock = threading.Lock()
+
+    def key_lock(self, key):
+        with self.meta_lock:
+            return self.key_locks.setdefault(key, threading.Lock())
+
+class FakeTx:
+    def __init__(self, bank):
+        self.bank = bank
+        self.balance = None      # 행 잠금을 잡은 뒤의 트랜잭션 내 잔액
+        self.ledger = []
+        self.requests = {}
+        self.held = []
+        self.lastrowid = None
+
+    def execute(self, sql, args=()):
+        bank = self.bank
+        if sql == CLAIM_SQL:
+            key, account_id = args
+            lock = bank.key_lock(key)
+            lock.acquire()
+            self.held.append(lock)
+            with bank.meta_lock:
+                exists = key in bank.requests
+            if exists:
+                raise pymysql.err.IntegrityError(1062, f"Duplicate entry '{key}'")
+            self.requests[key] = {"status": "PENDING", "reason": None, "balance_after": None, "ledger_id": None}
+            return 1
+        if sql == DEBIT_SQL:
+            amount, account_id, minimum = args
+            if account_id != ACCOUNT_ID:
+                return 0
+            if self.balance is None:
+                bank.row_lock.acquire()
+                self.held.append(bank.row_lock)
+                self.balance = bank.balance
+            # 다른 스레드가 끼어들 틈을 만들어 갱신 손실이 있으면 드러나게
+            time.sleep(0.0005)
+            if self.balance < minimum:
+                return 0
+            self.balance = round(self.balance - amount, 2)
+            return 1
+        if sql == LEDGER_SQL:
+            with bank.meta_lock:
+                self.lastrowid = len(bank.ledger) + len(self.ledger) + 1
+            self.ledger.append({"account_id": args[0], "amount": args[2], "balance_after": args[3]})
+            return 1
+        if sql == RECORD_SQL:
+            status, reason, balance_after, ledger_id, key = args
+            self.requests[key] = {"status": status, "reason": reason, "balance_after": balance_after, "ledger_id": ledger_id}
+            return 1
+        if sql == BUMP_VERSION_SQL:
+            return 1
+        raise AssertionError(f"unexpected SQL: {sql}")
+
+    def fetch_one(self, sql, args=()):
+        assert sql == BALANCE_SQL
+        if args[0] != ACCOUNT_ID:
+            return None
+        return {"balance": self.balance if self.balance is not None else self.bank.balance}
+
+    def finish(self, commit):
+        bank = self.bank
+        if commit:
+            with bank.meta_lock:
+                if self.balance is not None:
+                    bank.balance = self.balance
+                bank.ledger.extend(self.ledger)
+                bank.requests.update(self.requests)
+        for lock in reversed(self.held):
+            lock.release()
+
+@pytest.fixture
+def bank(monkeypatch):
+    bank = FakeBank(150_000.0)
+
+    @contextmanager
+    def fake_transaction():
+        tx = FakeTx(bank)
+        try:
+            yield tx
+        except Exception:
+            tx.finish(commit=False)
+            raise
+        tx.finish(commit=True)
+
+    def fake_get_data(query, params=None):
+        row = bank.requests.get(params[0])
+        return [row] if row else []
+
+    monkeypatch.setattr(transfer_executor, "transaction", fake_transaction)
+    monkeypatch.setattr(transfer_executor, "get_data", fake_get_data)
+    monkeypatch.setattr(transfer_executor, "invalidate_account", lambda account_id: None)
+    monkeypatch.setattr(transfer_executor, "_tables_checked", True)
+    return bank
+
+def _run_concurrently(fn, count, workers=16):
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(fn, range(count)))
+
+def test_concurrent_transfers_keep_invariants(bank):
+    amount = 1000.0
+    results = _run_concurrently(
+        lambda _: execute_transfer(ACCOUNT_ID, CONTACT_ID, amount, 1.0, amount, "KRW"), 200,
+    )
+    successes = sum(1 for r in results if r["ok"])
+
+    assert successes == 150
+    assert {r["reason"] for r in results if not r["ok"]} == {"INSUFFICIENT_FUNDS"}
+    assert bank.balance == 0
+    assert check_invariants(150_000.0, bank.balance, amount, successes, bank.ledger) == []
+
+def test_concurrent_batch_transfers_keep_invariants(bank):
+    items = [
+        {"contact_id": CONTACT_ID, "amount_krw": 1500, "exchange_rate": 1.0, "amount": 1500, "currency": "KRW"},
+        {"contact_id": CONTACT_ID + 1, "amount_krw": 2500, "exchange_rate": 1.0, "amount": 2500, "currency": "KRW"},
+    ]
+    results = _run_concurrently(lambda _: execute_batch_transfer(ACCOUNT_ID, items), 60)
+    successes = sum(1 for r in results if r["ok"])
+
+    # 4,000원씩 37건 성공 -> 2,000원 남고 나머지는 잔액 부족 (일부만 나간 묶음 없음)
+    assert successes == 37
+    assert bank.balance == 2000
+    assert len(bank.ledger) == successes * len(items)
+    assert check_invariants(150_000.0, bank.balance, 4000, successes, bank.ledger[1::2]) == []
+    assert all(row["balance_after"] >= 0 for row in bank.ledger)
+
+def test_same_key_debits_once(bank):
+    results = _run_concurrently(
+        lambda _: execute_transfer(ACCOUNT_ID, CONTACT_ID, 5000, 1.0, 5000, "KRW", idempotency_key="dup-key"), 20,
+    )
+
+    assert all(r["ok"] for r in results)
+    assert sum(1 for r in results if not r["replayed"]) == 1
+    assert {r["balance_after"] for r in results} == {145_000.0}
+    assert bank.balance == 145_000.0
+    assert len(bank.ledger) == 1
+
+@pytest.mark.skipif(
+    not (os.getenv("STRESS_ACCOUNT_ID") and os.getenv("STRESS_CONTACT_ID")),
+    reason="STRESS_ACCOUNT_ID / STRESS_CONTACT_ID 가 설정된 로컬 DB에서만 실행",
+)
+def test_stress_against_database():
+    result = run_stress(int(os.environ["STRESS_ACCOUNT_ID"]), int(os.environ["STRESS_CONTACT_ID"]),
+                        workers=16, transfers=200, amount=1000.0)
+
+    assert result["violations"] == []
+    assert result["end_balance"] >= 0
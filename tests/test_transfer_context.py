@@ -0,0 +1,68 @@
+import pytest
+
+from rag_agent.transfer_context import (
+    CONFIRM, DONE, NEED_INFO, PASSWORD, START, SCHEMA_VERSION, InvalidTransition, TransferContext, serialize_context,
+)
+
+def _confirming_context():
+    ctx = TransferContext(target="엄마", amount=100, currency="USD", amount_krw=142000.0,
+                          exchange_rate=1420.0, rate_date="2026-10-19", source_language="ko")
+    return ctx.await_confirm("엄마에게 100 USD를 보낼까요?", "key-1")
+
+def _fields(ctx):
+    return [ctx.state] + [getattr(ctx, name) for name in TransferContext._FIELDS]
+
+def test_json_round_trip():
+    ctx = _confirming_context()
+    restored = TransferContext.loads(ctx.dumps())
+    assert _fields(restored) == _fields(ctx)
+    assert "엄마" in ctx.dumps()
+
+def test_binary_round_trip():
+    ctx = _confirming_context().await_password()
+    ctx.password_attempts = 2
+    restored = TransferContext.from_bytes(ctx.to_bytes())
+    assert restored.state == PASSWORD
+    assert _fields(restored) == _fields(ctx)
+
+def test_batch_round_trip():
+    batch = {"items": [{"contact_id": 1, "contact_name": "엄마", "amount_krw": 50000.0}], "total_krw": 50000.0}
+    ctx = TransferContext(batch=batch).await_confirm("총 1건", "key-2")
+    restored = TransferContext.load(serialize_context(ctx))
+    assert restored.is_batch and restored.batch == batch
+
+@pytest.mark.parametrize("value", [None, "", {}])
+def test_empty_value_starts_new_flow(value):
+    assert TransferContext.load(value).state == START
+
+def test_done_context_is_not_stored():
+    assert serialize_context(_confirming_context().finish()) is None
+    assert serialize_context(None) is None
+
+@pytest.mark.parametrize("value", [
+    "not json",
+    "[]",
+    f"[{SCHEMA_VERSION + 1}, 0]",
+    f"[{SCHEMA_VERSION}, 99] ",
+    f"[{SCHEMA_VERSION}, 0, null]",
+    b"XX123",
+    b"TCnot-zlib",
+    42,
+])
+def test_corrupt_state_is_rejected(value):
+    with pytest.raises(InvalidTransition):
+        TransferContext.load(value)
+
+def test_transitions():
+    ctx = TransferContext().need_info("amount")
+    assert ctx.state == NEED_INFO and ctx.missing_field == "amount"
+    ctx.await_confirm("확인", "key-3")
+    assert ctx.state == CONFIRM and ctx.missing_field is None
+    with pytest.raises(InvalidTransition):
+        ctx.need_info("target")
+    ctx.finish()
+    assert ctx.state == DONE and not ctx.can(START)
+
+def test_unknown_field_is_rejected():
+    with pytest.raises(TypeError):
+        TransferContext(nickname="엄마")
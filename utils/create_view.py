@@ -1,64 +1,135 @@
-from utils.handle_sql import get_data, execute_query
+import re
 
+from utils.handle_sql import get_data
+
+# ---------------------------------------------------------
+# 사용자 전용 뷰 (DDL 없는 쿼리 재작성 방식)
+# - 예전에는 로그인마다 CREATE OR REPLACE VIEW 로 전역 뷰를 재정의했으나
+#   DDL 메타데이터 락 + 동시 로그인 시 다른 사용자로 바뀌는 문제가 있었음
+# - 이제 SQL 에이전트 쿼리 앞에 같은 이름의 CTE를 붙여 사용자 필터를 주입합니다.
+#   (CTE가 같은 이름의 실제 테이블/뷰보다 우선하므로 쿼리 본문은 그대로 사용)
+# - columns: (뷰 컬럼, 원본 테이블, 원본 컬럼) -> 스키마 카탈로그에서 타입 조회에 사용
+# ---------------------------------------------------------
+USER_VIEWS = {
+    # 1️⃣ 사용자 기본 정보
+    "current_user_profile": {
+        "sql": """
+            SELECT user_id, username, korean_name
+            FROM members
+            WHERE user_id = %s
+        """,
+        "columns": [
+            ("user_id", "members", "user_id"),
+            ("username", "members", "username"),
+            ("korean_name", "members", "korean_name"),
+        ],
+    },
+    # 2️⃣ 사용자 계좌 정보
+    "current_user_accounts": {
+        "sql": """
+            SELECT account_id, balance, is_primary
+            FROM accounts
+            WHERE user_id = %s
+        """,
+        "columns": [
+            ("account_id", "accounts", "account_id"),
+            ("balance", "accounts", "balance"),
+            ("is_primary", "accounts", "is_primary"),
+        ],
+    },
+    # 3️⃣ 사용자 거래 내역
+    "current_user_transactions": {
+        "sql": """
+            SELECT t.transaction_id,
+                   t.account_id,
+                   t.transaction_type,
+                   t.amount,
+                   t.balance_after,
+                   t.description,
+                   t.category,
+                   t.created_at
+            FROM ledger t
+            JOIN accounts a ON t.account_id = a.account_id
+            WHERE a.user_id = %s
+        """,
+        "columns": [
+            ("transaction_id", "ledger", "transaction_id"),
+            ("account_id", "ledger", "account_id"),
+            ("transaction_type", "ledger", "transaction_type"),
+            ("amount", "ledger", "amount"),
+            ("balance_after", "ledger", "balance_after"),
+            ("description", "ledger", "description"),
+            ("category", "ledger", "category"),
+            ("created_at", "ledger", "created_at"),
+        ],
+    },
+}
+
+_LEADING_WITH_RE = re.compile(r"^\s*with(\s+recursive)?\s+", re.I)
+
+_user_ids = {}
 
 def get_user_id(username: str) -> int:
-    query = f"""
+    # username -> user_id 는 바뀌지 않으므로 프로세스 내에서 재사용
+    if username in _user_ids:
+        return _user_ids[username]
+
+    query = """
         SELECT user_id
         FROM members
-        WHERE username = '{username}'
+        WHERE username = %s
     """
-    result = get_data(query)
+    result = get_data(query, (username,))
 
     if not result:
         raise ValueError("사용자를 찾을 수 없습니다.")
 
-    return result[0]["user_id"]
+    _user_ids[username] = result[0]["user_id"]
+    return _user_ids[username]
 
 
-def create_user_views(username: str):
+def get_user_views():
     """
-    로그인한 사용자의 전용 View들 생성
+    로그인한 사용자가 SQL 에이전트에서 조회할 수 있는 뷰 이름 목록
+    (DDL 없음: 실제 사용자 필터는 scope_query 가 실행 시점에 주입)
     """
-    user_id = get_user_id(username)
+    return list(USER_VIEWS)
 
-    # 1️⃣ 사용자 기본 정보
-    profile_view_sql = f"""
-        CREATE OR REPLACE VIEW current_user_profile AS
-        SELECT user_id, username, korean_name
-        FROM members
-        WHERE user_id = {user_id}
-    """
 
-    # 2️⃣ 사용자 계좌 정보
-    accounts_view_sql = f"""
-        CREATE OR REPLACE VIEW current_user_accounts AS
-        SELECT account_id, balance, is_primary
-        FROM accounts
-        WHERE user_id = {user_id}
-    """
+def referenced_views(query: str) -> list:
+    """쿼리에서 사용하는 사용자 뷰 이름 목록"""
+    return [
+        name for name in USER_VIEWS
+        if re.search(rf"(?<![\w`]){name}(?![\w`])|`{name}`", query, re.I)
+    ]
 
-    # 3️⃣ 사용자 거래 내역
-    transactions_view_sql = f"""
-        CREATE OR REPLACE VIEW current_user_transactions AS
-        SELECT t.transaction_id,
-               t.account_id,
-               t.transaction_type,
-               t.amount,
-               t.balance_after,
-               t.description,
-               t.category,
-               t.created_at
-        FROM ledger t
-        JOIN accounts a ON t.account_id = a.account_id
-        WHERE a.user_id = {user_id}
+
+def scope_query(query: str, user_id, args=None):
+    """
+    쿼리가 참조하는 사용자 뷰를 user_id로 필터링된 CTE로 정의해 앞에 붙입니다.
+    반환: (재작성된 SQL, 파라미터 tuple)
+    - CTE 파라미터가 SQL 앞쪽에 오므로 파라미터도 앞에 붙임
+    - 원래 파라미터가 없던 쿼리는 '%' 리터럴(DATE_FORMAT 등)을 이스케이프
     """
+    if user_id is None:
+        raise ValueError("사용자 정보를 확인할 수 없어 조회 범위를 지정할 수 없습니다.")
+    views = referenced_views(query)
+    if not views:
+        return query, args
 
-    execute_query(profile_view_sql)
-    execute_query(accounts_view_sql)
-    execute_query(transactions_view_sql)
+    body = query.strip()
+    if args is None:
+        body = body.replace("%", "%%")
+        args = ()
 
-    return [
-        "current_user_profile",
-        "current_user_accounts",
-        "current_user_transactions"
-    ]
+    ctes = ",\n".join(
+        f"{name} AS ({USER_VIEWS[name]['sql'].strip()})" for name in views
+    )
+    params = tuple([user_id] * len(views)) + tuple(args)
+
+    # 쿼리 자체가 WITH 로 시작하면 하나의 WITH 절로 합침
+    match = _LEADING_WITH_RE.match(body)
+    if match:
+        keyword = "WITH RECURSIVE" if match.group(1) else "WITH"
+        return f"{keyword} {ctes},\n{body[match.end():]}", params
+    return f"WITH {ctes}\n{body}", params
@@ -1,54 +1,363 @@
 import pymysql
 import os
+import re
+import time
+import threading
+import contextvars
+from contextlib import contextmanager
 from dotenv import load_dotenv
 
+from utils.sql_metrics import StatementTimer
+
 load_dotenv()
 
+# ---------------------------------------------------------
+# [설정] 읽기 복제본(Replica) 라우팅
+# - DB_REPLICAS: "host:port,host:port" (계정/DB명은 primary와 동일)
+#   로컬 테스트는 같은 MySQL을 포트만 달리 띄운 여러 인스턴스로도 충분합니다.
+#   (복제 상태가 없는 인스턴스는 지연 0으로 간주)
+# - DB_REPLICA_MAX_LAG: 허용 복제 지연(초). 초과한 복제본은 제외
+# - DB_REPLICA_LAG_CHECK_INTERVAL: 복제 지연 재확인 주기(초). 확인은 백그라운드 스레드에서 하고 요청은 기다리지 않음
+# ---------------------------------------------------------
+REPLICA_MAX_LAG = float(os.getenv('DB_REPLICA_MAX_LAG', 5))
+REPLICA_LAG_CHECK_INTERVAL = float(os.getenv('DB_REPLICA_LAG_CHECK_INTERVAL', 10))
+
+_READ_ONLY_RE = re.compile(r"^\s*\(*\s*(select|with|show|describe|desc|explain)\b", re.I)
+_LOCKING_READ_RE = re.compile(r"\bfor\s+update\b|\bfor\s+share\b|\block\s+in\s+share\s+mode\b|\binto\s+(outfile|dumpfile|@)", re.I)
+
+# 송금 플로우처럼 primary에 고정해야 하는 구간
+_pin_primary = contextvars.ContextVar("db_pin_primary", default=False)
+# 마지막 쓰기 시각 (read-your-writes)
+# - Streamlit 은 재실행(rerun)마다 새 컨텍스트에서 스크립트를 돌리므로 컨텍스트 변수만으로는 이어지지 않음
+#   -> bind_session(세션 키)로 묶은 요청은 세션별 dict 에 기록해 다음 재실행에서도 확인
+# - 세션에 묶이지 않은 호출(스크립트/스케줄러)은 컨텍스트 변수 사용
+_session_key = contextvars.ContextVar("db_session_key", default=None)
+_last_write_at = contextvars.ContextVar("db_last_write_at", default=None)
+_session_writes = {}     # 세션 키 -> 마지막 쓰기 시각
+_session_lock = threading.Lock()
+MAX_TRACKED_SESSIONS = 4096
+
+class _Replica:
+    def __init__(self, host, port):
+        self.host = host
+        self.port = port
+        self.name = f"replica:{host}:{port}"
+        self.outstanding = 0
+        self.lag = None
+        self.lag_checked_at = 0.0
+        self.healthy = True
+        self.refreshing = False
+
+def _parse_replicas(raw):
+    replicas = []
+    for item in (raw or "").split(","):
+        item = item.strip()
+        if not item:
+            continue
+        host, _, port = item.partition(":")
+        replicas.append(_Replica(host, int(port or os.getenv('DB_PORT', 3306))))
+    return replicas
+
+_replicas = _parse_replicas(os.getenv('DB_REPLICAS'))
+_replica_lock = threading.Lock()
+
+# 접속 자체의 장애로 보는 MySQL 클라이언트 오류 코드
+# (2002/2003: 접속 불가, 2006: server has gone away, 2013: 쿼리 중 연결 끊김, 2055: 읽기 중 연결 끊김)
+CONNECTION_ERROR_CODES = {2002, 2003, 2006, 2013, 2055}
+
+def is_connection_error(e) -> bool:
+    """쿼리 문제가 아니라 DB 접속/연결 장애로 인한 예외인지"""
+    if isinstance(e, pymysql.err.InterfaceError):
+        return True
+    return isinstance(e, pymysql.err.OperationalError) and bool(e.args) and e.args[0] in CONNECTION_ERROR_CODES
+
 # DB 연결 정보를 가져오는 내부 함수 (DRY 원칙)
-def _get_connection():
+def _get_connection(host=None, port=None):
     return pymysql.connect(
-        host=os.getenv('DB_HOST'),
+        host=host or os.getenv('DB_HOST'),
         user=os.getenv('DB_USER'),
         password=os.getenv('DB_PASSWORD'),
         db=os.getenv('DB_NAME'),
-        port=int(os.getenv('DB_PORT', 3306)),
+        port=port or int(os.getenv('DB_PORT', 3306)),
         charset='utf8mb4'
     )
 
-def get_data(query, args=None):
-    """SELECT 전용: 결과를 반환함"""
-    conn = _get_connection()
+# ---------------------------------------------------------
+# 읽기/쓰기 분리
+# ---------------------------------------------------------
+def is_read_only(query):
+    """SELECT/SHOW/DESCRIBE/EXPLAIN 이면서 잠금 읽기가 아닌 경우만 읽기 전용으로 판단"""
+    return bool(_READ_ONLY_RE.match(query or "")) and not _LOCKING_READ_RE.search(query)
+
+@contextmanager
+def use_primary():
+    """블록 안의 모든 조회를 primary로 고정 (송금 플로우 등 read-your-writes 구간)"""
+    token = _pin_primary.set(True)
+    try:
+        yield
+    finally:
+        _pin_primary.reset(token)
+
+def bind_session(session_key):
+    """
+    현재 실행 컨텍스트를 사용자 세션에 묶음 (Streamlit 재실행마다 스크립트 처음에 호출)
+    -> 같은 세션의 직전 쓰기를 재실행 후에도 알고 복제본 대신 primary에서 읽음
+    """
+    _session_key.set(session_key)
+
+def _mark_write():
+    now = time.monotonic()
+    key = _session_key.get()
+    if key is None:
+        _last_write_at.set(now)
+        return
+    with _session_lock:
+        _session_writes[key] = now
+        if len(_session_writes) > MAX_TRACKED_SESSIONS:
+            # 허용 지연이 지난 기록은 더 이상 라우팅에 영향이 없으므로 정리
+            for stale in [k for k, t in _session_writes.items() if now - t >= REPLICA_MAX_LAG]:
+                del _session_writes[stale]
+
+def _last_write():
+    key = _session_key.get()
+    if key is None:
+        return _last_write_at.get()
+    with _session_lock:
+        return _session_writes.get(key)
+
+def _refresh_lag(replica):
+    """
+    복제 지연(초)을 갱신 (백그라운드 스레드에서 실행). 복제 상태가 없는 인스턴스(로컬 대역)는 0으로 간주
+    접속 장애만 unhealthy 로 표시하고, 권한 부족 등 다른 오류는 지연을 모르는 상태(None)로 둠
+    """
+    try:
+        conn = _get_connection(replica.host, replica.port)
+        try:
+            with conn.cursor(pymysql.cursors.DictCursor) as cursor:
+                try:
+                    cursor.execute("SHOW REPLICA STATUS")
+                    status = cursor.fetchone()
+                    lag_key = "Seconds_Behind_Source"
+                except pymysql.err.ProgrammingError:
+                    cursor.execute("SHOW SLAVE STATUS")
+                    status = cursor.fetchone()
+                    lag_key = "Seconds_Behind_Master"
+        finally:
+            conn.close()
+        if not status:
+            lag = 0.0
+        else:
+            lag = status.get(lag_key)
+            # NULL이면 복제가 멈춘 상태
+            lag = float(lag) if lag is not None else float("inf")
+        with _replica_lock:
+            replica.lag = lag
+            replica.healthy = True
+    except Exception as e:
+        print(f"⚠️ [DB] {replica.name} 상태 확인 실패: {e}")
+        with _replica_lock:
+            if is_connection_error(e):
+                replica.healthy = False
+            else:
+                replica.lag = None
+    finally:
+        with _replica_lock:
+            replica.refreshing = False
+
+def _schedule_lag_refresh():
+    """확인 주기가 지난 복제본의 지연 확인을 백그라운드로 시작 (복제본당 동시에 하나만)"""
+    now = time.monotonic()
+    due = []
+    with _replica_lock:
+        for replica in _replicas:
+            if not replica.refreshing and now - replica.lag_checked_at >= REPLICA_LAG_CHECK_INTERVAL:
+                replica.refreshing = True
+                replica.lag_checked_at = now
+                due.append(replica)
+    for replica in due:
+        threading.Thread(target=_refresh_lag, args=(replica,), name=f"lag-{replica.name}", daemon=True).start()
+
+def _pick_replica():
+    """허용 지연 이내 복제본 중 처리 중인 요청이 가장 적은 곳을 선택 (지연 확인은 기다리지 않음)"""
+    _schedule_lag_refresh()
+
+    with _replica_lock:
+        candidates = [
+            r for r in _replicas
+            if r.healthy and r.lag is not None and r.lag <= REPLICA_MAX_LAG
+        ]
+        if not candidates:
+            return None
+        replica = min(candidates, key=lambda r: r.outstanding)
+        replica.outstanding += 1
+        return replica
+
+def _release_replica(replica):
+    with _replica_lock:
+        replica.outstanding -= 1
+
+def _route_read(query):
+    """읽기 쿼리를 보낼 복제본을 결정. None이면 primary"""
+    if not _replicas or _pin_primary.get() or not is_read_only(query):
+        return None
+    # 직전 쓰기가 허용 지연 안쪽이면 복제본에 아직 반영되지 않았을 수 있음
+    last_write = _last_write()
+    if last_write is not None and time.monotonic() - last_write < REPLICA_MAX_LAG:
+        return None
+    return _pick_replica()
+
+def get_replica_status():
+    """복제본별 라우팅 상태 (모니터링용)"""
+    with _replica_lock:
+        return [
+            {"name": r.name, "outstanding": r.outstanding, "lag": r.lag, "healthy": r.healthy}
+            for r in _replicas
+        ]
+
+# ---------------------------------------------------------
+# 쿼리 실행 함수
+# ---------------------------------------------------------
+def _fetch_all(query, args, replica=None):
+    timer = StatementTimer(query, target=replica.name if replica else "primary")
+    conn = _get_connection(replica.host, replica.port) if replica else _get_connection()
+    timer.connected()
+    rows, error = None, None
     try:
         with conn.cursor(pymysql.cursors.DictCursor) as cursor:
             cursor.execute(query, args)
-            return cursor.fetchall()
+            timer.executed()
+            rows = cursor.fetchall()
+            return rows
+    except Exception as e:
+        error = e
+        raise e
     finally:
         conn.close()
+        timer.finish(len(rows) if rows else 0, error)
+
+def get_data(query, args=None):
+    """SELECT 전용: 결과를 반환함 (읽기 전용 쿼리는 복제본으로 라우팅)"""
+    replica = _route_read(query)
+    if replica is None:
+        return _fetch_all(query, args)
+    try:
+        return _fetch_all(query, args, replica)
+    except (pymysql.err.OperationalError, pymysql.err.InterfaceError) as e:
+        if not is_connection_error(e):
+            # 잠금 대기/실행 시간 초과 같은 쿼리 단위 오류는 복제본 상태와 무관
+            raise
+        # 접속 장애: 다음 상태 확인 전까지 제외하고 primary로 재시도
+        print(f"⚠️ [DB] {replica.name} 조회 실패, primary로 전환: {e}")
+        with _replica_lock:
+            replica.healthy = False
+        return _fetch_all(query, args)
+    finally:
+        _release_replica(replica)
 
 def execute_query(query, args=None):
     """INSERT, UPDATE, DELETE 전용 (단건): 커밋을 수행함"""
+    timer = StatementTimer(query)
     conn = _get_connection()
+    timer.connected()
+    rowcount, error = 0, None
     try:
         with conn.cursor() as cursor:
             cursor.execute(query, args)
+            timer.executed()
             conn.commit()
-            return cursor.rowcount # 영향받은 행의 개수 반환
+            rowcount = cursor.rowcount
+            return rowcount # 영향받은 행의 개수 반환
     except Exception as e:
+        error = e
         conn.rollback()
         raise e
     finally:
         conn.close()
+        _mark_write()
+        timer.finish(rowcount, error)
 
 def execute_many(query, args_list):
     """대량 INSERT 전용: 리스트 데이터를 한 번에 넣음"""
+    timer = StatementTimer(query)
     conn = _get_connection()
+    timer.connected()
+    rowcount, error = 0, None
     try:
         with conn.cursor() as cursor:
             cursor.executemany(query, args_list)
+            timer.executed()
             conn.commit()
-            return cursor.rowcount
+            rowcount = cursor.rowcount
+            return rowcount
     except Exception as e:
+        error = e
         conn.rollback()
         raise e
     finally:
-        conn.close()
\ No newline at end of file
+        conn.close()
+        _mark_write()
+        timer.finish(rowcount, error)
+
+# ---------------------------------------------------------
+# 트랜잭션 (여러 문장을 하나의 커밋으로)
+# - 블록이 정상 종료되면 커밋, 예외가 나면 롤백
+# - 문장별 실행 시간은 다른 쿼리와 동일하게 sql_metrics에 기록
+# ---------------------------------------------------------
+class Transaction:
+    def __init__(self, conn):
+        self.conn = conn
+        self.lastrowid = None
+
+    def _run(self, query, args, fetch):
+        timer = StatementTimer(query)
+        timer.connected()
+        rows, rowcount, error = None, 0, None
+        try:
+            with self.conn.cursor(pymysql.cursors.DictCursor) as cursor:
+                cursor.execute(query, args)
+                timer.executed()
+                rowcount = cursor.rowcount
+                self.lastrowid = cursor.lastrowid
+                if fetch:
+                    rows = cursor.fetchall()
+                    rowcount = len(rows)
+            return rows if fetch else rowcount
+        except Exception as e:
+            error = e
+            raise e
+        finally:
+            timer.finish(rowcount, error)
+
+    def execute(self, query, args=None):
+        """쓰기 문장 실행: 영향받은 행 수 반환 (커밋은 블록 종료 시)"""
+        return self._run(query, args, fetch=False)
+
+    def fetch_all(self, query, args=None):
+        return self._run(query, args, fetch=True)
+
+    def fetch_one(self, query, args=None):
+        rows = self._run(query, args, fetch=True)
+        return rows[0] if rows else None
+
+@contextmanager
+def transaction():
+    """
+    사용 예)
+        with transaction() as tx:
+            tx.execute("UPDATE ...", (...))
+            tx.execute("INSERT ...", (...))
+    """
+    conn = _get_connection()
+    try:
+        yield Transaction(conn)
+        conn.commit()
+    except Exception:
+        try:
+            conn.rollback()
+        except pymysql.err.Error:
+            # 연결이 이미 끊긴 경우: 서버가 트랜잭션을 롤백하므로 원래 오류를 그대로 전달
+            pass
+        raise
+    finally:
+        conn.close()
+        _mark_write()
@@ -1,8 +1,14 @@
 import pymysql
 import os
+import sys
 import bcrypt
 from dotenv import load_dotenv
 
+# 스크립트로 직접 실행해도 utils 패키지를 찾을 수 있도록 프로젝트 루트 추가
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if project_root not in sys.path:
+    sys.path.append(project_root)
+
 # .env 파일 로드
 load_dotenv()
 
@@ -105,5 +111,32 @@ def init_database():
     finally:
         conn.close()
 
+def init_transfer_tables():
+    """송금 멱등성 기록 / 예약 송금 / 계좌 버전(조회 캐시 무효화) / 환율 버전 테이블 생성 (기존 데이터 유지)"""
+    from utils.transfer_executor import TRANSFER_REQUESTS_DDL
+    from utils.result_cache import ACCOUNT_VERSIONS_DDL
+    from utils.rate_cache import RATE_VERSION_DDL
+    from rag_agent.transfer_scheduler import SCHEDULED_TRANSFERS_DDL
+
+    conn = get_connection()
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute(TRANSFER_REQUESTS_DDL)
+            cursor.execute(SCHEDULED_TRANSFERS_DDL)
+            cursor.execute(ACCOUNT_VERSIONS_DDL)
+            cursor.execute(RATE_VERSION_DDL)
+        conn.commit()
+        print("✅ transfer_requests / scheduled_transfers / account_versions / exchange_rate_version 테이블 준비 완료")
+    except Exception as e:
+        conn.rollback()
+        print(f"❌ 오류 발생: {e}")
+    finally:
+        conn.close()
+
 if __name__ == "__main__":
-    init_database()
\ No newline at end of file
+    # --migrate: 기존 데이터는 그대로 두고 송금 관련 테이블만 추가 (운영 중인 DB 업그레이드용)
+    if "--migrate" in sys.argv[1:]:
+        init_transfer_tables()
+    else:
+        init_database()
+        init_transfer_tables()
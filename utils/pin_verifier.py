@@ -0,0 +1,155 @@
+import os
+import time
+import threading
+import multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeout
+from concurrent.futures.process import BrokenProcessPool
+
+import bcrypt
+
+# ---------------------------------------------------------
+# bcrypt 검증 전용 프로세스 풀
+# - bcrypt.checkpw 는 일부러 느린 연산이라 요청 스레드에서 돌리면 같은 프로세스의 다른 세션이 멈춤
+# - 코어 수만큼의 워커 프로세스에서 검증하고, 대기열 길이를 제한해 폭주 시 즉시 거절
+# - 사용자별 시도 횟수 제한은 해시 연산 전에 검사 (무차별 대입/로그인 폭주 방어)
+#   실패로 기록하는 것은 해시 비교가 실제로 불일치한 경우만 (대기열 초과/시간 초과는 사용자 잘못이 아니므로 제외)
+#   검증 중인 시도도 한도에 포함해 동시에 여러 번 보내 한도를 넘기는 것을 막음
+# - 워커는 spawn 으로 생성 (Streamlit 처럼 스레드가 도는 프로세스를 fork 하면 잠긴 락이 복제될 수 있음)
+# - 시간 초과/워커 장애는 모두 VerificationUnavailable 로 변환 (호출하는 쪽은 재시도 안내만 하면 됨)
+# ---------------------------------------------------------
+VERIFY_WORKERS = int(os.getenv("BCRYPT_WORKERS", os.cpu_count() or 1))
+VERIFY_MAX_PENDING = int(os.getenv("BCRYPT_MAX_PENDING", VERIFY_WORKERS * 4))
+VERIFY_TIMEOUT = float(os.getenv("BCRYPT_TIMEOUT", 10))
+# 사용자별: ATTEMPT_WINDOW 초 동안 최대 MAX_ATTEMPTS 회 실패
+MAX_ATTEMPTS = int(os.getenv("AUTH_MAX_ATTEMPTS", 5))
+ATTEMPT_WINDOW = float(os.getenv("AUTH_ATTEMPT_WINDOW", 60))
+
+class VerificationUnavailable(Exception):
+    """검증을 수행하지 않고 거절한 경우 (사용자에게 잠시 후 재시도 안내)"""
+
+class VerifierBusy(VerificationUnavailable):
+    def __init__(self):
+        super().__init__("인증 요청이 많아 잠시 후 다시 시도해주세요.")
+
+class VerifierTimeout(VerificationUnavailable):
+    def __init__(self):
+        super().__init__("인증 처리가 지연되고 있습니다. 잠시 후 다시 시도해주세요.")
+
+class TooManyAttempts(VerificationUnavailable):
+    def __init__(self, retry_after):
+        super().__init__(f"시도 횟수를 초과했습니다. {int(retry_after) + 1}초 후 다시 시도해주세요.")
+        self.retry_after = retry_after
+
+_pool = None
+_pool_lock = threading.Lock()
+_slots = threading.BoundedSemaphore(VERIFY_MAX_PENDING)
+_attempts = {}   # (kind, user) -> deque[실패 시각]
+_inflight = {}   # (kind, user) -> 검증 중인 시도 수
+_attempts_lock = threading.Lock()
+_stats = {"verified": 0, "rejected_busy": 0, "rejected_throttle": 0, "timeouts": 0, "pool_restarts": 0}
+_mp_context = multiprocessing.get_context("spawn")
+
+def _checkpw(secret: bytes, hashed: bytes) -> bool:
+    # 워커 프로세스에서 실행 (pickle 가능한 최상위 함수)
+    return bcrypt.checkpw(secret, hashed)
+
+def _get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=VERIFY_WORKERS, mp_context=_mp_context)
+        return _pool
+
+def _reset_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+        _stats["pool_restarts"] += 1
+
+def _run_checkpw(secret, hashed) -> bool:
+    future = _get_pool().submit(_checkpw, secret, hashed)
+    try:
+        return future.result(timeout=VERIFY_TIMEOUT)
+    except FutureTimeout:
+        future.cancel()
+        _stats["timeouts"] += 1
+        raise VerifierTimeout()
+
+def _check_throttle(key):
+    """윈도우 안의 실패 + 검증 중인 시도 수를 확인하고 이번 시도를 검증 중으로 등록"""
+    now = time.monotonic()
+    with _attempts_lock:
+        history = _attempts.setdefault(key, deque())
+        while history and now - history[0] >= ATTEMPT_WINDOW:
+            history.popleft()
+        if len(history) + _inflight.get(key, 0) >= MAX_ATTEMPTS:
+            _stats["rejected_throttle"] += 1
+            # 실패 기록 없이 검증 중인 시도만으로 찬 경우는 곧 풀리므로 짧게 안내
+            raise TooManyAttempts(ATTEMPT_WINDOW - (now - history[0]) if history else 1.0)
+        _inflight[key] = _inflight.get(key, 0) + 1
+
+def _finish_attempt(key, failed):
+    """검증 중 등록을 해제하고, 해시 비교가 불일치했으면 실패로 기록"""
+    with _attempts_lock:
+        count = _inflight.get(key, 0) - 1
+        if count > 0:
+            _inflight[key] = count
+        else:
+            _inflight.pop(key, None)
+        if failed:
+            _attempts.setdefault(key, deque()).append(time.monotonic())
+
+def clear_attempts(user_key, kind="password"):
+    with _attempts_lock:
+        _attempts.pop((kind, user_key), None)
+
+def verify_secret(user_key, secret, hashed, kind="password") -> bool:
+    """
+    평문(secret)이 bcrypt 해시(hashed)와 일치하는지 워커 프로세스에서 검증합니다.
+    - kind: "password" / "pin" (시도 제한을 따로 셈)
+    - 시도 제한 초과: TooManyAttempts, 대기열 초과: VerifierBusy (둘 다 해시 연산 없이 거절)
+    - 시간 초과: VerifierTimeout, 재시작한 풀도 죽으면 VerificationUnavailable
+    - 시도 제한에는 해시가 불일치한 경우만 실패로 기록 (서버 사정으로 거절된 요청은 제외)
+    - 성공하면 해당 사용자의 시도 기록을 초기화
+    """
+    if not hashed:
+        return False
+    key = (kind, user_key)
+    _check_throttle(key)
+
+    ok = None
+    try:
+        if not _slots.acquire(blocking=False):
+            _stats["rejected_busy"] += 1
+            raise VerifierBusy()
+        try:
+            secret = secret.encode("utf-8") if isinstance(secret, str) else secret
+            hashed = hashed.encode("utf-8") if isinstance(hashed, str) else hashed
+            try:
+                ok = _run_checkpw(secret, hashed)
+            except BrokenProcessPool:
+                # 워커가 죽은 경우 풀을 새로 만들고 한 번 재시도
+                _reset_pool()
+                try:
+                    ok = _run_checkpw(secret, hashed)
+                except BrokenProcessPool:
+                    _reset_pool()
+                    raise VerificationUnavailable("인증 처리 중 일시적인 오류가 발생했습니다. 잠시 후 다시 시도해주세요.")
+        finally:
+            _slots.release()
+    finally:
+        # 비교 결과가 False 인 경우만 실패 (대기열 초과/시간 초과/워커 장애는 시도로 세지 않음)
+        _finish_attempt(key, failed=ok is False)
+
+    _stats["verified"] += 1
+    if ok:
+        clear_attempts(user_key, kind)
+    return ok
+
+def get_verifier_stats() -> dict:
+    with _attempts_lock:
+        throttled_users = len(_attempts)
+    return dict(_stats, workers=VERIFY_WORKERS, max_pending=VERIFY_MAX_PENDING, tracked_users=throttled_users)
@@ -0,0 +1,164 @@
+import os
+import time
+import threading
+
+import pymysql
+
+from utils.handle_sql import get_data, execute_query
+
+# ---------------------------------------------------------
+# 환율 캐시 (프로세스 내 메모리 테이블)
+# - 전체 통화의 최신 환율을 한 번의 쿼리로 로드해 메모리에서 조회
+# - 갱신 조건: TTL 만료 또는 버전 행 변경 (fetch_rates.py 가 저장 후 bump_rate_version 호출)
+# - 환율은 6시간마다 바뀌므로 버전 확인 주기마다 가벼운 PK 조회 1회만 발생
+# - DB 조회는 락 밖에서 (한 스레드만 갱신을 맡고 나머지는 기존 테이블로 바로 응답)
+#   버전 확인/재로드가 실패해도 캐시된 테이블이 있으면 그대로 사용하고 다음 주기에 다시 시도
+# - 환율 테이블이 비어 있어도 빈 결과를 같은 TTL/버전으로 캐시 (조회마다 DB 재로드 방지)
+# - exchange_rate_version 테이블은 init_db 에서 생성 (`python utils/init_db.py --migrate`)
+# ---------------------------------------------------------
+RATE_CACHE_TTL = float(os.getenv("RATE_CACHE_TTL", 600))
+RATE_VERSION_CHECK_INTERVAL = float(os.getenv("RATE_VERSION_CHECK_INTERVAL", 30))
+
+RATE_VERSION_DDL = """
+CREATE TABLE IF NOT EXISTS exchange_rate_version (
+    id TINYINT PRIMARY KEY,
+    version BIGINT NOT NULL,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+)
+"""
+
+_LOAD_SQL = """
+SELECT r.currency_code, r.currency_name, r.base_rate, r.send_rate, r.get_rate, r.reference_date
+FROM exchange_rates r
+JOIN (
+    SELECT currency_code, MAX(reference_date) AS reference_date
+    FROM exchange_rates
+    GROUP BY currency_code
+) latest
+ON r.currency_code = latest.currency_code AND r.reference_date = latest.reference_date
+"""
+
+_lock = threading.Lock()
+_rates = {}
+_loaded = False
+_loaded_at = 0.0
+_version = None
+_version_checked_at = 0.0
+_refreshing = False
+_stats = {"hits": 0, "misses": 0, "reloads": 0, "refresh_errors": 0}
+
+def _read_version():
+    try:
+        rows = get_data("SELECT version FROM exchange_rate_version WHERE id = 1")
+    except pymysql.err.ProgrammingError:
+        # 버전 테이블이 아직 없으면 TTL로만 갱신
+        return None
+    return rows[0]["version"] if rows else None
+
+def _fetch_rates() -> dict:
+    rows = get_data(_LOAD_SQL)
+    return {
+        row["currency_code"]: {
+            "currency_name": row["currency_name"],
+            "base_rate": float(row["base_rate"]),
+            "send_rate": float(row["send_rate"]),
+            "get_rate": float(row["get_rate"]),
+            "reference_date": row["reference_date"],
+        }
+        for row in rows
+    }
+
+def _refresh(force_reload):
+    """버전 확인 후 필요하면 재로드 (락 밖에서 호출). 반환: (새 테이블 또는 None(변경 없음), 버전)"""
+    version = _read_version()
+    if not force_reload and version == _version:
+        return None, version
+    return _fetch_rates(), version
+
+def _ensure_fresh():
+    global _rates, _loaded, _loaded_at, _version, _version_checked_at, _refreshing
+    now = time.monotonic()
+    if not _loaded:
+        # 첫 로드: 응답할 테이블이 없으므로 다른 스레드도 기다리게 락 안에서 로드
+        with _lock:
+            if not _loaded:
+                version = _read_version()
+                _rates = _fetch_rates()
+                _loaded = True
+                _loaded_at = _version_checked_at = time.monotonic()
+                _version = version
+                _stats["reloads"] += 1
+                print(f"💱 [RateCache] 환율 {len(_rates)}건 로드 (version {version})")
+                return
+    with _lock:
+        expired = now - _loaded_at >= RATE_CACHE_TTL
+        if _refreshing or not (expired or now - _version_checked_at >= RATE_VERSION_CHECK_INTERVAL):
+            return
+        # 이 스레드가 갱신을 맡음 (다른 스레드는 기존 테이블 사용)
+        _refreshing = True
+        _version_checked_at = now
+
+    try:
+        rates, version = _refresh(expired)
+    except Exception as e:
+        # 여기까지 왔으면 첫 로드는 끝났으므로 캐시된 테이블(비어 있어도)로 응답
+        with _lock:
+            _refreshing = False
+            _stats["refresh_errors"] += 1
+        print(f"⚠️ [RateCache] 환율 갱신 실패, 캐시된 환율 사용: {e}")
+        return
+
+    with _lock:
+        _refreshing = False
+        if rates is not None:
+            # 수집기가 삭제 후 삽입하는 사이에 읽은 경우(빈 결과)는 이전 테이블 유지
+            if rates or not _rates:
+                _rates = rates
+            _loaded_at = time.monotonic()
+            _version = version
+            _stats["reloads"] += 1
+    if rates is not None:
+        print(f"💱 [RateCache] 환율 {len(rates)}건 로드 (version {version})")
+
+def get_rate_quote(currency):
+    """
+    통화의 최신 송금 환율
+    반환: {"currency", "send_rate", "base_rate", "reference_date"} 또는 None
+    """
+    currency = (currency or "").upper()
+    if currency == "KRW":
+        return {"currency": "KRW", "send_rate": 1.0, "base_rate": 1.0, "reference_date": None}
+    _ensure_fresh()
+    with _lock:
+        rate = _rates.get(currency)
+        _stats["hits" if rate else "misses"] += 1
+    if rate is None:
+        return None
+    return {
+        "currency": currency,
+        "send_rate": rate["send_rate"],
+        "base_rate": rate["base_rate"],
+        "reference_date": rate["reference_date"],
+    }
+
+def get_all_rates() -> dict:
+    _ensure_fresh()
+    with _lock:
+        return {code: dict(rate) for code, rate in _rates.items()}
+
+def invalidate_rates():
+    """다음 조회 시 강제로 다시 로드"""
+    global _loaded_at
+    with _lock:
+        _loaded_at = 0.0
+
+def bump_rate_version():
+    """환율 저장이 끝난 뒤 호출: 각 프로세스의 캐시가 다음 버전 확인 때 다시 로드됨"""
+    execute_query(
+        "INSERT INTO exchange_rate_version (id, version) VALUES (1, 1) "
+        "ON DUPLICATE KEY UPDATE version = version + 1"
+    )
+
+def get_rate_cache_stats() -> dict:
+    with _lock:
+        return dict(_stats, currencies=len(_rates), version=_version)
@@ -0,0 +1,193 @@
+import os
+import re
+import time
+import threading
+from collections import OrderedDict
+
+from utils.handle_sql import get_data, use_primary, REPLICA_MAX_LAG
+
+# ---------------------------------------------------------
+# 사용자별 조회 결과 캐시
+# - 키: (user_id, 정규화된 SQL, 파라미터)
+# - 송금 등으로 해당 사용자의 계좌/원장이 바뀌면 무효화
+#   - 같은 프로세스: transfer_executor 커밋 후 invalidate_account 호출로 즉시
+#   - 다른 프로세스(다른 Streamlit 워커/예약 송금 스케줄러): 공유 버전 카운터로 감지
+#     송금 트랜잭션이 account_versions.version 을 +1 -> 사용자 계좌 버전 합을 primary에서 확인,
+#     마지막으로 본 값과 다르면 그 사용자 캐시를 비움
+#     확인은 사용자당 VERSION_CHECK_SECONDS 에 한 번만 (캐시 적중/복제본 조회가 매번 primary 왕복을 하지 않도록)
+#     -> 다른 프로세스의 쓰기는 최대 VERSION_CHECK_SECONDS 늦게 반영됨
+#   - 버전을 확인할 수 없으면(마이그레이션 전/DB 오류) 캐시를 쓰지 않고 바로 조회
+# - TTL은 버전 카운터를 거치지 않은 쓰기(수동 수정 등)에 대한 안전장치
+# ---------------------------------------------------------
+MAX_ENTRIES_PER_USER = 64
+RESULT_TTL_SECONDS = 300
+VERSION_CHECK_SECONDS = float(os.getenv("RESULT_VERSION_CHECK_SECONDS", 3))
+
+ACCOUNT_VERSIONS_DDL = """
+CREATE TABLE IF NOT EXISTS account_versions (
+    account_id INT PRIMARY KEY,
+    version BIGINT NOT NULL DEFAULT 0
+)
+"""
+# 잔액/원장을 바꾸는 트랜잭션 안에서 함께 실행 (커밋되면 다른 프로세스 캐시도 무효화됨)
+BUMP_VERSION_SQL = """
+INSERT INTO account_versions (account_id, version) VALUES (%s, 1)
+ON DUPLICATE KEY UPDATE version = version + 1
+"""
+USER_VERSION_SQL = """
+SELECT COALESCE(SUM(v.version), 0) AS version
+FROM account_versions v
+JOIN accounts a ON a.account_id = v.account_id
+WHERE a.user_id = %s
+"""
+
+_lock = threading.Lock()
+_entries = {}          # user_id -> OrderedDict(key -> (저장 시각, rows))
+_account_owner = {}    # account_id -> user_id
+_generation = {}       # user_id -> 무효화 횟수 (조회 중 무효화된 결과가 저장되는 것 방지)
+_invalidated_at = {}   # user_id -> 마지막 무효화 시각
+_versions = {}         # user_id -> 마지막으로 확인한 DB 버전
+_version_checked_at = {}  # user_id -> 마지막 버전 확인 시각
+_version_warned = False
+_stats = {"hits": 0, "misses": 0, "stores": 0, "invalidations": 0, "remote_invalidations": 0, "uncached": 0}
+
+def _normalize(query: str) -> str:
+    return re.sub(r"\s+", " ", (query or "").strip().rstrip(";")).strip()
+
+def _key(query, args):
+    return _normalize(query), tuple(args) if args else ()
+
+def get_cached(user_id, query, args=None):
+    """캐시된 행 목록 또는 None"""
+    key = _key(query, args)
+    with _lock:
+        bucket = _entries.get(user_id)
+        entry = bucket.get(key) if bucket else None
+        if entry is not None and time.monotonic() - entry[0] < RESULT_TTL_SECONDS:
+            bucket.move_to_end(key)
+            _stats["hits"] += 1
+            return entry[1]
+        if entry is not None:
+            del bucket[key]
+        _stats["misses"] += 1
+    return None
+
+def put_cached(user_id, query, args, rows, generation=None):
+    key = _key(query, args)
+    with _lock:
+        if generation is not None and _generation.get(user_id, 0) != generation:
+            return
+        bucket = _entries.setdefault(user_id, OrderedDict())
+        bucket[key] = (time.monotonic(), rows)
+        bucket.move_to_end(key)
+        while len(bucket) > MAX_ENTRIES_PER_USER:
+            bucket.popitem(last=False)
+        _stats["stores"] += 1
+
+def _db_version(user_id):
+    """사용자 계좌들의 공유 버전 합 (primary 기준). 확인할 수 없으면 None"""
+    global _version_warned
+    try:
+        with use_primary():
+            rows = get_data(USER_VERSION_SQL, (user_id,))
+    except Exception as e:
+        if not _version_warned:
+            _version_warned = True
+            print(f"⚠️ [ResultCache] 버전 확인 실패, 캐시 없이 조회합니다: {e}")
+        return None
+    return int(rows[0]["version"]) if rows else 0
+
+def _sync_version(user_id) -> bool:
+    """
+    DB 버전을 확인해 다른 프로세스의 쓰기가 있었으면 캐시를 비움. 확인 실패 시 False
+    최근 VERSION_CHECK_SECONDS 안에 확인했으면 DB 조회 없이 통과
+    """
+    with _lock:
+        checked_at = _version_checked_at.get(user_id)
+    if checked_at is not None and time.monotonic() - checked_at < VERSION_CHECK_SECONDS:
+        return True
+    version = _db_version(user_id)
+    if version is None:
+        return False
+    with _lock:
+        known = _versions.get(user_id)
+        _versions[user_id] = version
+        _version_checked_at[user_id] = time.monotonic()
+    if known is not None and known != version:
+        with _lock:
+            _stats["remote_invalidations"] += 1
+        invalidate_user(user_id)
+    return True
+
+def cached_get_data(user_id, query, args=None):
+    """get_data와 같지만 사용자별 캐시를 먼저 확인"""
+    if user_id is None:
+        return get_data(query, args)
+    if not _sync_version(user_id):
+        with _lock:
+            _stats["uncached"] += 1
+        return get_data(query, args)
+    rows = get_cached(user_id, query, args)
+    if rows is not None:
+        print(f"🧠 [ResultCache] 적중 (user {user_id})")
+        return rows
+    with _lock:
+        generation = _generation.get(user_id, 0)
+        invalidated_at = _invalidated_at.get(user_id)
+    # 방금 쓰기가 있었던 사용자는 복제 지연 동안 primary에서 읽어야 오래된 값이 캐시되지 않음
+    if invalidated_at is not None and time.monotonic() - invalidated_at < REPLICA_MAX_LAG:
+        with use_primary():
+            rows = get_data(query, args)
+    else:
+        rows = get_data(query, args)
+    put_cached(user_id, query, args, rows, generation)
+    return rows
+
+def invalidate_user(user_id):
+    with _lock:
+        removed = _entries.pop(user_id, None)
+        _generation[user_id] = _generation.get(user_id, 0) + 1
+        _invalidated_at[user_id] = time.monotonic()
+        _stats["invalidations"] += 1
+    if removed:
+        print(f"🧹 [ResultCache] user {user_id} 캐시 {len(removed)}건 무효화")
+
+def _owner_of(account_id):
+    with _lock:
+        owner = _account_owner.get(account_id)
+    if owner is not None:
+        return owner
+    # 계좌 소유자는 바뀌지 않으므로 한 번만 조회
+    with use_primary():
+        rows = get_data("SELECT user_id FROM accounts WHERE account_id = %s", (account_id,))
+    if not rows:
+        return None
+    owner = rows[0]["user_id"]
+    with _lock:
+        _account_owner[account_id] = owner
+    return owner
+
+def register_account_owner(account_id, user_id):
+    """이미 소유자를 알고 있는 경우 미리 등록 (무효화 시 조회 생략)"""
+    with _lock:
+        _account_owner[account_id] = user_id
+
+def invalidate_account(account_id):
+    """계좌의 잔액/원장이 바뀌었을 때 소유자의 캐시를 비움"""
+    owner = _owner_of(account_id)
+    if owner is not None:
+        invalidate_user(owner)
+
+def clear_result_cache():
+    with _lock:
+        _entries.clear()
+        _versions.clear()
+        _version_checked_at.clear()
+        _invalidated_at.clear()
+
+def get_result_cache_stats() -> dict:
+    with _lock:
+        stats = dict(_stats, users=len(_entries), entries=sum(len(b) for b in _entries.values()))
+    total = stats["hits"] + stats["misses"]
+    stats["hit_rate"] = stats["hits"] / total if total else 0.0
+    return stats
@@ -0,0 +1,123 @@
+import os
+import time
+import hashlib
+import threading
+
+from utils.handle_sql import get_data
+from utils.create_view import USER_VIEWS
+
+# ---------------------------------------------------------
+# 스키마 카탈로그
+# - 허용된 뷰들의 컬럼 정보를 information_schema 한 번 조회로 로드
+# - 뷰 조합별로 렌더링된 스키마 문자열을 캐시
+# - 스키마 변경 감지 (DDL은 init_db 등 다른 프로세스에서 실행되므로 두 가지 경로)
+#   1) SCHEMA_CACHE_TTL 초가 지난 항목은 다시 조회 -> 지문이 바뀌면 교체 (플랜 캐시도 지문으로 갱신)
+#   2) SQL 실행이 없는 컬럼/테이블 오류(1054/1146)로 실패하면 invalidate_schema_cache 로 즉시 무효화
+# ---------------------------------------------------------
+SCHEMA_CACHE_TTL = float(os.getenv("SQL_SCHEMA_CACHE_TTL", 300))
+# 스키마가 캐시와 달라졌다는 신호인 MySQL 오류 (Unknown column / Table doesn't exist)
+SCHEMA_ERROR_CODES = {1054, 1146}
+
+_cache = {}
+_cache_lock = threading.Lock()
+_schema_version = 0
+
+def _load_columns(view_names):
+    """
+    뷰 목록의 컬럼 메타데이터를 한 번의 쿼리로 조회 -> {view: [(column, type), ...]}
+    사용자 뷰(USER_VIEWS)는 실제 뷰가 없으므로 원본 테이블 컬럼 타입으로 구성
+    """
+    tables = set()
+    for name in view_names:
+        if name in USER_VIEWS:
+            tables.update(table for _, table, _ in USER_VIEWS[name]["columns"])
+        else:
+            tables.add(name)
+    tables = sorted(tables)
+
+    placeholders = ", ".join(["%s"] * len(tables))
+    query = f"""
+        SELECT TABLE_NAME AS table_name, COLUMN_NAME AS column_name, COLUMN_TYPE AS column_type
+        FROM information_schema.COLUMNS
+        WHERE TABLE_SCHEMA = DATABASE()
+        AND TABLE_NAME IN ({placeholders})
+        ORDER BY TABLE_NAME, ORDINAL_POSITION
+    """
+    # information_schema 의 TABLE_NAME 대소문자는 lower_case_table_names 설정에 따라 다르므로 소문자로 맞춤
+    table_columns = {name.lower(): [] for name in tables}
+    for row in get_data(query, tuple(tables)):
+        table_columns.setdefault(row["table_name"].lower(), []).append((row["column_name"], row["column_type"]))
+
+    columns = {}
+    for name in view_names:
+        if name in USER_VIEWS:
+            types = {}
+            for _, table, _ in USER_VIEWS[name]["columns"]:
+                types[table] = dict(table_columns.get(table.lower(), []))
+            columns[name] = [
+                (view_col, types[table][source_col])
+                for view_col, table, source_col in USER_VIEWS[name]["columns"]
+                if source_col in types[table]
+            ]
+        else:
+            columns[name] = table_columns.get(name.lower(), [])
+    return columns
+
+def _render(view_names, columns):
+    """상세 스키마 텍스트(기존 DESCRIBE 형식)와 프롬프트용 압축 문자열을 함께 생성"""
+    text_parts = []
+    compact_parts = []
+    for view_name in view_names:
+        cols = columns.get(view_name) or []
+        text_parts.append(f"[Table/View: {view_name}]")
+        if cols:
+            text_parts.extend(f"- {name} ({col_type})" for name, col_type in cols)
+        else:
+            text_parts.append("- (No columns found or permission denied)")
+        compact_parts.append(f"{view_name}(" + ", ".join(f"{name} {col_type}" for name, col_type in cols) + ")")
+    compact = "\n".join(compact_parts)
+    return {
+        "views": list(view_names),
+        "text": "\n".join(text_parts),
+        "compact": compact,
+        # 스키마 모양이 같으면 같은 지문 -> 쿼리 플랜 캐시 등의 키로 사용
+        "fingerprint": hashlib.sha1(compact.encode("utf-8")).hexdigest()[:16],
+        "complete": all(columns.get(v) for v in view_names),
+    }
+
+def get_schema(allowed_views):
+    """
+    뷰 조합에 대한 스키마 정보를 반환합니다. (캐시 우선, SCHEMA_CACHE_TTL 이 지나면 다시 조회)
+    반환: {"views", "text", "compact", "fingerprint", "complete", "version"}
+    """
+    key = tuple(allowed_views)
+    with _cache_lock:
+        entry = _cache.get(key)
+        version = _schema_version
+    if entry is not None and time.monotonic() - entry["loaded_at"] < SCHEMA_CACHE_TTL:
+        return entry
+
+    fresh = _render(key, _load_columns(key))
+    fresh["version"] = version
+    fresh["loaded_at"] = time.monotonic()
+    if entry is not None and entry["fingerprint"] != fresh["fingerprint"]:
+        print(f"🔄 [Schema] 스키마 변경 감지: {', '.join(key)}")
+    # 컬럼을 못 찾은 뷰가 있으면 (권한/생성 전) 캐시하지 않고 다음 요청에서 다시 조회
+    if fresh["complete"]:
+        with _cache_lock:
+            if version == _schema_version:
+                _cache[key] = fresh
+    return fresh
+
+def invalidate_schema_cache():
+    """테이블/뷰 정의가 바뀌었을 때 호출: 캐시를 비우고 스키마 버전을 올림"""
+    global _schema_version
+    with _cache_lock:
+        _cache.clear()
+        _schema_version += 1
+    print(f"🧹 [Schema] 스키마 캐시 무효화 (version {_schema_version})")
+
+def is_schema_error(e) -> bool:
+    """캐시된 스키마가 실제 DB와 달라서 난 오류인지 (없는 컬럼/테이블)"""
+    args = getattr(e, "args", None)
+    return bool(args) and args[0] in SCHEMA_ERROR_CODES
@@ -1,8 +1,17 @@
 import os
+import sys
 import chromadb
 from chromadb.utils import embedding_functions
 from dotenv import load_dotenv
 
+# 스크립트로 직접 실행해도 rag_agent 패키지를 찾을 수 있도록 프로젝트 루트 추가
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if project_root not in sys.path:
+    sys.path.append(project_root)
+
+from rag_agent.lexical_index import build_and_save, LEXICAL_INDEX_PATH
+from rag_agent.flat_index import rebuild_flat_indexes, FLAT_INDEX_DIR
+
 # 제공해주신 handle_sql 모듈에서 get_data 함수 임포트
 # (파일 위치에 따라 from handle_sql import get_data 로 변경 필요할 수 있음)
 try:
@@ -118,6 +127,19 @@ def sync_mysql_to_chroma():
 
         print("✅ 모든 데이터 동기화 완료!")
 
+        # ---------------------------------------------------------
+        # Step 4: 같은 데이터로 어휘(BM25) 인덱스 생성 -> data/financial_terms 옆에 저장
+        # ---------------------------------------------------------
+        build_and_save(rows, LEXICAL_INDEX_PATH)
+
+        # ---------------------------------------------------------
+        # Step 5: flat 검색 백엔드 파일이 있으면 갱신된 컬렉션으로 다시 생성 (이전 임베딩으로 검색하지 않도록)
+        # ---------------------------------------------------------
+        data = collection.get(include=["embeddings", "documents", "metadatas"])
+        rebuilt = rebuild_flat_indexes(data["ids"], data["embeddings"], data["documents"], data["metadatas"], FLAT_INDEX_DIR)
+        if rebuilt:
+            print(f"✅ flat 인덱스 재생성 완료 ({', '.join(rebuilt)})")
+
     except Exception as e:
         print(f"❌ 오류 발생: {e}")
 
@@ -0,0 +1,225 @@
+import os
+import re
+import time
+import threading
+import logging
+import contextvars
+from contextlib import contextmanager
+from logging.handlers import RotatingFileHandler
+from pathlib import Path
+
+# ---------------------------------------------------------
+# [설정] 슬로우 쿼리 기준 및 로그 경로
+# ---------------------------------------------------------
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+SLOW_QUERY_LOG_PATH = PROJECT_ROOT / "logs" / "slow_query.log"
+SLOW_QUERY_THRESHOLD_MS = float(os.getenv("SLOW_QUERY_THRESHOLD_MS", 500))
+SLOW_QUERY_LOG_MAX_BYTES = 5 * 1024 * 1024
+SLOW_QUERY_LOG_BACKUPS = 3
+
+# 지연시간 히스토그램 버킷 (ms, 상한 기준)
+LATENCY_BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, float("inf"))
+
+_stats = {}
+_stats_lock = threading.Lock()
+
+# 요청 단위 트레이스 (어떤 에이전트가 어떤 쿼리를 날렸는지)
+_current_trace = contextvars.ContextVar("sql_trace", default=None)
+_current_agent = contextvars.ContextVar("sql_trace_agent", default=None)
+
+_slow_logger = None
+
+def _get_slow_logger():
+    """슬로우 쿼리 전용 로거 (용량 기준 로테이션)"""
+    global _slow_logger
+    if _slow_logger is None:
+        logger = logging.getLogger("fin_trans.slow_query")
+        logger.setLevel(logging.WARNING)
+        logger.propagate = False
+        try:
+            SLOW_QUERY_LOG_PATH.parent.mkdir(parents=True, exist_ok=True)
+            handler = RotatingFileHandler(
+                SLOW_QUERY_LOG_PATH,
+                maxBytes=SLOW_QUERY_LOG_MAX_BYTES,
+                backupCount=SLOW_QUERY_LOG_BACKUPS,
+                encoding="utf-8",
+            )
+            handler.setFormatter(logging.Formatter("[%(asctime)s] %(message)s"))
+            logger.addHandler(handler)
+        except OSError as e:
+            print(f"⚠️ 슬로우 쿼리 로그 파일을 열 수 없습니다: {e}")
+        _slow_logger = logger
+    return _slow_logger
+
+# ---------------------------------------------------------
+# SQL 지문(Fingerprint) 정규화
+# ---------------------------------------------------------
+_COMMENT_RE = re.compile(r"(--[^\n]*|#[^\n]*|/\*.*?\*/)", re.S)
+_STRING_RE = re.compile(r"'(?:[^'\\]|\\.|'')*'|\"(?:[^\"\\]|\\.)*\"")
+_NUMBER_RE = re.compile(r"\b-?\d+(?:\.\d+)?\b")
+_IN_LIST_RE = re.compile(r"\bin\s*\(\s*\?(?:\s*,\s*\?)*\s*\)", re.I)
+_PLACEHOLDER_RE = re.compile(r"%\(\w+\)s|%s")
+_SPACE_RE = re.compile(r"\s+")
+
+def fingerprint_sql(query: str) -> str:
+    """
+    리터럴/공백 차이를 제거한 쿼리 지문을 반환합니다.
+    예: "SELECT * FROM accounts WHERE user_id = 3" -> "select * from accounts where user_id = ?"
+    """
+    if not query:
+        return ""
+    text = _STRING_RE.sub("?", query)
+    text = _COMMENT_RE.sub(" ", text)
+    text = _PLACEHOLDER_RE.sub("?", text)
+    text = _NUMBER_RE.sub("?", text)
+    text = _IN_LIST_RE.sub("in (?+)", text)
+    text = _SPACE_RE.sub(" ", text).strip().rstrip(";").strip()
+    return text.lower()
+
+# ---------------------------------------------------------
+# 지문별 집계
+# ---------------------------------------------------------
+def _bucket_index(elapsed_ms: float) -> int:
+    for i, upper in enumerate(LATENCY_BUCKETS_MS):
+        if elapsed_ms <= upper:
+            return i
+    return len(LATENCY_BUCKETS_MS) - 1
+
+def _new_stat(fingerprint: str) -> dict:
+    return {
+        "fingerprint": fingerprint,
+        "count": 0,
+        "errors": 0,
+        "rows": 0,
+        "total_ms": 0.0,
+        "max_ms": 0.0,
+        "connect_ms": 0.0,
+        "execute_ms": 0.0,
+        "fetch_ms": 0.0,
+        "buckets": [0] * len(LATENCY_BUCKETS_MS),
+    }
+
+def record_query(query, connect_ms, execute_ms, fetch_ms, rows, error=None, target="primary"):
+    """쿼리 1건의 측정값을 집계/슬로우 로그/현재 트레이스에 반영합니다."""
+    total_ms = connect_ms + execute_ms + fetch_ms
+    fingerprint = fingerprint_sql(query)
+    agent = _current_agent.get()
+
+    with _stats_lock:
+        stat = _stats.get(fingerprint)
+        if stat is None:
+            stat = _stats[fingerprint] = _new_stat(fingerprint)
+        stat["count"] += 1
+        stat["rows"] += rows or 0
+        stat["total_ms"] += total_ms
+        stat["max_ms"] = max(stat["max_ms"], total_ms)
+        stat["connect_ms"] += connect_ms
+        stat["execute_ms"] += execute_ms
+        stat["fetch_ms"] += fetch_ms
+        stat["buckets"][_bucket_index(total_ms)] += 1
+        if error is not None:
+            stat["errors"] += 1
+
+    record = {
+        "agent": agent,
+        "target": target,
+        "fingerprint": fingerprint,
+        "connect_ms": round(connect_ms, 3),
+        "execute_ms": round(execute_ms, 3),
+        "fetch_ms": round(fetch_ms, 3),
+        "total_ms": round(total_ms, 3),
+        "rows": rows or 0,
+        "error": str(error) if error is not None else None,
+    }
+
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.append(record)
+
+    if total_ms >= SLOW_QUERY_THRESHOLD_MS:
+        _get_slow_logger().warning(
+            f"{total_ms:.1f}ms (connect {connect_ms:.1f} / execute {execute_ms:.1f} / fetch {fetch_ms:.1f}) "
+            f"rows={rows or 0} agent={agent or '-'} target={target} | {_SPACE_RE.sub(' ', query).strip()}"
+        )
+    return record
+
+class StatementTimer:
+    """
+    handle_sql 내부에서 접속/실행/패치 구간을 나눠 측정하는 헬퍼
+    사용 순서: StatementTimer(query) -> connected() -> executed() -> finish(rows, error)
+    """
+    def __init__(self, query, target="primary"):
+        self.query = query
+        self.target = target
+        self._start = time.perf_counter()
+        self._connected = None
+        self._executed = None
+
+    def connected(self):
+        self._connected = time.perf_counter()
+
+    def executed(self):
+        self._executed = time.perf_counter()
+
+    def finish(self, rows=0, error=None):
+        end = time.perf_counter()
+        connected = self._connected or end
+        executed = self._executed or end
+        return record_query(
+            self.query,
+            (connected - self._start) * 1000,
+            (executed - connected) * 1000,
+            (end - executed) * 1000,
+            rows,
+            error=error,
+            target=self.target,
+        )
+
+# ---------------------------------------------------------
+# 요청 트레이스
+# ---------------------------------------------------------
+@contextmanager
+def query_trace(agent: str):
+    """
+    블록 안에서 실행된 쿼리를 agent 이름과 함께 수집합니다.
+    바깥에 이미 트레이스가 열려 있으면 같은 리스트에 이어서 기록합니다.
+    """
+    trace = _current_trace.get()
+    trace_token = None
+    if trace is None:
+        trace = []
+        trace_token = _current_trace.set(trace)
+    agent_token = _current_agent.set(agent)
+    try:
+        yield trace
+    finally:
+        _current_agent.reset(agent_token)
+        if trace_token is not None:
+            _current_trace.reset(trace_token)
+
+def summarize_trace(trace: list) -> str:
+    """트레이스를 한 줄 요약 문자열로 변환"""
+    if not trace:
+        return "DB 쿼리 없음"
+    total_ms = sum(r["total_ms"] for r in trace)
+    per_agent = {}
+    for r in trace:
+        per_agent[r["agent"] or "-"] = per_agent.get(r["agent"] or "-", 0) + 1
+    agents = ", ".join(f"{name} {count}건" for name, count in per_agent.items())
+    return f"{len(trace)}건 / {total_ms:.1f}ms ({agents})"
+
+# ---------------------------------------------------------
+# 조회용 함수
+# ---------------------------------------------------------
+def get_query_stats(top: int | None = None) -> list:
+    """지문별 집계를 누적 시간 내림차순으로 반환"""
+    with _stats_lock:
+        stats = [dict(s, buckets=list(s["buckets"])) for s in _stats.values()]
+    for s in stats:
+        s["avg_ms"] = s["total_ms"] / s["count"] if s["count"] else 0.0
+    stats.sort(key=lambda s: s["total_ms"], reverse=True)
+    return stats[:top] if top else stats
+
+def reset_query_stats():
+    with _stats_lock:
+        _stats.clear()
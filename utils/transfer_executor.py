@@ -0,0 +1,211 @@
+import time
+
+import pymysql
+
+from utils.handle_sql import transaction, get_data, use_primary
+from utils.result_cache import invalidate_account, BUMP_VERSION_SQL
+
+# ---------------------------------------------------------
+# 송금 실행기 (원자적 출금 + 원장 기록)
+# - 잔액을 파이썬에서 계산해 덮어쓰지 않고, 조건부 UPDATE 한 문장으로 차감
+#     UPDATE ... SET balance = balance - x WHERE account_id = ? AND balance >= x
+#   -> 행 잠금 안에서 검사와 차감이 같이 일어나므로 동시 송금에도 갱신 손실/마이너스 잔액 없음
+# - 차감 후 잔액 조회와 원장 INSERT까지 같은 트랜잭션: 중간에 실패하면 전부 롤백
+# - 멱등성 키: 같은 트랜잭션에서 transfer_requests 에 결과를 기록
+#   -> 버튼 중복 클릭/재실행/타임아웃 재시도 시 다시 차감하지 않고 처음 결과를 반환
+# - 차감 성공 시 account_versions 도 같은 트랜잭션에서 +1 (다른 프로세스의 조회 결과 캐시 무효화 신호)
+# - transfer_requests / account_versions 는 init_db 로 생성. 기존 DB는 `python utils/init_db.py --migrate` 로 추가하고,
+#   테이블이 없으면 출금 전에 TransferTablesMissing 으로 바로 실패 (1146 오류로 매 송금이 깨지지 않게)
+# ---------------------------------------------------------
+TRANSFER_MAX_RETRIES = 2
+# 재시도해도 안전한 오류 (키가 있을 때만): 연결 끊김, 데드락, 잠금 대기 초과
+_RETRYABLE_ERRORS = {1205, 1213, 2006, 2013}
+
+TRANSFER_REQUESTS_DDL = """
+CREATE TABLE IF NOT EXISTS transfer_requests (
+    idempotency_key VARCHAR(64) PRIMARY KEY,
+    account_id INT NOT NULL,
+    status VARCHAR(20) NOT NULL,
+    reason VARCHAR(40),
+    balance_after DECIMAL(18, 2),
+    ledger_id BIGINT,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+)
+"""
+
+MIGRATE_HINT = "python utils/init_db.py --migrate"
+
+REQUIRED_TABLES = ("transfer_requests", "account_versions")
+
+class TransferTablesMissing(RuntimeError):
+    """송금에 필요한 테이블(transfer_requests / account_versions)이 없는 DB (마이그레이션 전)"""
+    def __init__(self, missing):
+        super().__init__(f"{', '.join(missing)} 테이블이 없습니다. 먼저 '{MIGRATE_HINT}' 를 실행하세요.")
+
+_tables_checked = False
+
+def check_transfer_tables():
+    """
+    송금에 필요한 테이블이 있는지 확인하고 없으면 TransferTablesMissing 을 발생시킵니다.
+    한 번 확인되면 프로세스 안에서는 다시 조회하지 않음 (앱/스케줄러 시작 시 호출)
+    """
+    global _tables_checked
+    if _tables_checked:
+        return
+    with use_primary():
+        rows = get_data(
+            "SELECT TABLE_NAME AS table_name FROM information_schema.tables "
+            "WHERE table_schema = DATABASE() AND table_name IN (%s, %s)",
+            REQUIRED_TABLES,
+        )
+    found = {row["table_name"].lower() for row in rows}
+    missing = [name for name in REQUIRED_TABLES if name not in found]
+    if missing:
+        raise TransferTablesMissing(missing)
+    _tables_checked = True
+
+# 같은 키의 트랜잭션이 진행 중이면 이 INSERT가 잠금 대기 -> 커밋되면 중복 키 오류, 롤백되면 성공
+CLAIM_SQL = "INSERT INTO transfer_requests (idempotency_key, account_id, status) VALUES (%s, %s, 'PENDING')"
+RECORD_SQL = """
+UPDATE transfer_requests
+SET status = %s, reason = %s, balance_after = %s, ledger_id = %s
+WHERE idempotency_key = %s
+"""
+
+DEBIT_SQL = """
+UPDATE accounts
+SET balance = balance - %s
+WHERE account_id = %s
+AND balance >= %s
+"""
+
+BALANCE_SQL = "SELECT balance FROM accounts WHERE account_id = %s"
+
+LEDGER_SQL = """
+INSERT INTO ledger (
+    account_id, contact_id, transaction_type, amount, balance_after,
+    exchange_rate, target_amount, target_currency_code, description, category
+)
+VALUES (%s, %s, 'TRANSFER', %s, %s, %s, %s, %s, '송금', '이체')
+"""
+
+def _outcome(ok, reason, balance_after, ledger_id, replayed=False):
+    return {"ok": ok, "reason": reason, "balance_after": balance_after, "ledger_id": ledger_id, "replayed": replayed}
+
+def _stored_outcome(idempotency_key):
+    """이미 처리된 키의 결과"""
+    with use_primary():
+        rows = get_data(
+            "SELECT status, reason, balance_after, ledger_id FROM transfer_requests WHERE idempotency_key = %s",
+            (idempotency_key,),
+        )
+    if not rows:
+        return None
+    row = rows[0]
+    balance_after = float(row["balance_after"]) if row["balance_after"] is not None else None
+    return _outcome(row["status"] == "SUCCESS", row["reason"], balance_after, row["ledger_id"], replayed=True)
+
+def _execute_items_once(account_id, items, idempotency_key):
+    """
+    items(1건 이상)를 한 트랜잭션으로 송금: 합계 1회 차감 + 줄별 원장
+    단건 송금은 항목이 하나인 목록으로 호출
+    """
+    total_krw = round(sum(item["amount_krw"] for item in items), 2)
+    claimed = False
+    try:
+        with transaction() as tx:
+            if idempotency_key:
+                tx.execute(CLAIM_SQL, (idempotency_key, account_id))
+            claimed = True
+
+            # 합계를 한 번에 차감 -> 일부만 나가는 경우 없음
+            debited = tx.execute(DEBIT_SQL, (total_krw, account_id, total_krw))
+            if debited == 0:
+                # 조건 불충족: 잔액 부족인지 계좌가 없는지 구분 (변경 사항 없음)
+                row = tx.fetch_one(BALANCE_SQL, (account_id,))
+                outcome = _outcome(
+                    False,
+                    "INSUFFICIENT_FUNDS" if row else "ACCOUNT_NOT_FOUND",
+                    float(row["balance"]) if row else None,
+                    None,
+                )
+            else:
+                # UPDATE로 이미 행 잠금을 잡고 있으므로 이 값은 방금 차감한 결과
+                balance_after = float(tx.fetch_one(BALANCE_SQL, (account_id,))["balance"])
+                # 줄별 원장: 차감 전 잔액에서 순서대로 빼 나간 잔액을 기록 (마지막 줄 = 최종 잔액)
+                running = balance_after + total_krw
+                for item in items:
+                    running = round(running - item["amount_krw"], 2)
+                    tx.execute(LEDGER_SQL, (
+                        account_id, item["contact_id"], -item["amount_krw"], running,
+                        item["exchange_rate"], item["amount"], item["currency"],
+                    ))
+                outcome = _outcome(True, None, balance_after, tx.lastrowid)
+                # 다른 프로세스의 조회 결과 캐시도 이 커밋을 알 수 있도록 공유 버전 증가
+                tx.execute(BUMP_VERSION_SQL, (account_id,))
+
+            if idempotency_key:
+                tx.execute(RECORD_SQL, (
+                    "SUCCESS" if outcome["ok"] else "FAILED", outcome["reason"],
+                    outcome["balance_after"], outcome["ledger_id"], idempotency_key,
+                ))
+    except pymysql.err.IntegrityError as e:
+        # 이미 같은 키로 처리됨 -> 처음 결과 반환 (차감 없음)
+        if idempotency_key and not claimed and e.args and e.args[0] == 1062:
+            stored = _stored_outcome(idempotency_key)
+            if stored is not None:
+                print(f"♻️ [Transfer] 중복 요청 감지, 기존 결과 반환 ({idempotency_key})")
+                return stored
+        raise
+
+    # 커밋 이후에 캐시 무효화 (커밋 전에 비우면 이전 값이 다시 캐시될 수 있음)
+    if outcome["ok"]:
+        invalidate_account(account_id)
+    return outcome
+
+def _with_retries(run, idempotency_key):
+    """키가 있을 때만 일시적 오류를 재시도 (같은 키로 다시 실행해도 중복 차감 없음)"""
+    attempt = 0
+    while True:
+        try:
+            return run()
+        except pymysql.err.OperationalError as e:
+            code = e.args[0] if e.args else None
+            if not idempotency_key or code not in _RETRYABLE_ERRORS or attempt >= TRANSFER_MAX_RETRIES:
+                raise
+            attempt += 1
+            print(f"🔁 [Transfer] 일시적 오류({code}), 재시도 {attempt}/{TRANSFER_MAX_RETRIES}")
+            time.sleep(0.05 * (2 ** attempt))
+
+def execute_transfer(account_id, contact_id, amount_krw, exchange_rate, target_amount, target_currency,
+                     idempotency_key=None):
+    """
+    한 트랜잭션으로 송금을 실행하고 결과를 반환합니다.
+    반환: {"ok": bool, "reason": None | "INSUFFICIENT_FUNDS" | "ACCOUNT_NOT_FOUND",
+           "balance_after": float | None, "ledger_id": int | None, "replayed": bool}
+    idempotency_key 가 있으면 같은 키의 재요청은 처음 결과를 그대로 반환하고,
+    데드락/연결 끊김 같은 일시적 오류는 자동으로 재시도합니다.
+    """
+    amount_krw = round(float(amount_krw), 2)
+    if amount_krw <= 0:
+        raise ValueError("송금 금액은 0보다 커야 합니다.")
+    check_transfer_tables()
+    item = {
+        "contact_id": contact_id, "amount_krw": amount_krw, "exchange_rate": exchange_rate,
+        "amount": target_amount, "currency": target_currency,
+    }
+    return _with_retries(lambda: _execute_items_once(account_id, [item], idempotency_key), idempotency_key)
+
+def execute_batch_transfer(account_id, items, idempotency_key=None):
+    """
+    여러 건을 한 트랜잭션으로 송금합니다. (합계 1회 차감 + 줄별 원장)
+    items: [{"contact_id", "amount_krw", "exchange_rate", "amount", "currency"}, ...]
+    반환 형식은 execute_transfer 와 같음 (ledger_id 는 마지막 줄)
+    """
+    if not items:
+        raise ValueError("송금할 항목이 없습니다.")
+    items = [dict(item, amount_krw=round(float(item["amount_krw"]), 2)) for item in items]
+    if any(item["amount_krw"] <= 0 for item in items):
+        raise ValueError("송금 금액은 0보다 커야 합니다.")
+    check_transfer_tables()
+    return _with_retries(lambda: _execute_items_once(account_id, items, idempotency_key), idempotency_key)